@@ -1,34 +1,42 @@
 import logging
+from functools import partial
 from logging import Logger
-from vosk import SetLogLevel
 from os import getenv, environ
 from dotenv import load_dotenv
-from langchain.globals import set_debug
 
-from flasgger import Swagger
-from flask_restful import Api
-from flask_migrate import Migrate
-from flask_jwt_extended import JWTManager
-from werkzeug.exceptions import HTTPException
-from flask.wrappers import Response as WrapperResponse
-from flask import Flask, Response, make_response, jsonify
+from flask import Flask
 
 from app.resources.config import *
-from app.resources.database import db
-from app.resources.swagger_template import swagger_template
-
-from app.endpoints.home import Home
-from app.endpoints.download import Download
-from app.endpoints.blueprints.logs import log_blueprint
-from app.endpoints.blueprints.user import user_blueprint
-from app.endpoints.blueprints.place import place_blueprint
-from app.endpoints.blueprints.models import model_blueprint
 
 
 load_dotenv(DOTENV_ABSPATH)
 
 
 def create_app() -> Flask:
+	# Model worker processes import their jobs from app.resources, which runs this
+	# module first, so the endpoints and models are only imported by the server
+	from vosk import SetLogLevel
+	from langchain.globals import set_debug
+
+	from flasgger import Swagger
+	from flask_restful import Api
+	from flask_migrate import Migrate
+	from flask_jwt_extended import JWTManager
+	from werkzeug.exceptions import HTTPException
+	from flask.wrappers import Response as WrapperResponse
+	from flask import Response, make_response, jsonify
+
+	from app.resources.database import db
+	from app.resources.swagger_template import swagger_template
+
+	from app.endpoints.home import Home
+	from app.endpoints.download import Download
+	from app.endpoints.blueprints.logs import log_blueprint
+	from app.endpoints.blueprints.user import user_blueprint
+	from app.endpoints.blueprints.place import place_blueprint
+	from app.endpoints.blueprints.jobs import job_blueprint
+	from app.endpoints.blueprints.models import model_blueprint
+
 	###########################################################################
 	######################### Create application ##############################
 	###########################################################################
@@ -123,6 +131,7 @@ def create_app() -> Flask:
 	app.register_blueprint(user_blueprint, url_prefix="/users")
 	app.register_blueprint(place_blueprint, url_prefix="/places")
 	app.register_blueprint(model_blueprint, url_prefix="/models")
+	app.register_blueprint(job_blueprint, url_prefix="/jobs")
 
 	###########################################################################
 	###################### Apply caching to all responses #####################
@@ -134,3 +143,29 @@ def create_app() -> Flask:
 		return response
 
 	return app
+
+
+def create_server() -> Flask:
+	""" Creates the application and starts its background services
+
+	Only the server calls it, the flask CLI commands use create_app and don't
+	need to load the models or bind the WebSocket port.
+	"""
+	from app.resources.tts import start_tts_warmup
+	from app.resources.functions import prerender_tts
+	from app.resources.asr_stream import start_asr_stream_server
+
+	app: Flask = create_app()
+
+	# Streaming speech recognition runs over WebSocket on its own port
+	start_asr_stream_server(app)
+
+	# The TTS model loads in the background so the first request doesn't pay for it
+	if TTS_WARMUP_ON_STARTUP:
+		# Fixed agent responses are then cached so they never wait for a synthesis
+		if TTS_CACHE_ENABLED and TTS_CACHE_PRERENDER:
+			start_tts_warmup(after=partial(prerender_tts, AGENT_CANNED_RESPONSES))
+		else:
+			start_tts_warmup()
+
+	return app
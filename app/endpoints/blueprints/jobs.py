@@ -0,0 +1,308 @@
+import json
+from time import time
+from typing import Iterator, Optional
+from logging import Logger, getLogger
+from flask_restful import Api, Resource
+from flask_restful.reqparse import Namespace
+from flask_jwt_extended import jwt_required, get_jwt
+from flask import Blueprint, Response, make_response, jsonify, current_app, stream_with_context
+
+from app.resources.config import *
+from app.resources.parsers import *
+from app.resources.agent import agente
+from app.resources.grammar import get_mode_grammar
+from app.resources.asr import submit_transcription
+from app.resources.audio import InvalidAudio
+from app.resources.functions import prepare_speech, tts_func
+from app.resources.jobs import JobQueueFull, job_runner, job_store, job_event_streams, JOB_FINISHED_STATUSES
+from app.resources.workers import WorkerPoolFull
+from app.endpoints.blueprints.models import read_speech_recognition_input
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.job_blueprint")
+
+job_blueprint: Blueprint = Blueprint("job", __name__)
+api: Api = Api(job_blueprint)
+
+
+###############################################################################
+############################### Job functions #################################
+###############################################################################
+
+def asr_job(pcm: bytes, grammar: Optional[str]) -> dict:
+	# Background jobs can wait for a free ASR worker instead of failing fast
+	return {"text": submit_transcription(pcm, grammar, block=True, timeout=JOBS_SUBMIT_TIMEOUT).result()}
+
+
+def tts_job(text: str) -> dict:
+	return {"audio_data": tts_func(text, block=True)}
+
+
+def agent_job(prompt: str, user_id: int) -> dict:
+	return {"text": agente.consultar_agente(pregunta=prompt, user_id=user_id)}
+
+
+def serialize_job(job: dict) -> dict:
+	return {
+		"id": job["id"],
+		"kind": job["kind"],
+		"status": job["status"],
+		"result": job["result"],
+		"error": job["error"],
+		"created_at": job["created_at"],
+		"updated_at": job["updated_at"],
+		"expires_at": job["expires_at"]
+	}
+
+
+def job_submitted_response(job_id: str) -> Response:
+	return make_response(jsonify({
+		"status": "Success",
+		"message": "Job submitted successfully",
+		"job_id": job_id
+	}), 202)
+
+
+def job_queue_full_response() -> Response:
+	response: Response = make_response(jsonify({
+		"status": "Failed",
+		"message": "Too many pending jobs, try again later",
+		"error_code": "TT.503"
+	}), 503)
+	response.headers["Retry-After"] = str(JOBS_RETRY_AFTER)
+	return response
+
+
+def get_user_job(job_id: str) -> tuple[Optional[dict], Optional[Response]]:
+	""" Gets a job checking it belongs to the current user, returns an error response otherwise """
+	try:
+		job: Optional[dict] = job_store.get(job_id)
+
+	except Exception as e:
+		logger.error(f"Error getting job: {e}. Aborting request...")
+		return None, make_response(jsonify({
+			"status": "Failed",
+			"message": GENERAL_ERROR_MESSAGE,
+			"error_code": "TT.500"
+		}), 500)
+
+	jwt_data: dict = get_jwt()
+	if job is None or (job["user_id"] != jwt_data["sub"]["id"] and not jwt_data["sub"]["is_admin"]):
+		logger.error("Job not found. Aborting request...")
+		return None, make_response(jsonify({
+			"status": "Failed",
+			"message": "Job not found",
+			"error_code": "TT.D404"
+		}), 404)
+
+	return job, None
+
+
+###############################################################################
+################################# Resources ###################################
+###############################################################################
+
+class SpeechRecognitionJob(Resource):
+	@jwt_required()
+	def post(self) -> Response:
+		logger.debug("Submitting speech recognition job...")
+
+		logger.debug("Checking request data...")
+		try:
+			audio, mode, mimetype = read_speech_recognition_input()
+			grammar: Optional[str] = get_mode_grammar(mode)
+
+		except ValueError as e:
+			logger.error(f"Invalid speech recognition request: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": "Invalid audio data or mode",
+				"error_code": "TT.D400"
+			}), 400)
+
+		except Exception as e:
+			logger.error(f"Error reading speech recognition request: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		# The request body is gone once the response is sent, so it's read now
+		logger.debug("Preparing audio data...")
+		try:
+			pcm: bytes = prepare_speech(audio, mimetype)
+
+		except InvalidAudio as e:
+			logger.error(f"Invalid audio data: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": str(e),
+				"error_code": "TT.D400"
+			}), 400)
+
+		except Exception as e:
+			logger.error(f"Error preparing audio data: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		try:
+			job_id: str = job_runner.submit(current_app._get_current_object(), "asr", get_jwt()["sub"]["id"], asr_job, pcm, grammar)
+
+		except JobQueueFull:
+			logger.error("Job queue is full. Aborting request...")
+			return job_queue_full_response()
+
+		except Exception as e:
+			logger.error(f"Error submitting speech recognition job: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		logger.info(f"Speech recognition job {job_id} submitted successfully")
+		return job_submitted_response(job_id)
+
+
+class TTSJob(Resource):
+	@jwt_required()
+	def post(self) -> Response:
+		logger.debug("Submitting tts job...")
+
+		logger.debug("Checking request data...")
+		args: Namespace = create_tts_model_parser()
+
+		try:
+			job_id: str = job_runner.submit(current_app._get_current_object(), "tts", get_jwt()["sub"]["id"], tts_job, args["text"])
+
+		except JobQueueFull:
+			logger.error("Job queue is full. Aborting request...")
+			return job_queue_full_response()
+
+		except Exception as e:
+			logger.error(f"Error submitting tts job: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		logger.info(f"TTS job {job_id} submitted successfully")
+		return job_submitted_response(job_id)
+
+
+class AgentJob(Resource):
+	@jwt_required()
+	def post(self, id: int) -> Response:
+		logger.debug(f"Submitting agent job for user with id {id}...")
+
+		logger.debug("Checking request data...")
+		args: Namespace = create_agent_model_parser()
+
+		try:
+			job_id: str = job_runner.submit(current_app._get_current_object(), "agent", get_jwt()["sub"]["id"], agent_job, args["prompt"], id)
+
+		except JobQueueFull:
+			logger.error("Job queue is full. Aborting request...")
+			return job_queue_full_response()
+
+		except Exception as e:
+			logger.error(f"Error submitting agent job: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		logger.info(f"Agent job {job_id} submitted successfully")
+		return job_submitted_response(job_id)
+
+
+class JobDetail(Resource):
+	@jwt_required()
+	def get(self, job_id: str) -> Response:
+		logger.debug(f"Getting job with id {job_id}...")
+
+		job, error_response = get_user_job(job_id)
+		if error_response is not None:
+			return error_response
+
+		logger.debug("Returning job...")
+		return make_response(jsonify({
+			"status": "Success",
+			"message": "Job retrieved successfully",
+			"job": serialize_job(job)
+		}), 200)
+
+
+class JobEvents(Resource):
+	@jwt_required()
+	def get(self, job_id: str) -> Response:
+		logger.debug(f"Streaming events of job with id {job_id}...")
+
+		job, error_response = get_user_job(job_id)
+		if error_response is not None:
+			return error_response
+
+		# Each stream holds a server thread until its job finishes or it times out
+		try:
+			job_event_streams.admit()
+
+		except WorkerPoolFull:
+			logger.error("Too many job event streams. Aborting request...")
+			response: Response = make_response(jsonify({
+				"status": "Failed",
+				"message": "Too many job event streams, poll the job instead",
+				"error_code": "TT.503"
+			}), 503)
+			response.headers["Retry-After"] = str(JOBS_RETRY_AFTER)
+			return response
+
+		def events(job: dict) -> Iterator[str]:
+			deadline: float = time() + JOBS_EVENTS_TIMEOUT
+			last_status: Optional[str] = None
+
+			while True:
+				if job["status"] != last_status:
+					last_status = job["status"]
+					yield f"event: {job['status']}\ndata: {json.dumps(serialize_job(job))}\n\n"
+
+				if job["status"] in JOB_FINISHED_STATUSES:
+					return
+				if time() > deadline:
+					yield "event: timeout\ndata: {}\n\n"
+					return
+
+				# Woken by the job runner instead of polling the store
+				pending: bool = job_runner.wait_for_change(job_id, job["status"], deadline - time())
+				next_job: Optional[dict] = job_store.get(job_id)
+				if next_job is None:
+					return
+				job = next_job
+
+				if not pending and job["status"] not in JOB_FINISHED_STATUSES:
+					# Left over from another process, it will never change here
+					return
+
+		try:
+			response = Response(stream_with_context(events(job)), mimetype="text/event-stream")
+			response.call_on_close(job_event_streams.release)
+
+		except Exception:
+			job_event_streams.release()
+			raise
+
+		response.headers["Cache-Control"] = "no-cache"
+		response.headers["X-Accel-Buffering"] = "no"
+		return response
+
+
+api.add_resource(SpeechRecognitionJob, "/asr")
+api.add_resource(TTSJob, "/tts")
+api.add_resource(AgentJob, "/agent/<int:id>")
+api.add_resource(JobDetail, "/<string:job_id>")
+api.add_resource(JobEvents, "/<string:job_id>/events")
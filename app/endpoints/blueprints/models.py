@@ -1,16 +1,23 @@
-from os import remove
-from os.path import join
+import json
+from typing import BinaryIO, Iterator, Optional
 from base64 import b64decode
 from logging import Logger, getLogger
 from flask_restful import Api, Resource
-from flask_jwt_extended import jwt_required
+from flask_jwt_extended import jwt_required, get_jwt
 from flask_restful.reqparse import Namespace
-from flask import Blueprint, Response, make_response, jsonify
+from werkzeug.datastructures import FileStorage
+from flask import Blueprint, Response, make_response, jsonify, request, stream_with_context
 
 from app.resources.config import *
 from app.resources.parsers import *
+from app.resources.asr import asr_stats
+from app.resources.tts import tts_stats
+from app.resources.narration import narration_renderer
+from app.resources.grammar import get_mode_grammar, place_grammar
 from app.resources.agent import agente
-from app.resources.functions import speech_recognition, tts_func
+from app.resources.workers import WorkerPoolFull, model_requests
+from app.resources.audio import InvalidAudio, encode_audio
+from app.resources.functions import speech_recognition, speech_recognition_batch, synthesize_wav, wav_to_audio_data, tts_stream, tts_batch
 
 
 logger: Logger = getLogger(f"{PROJECT_NAME}.model_blueprint")
@@ -19,57 +26,197 @@ model_blueprint: Blueprint = Blueprint("model", __name__)
 api: Api = Api(model_blueprint)
 
 
+def part_audio_mimetype(mimetype: str) -> Optional[str]:
+	""" Multipart files default to application/octet-stream, their container is then detected from the content """
+	if mimetype in ASR_WAV_MIMETYPES or mimetype in ASR_COMPRESSED_MIMETYPES:
+		return mimetype
+
+	return None
+
+
+def read_speech_recognition_input() -> tuple[bytes | BinaryIO, Optional[str], Optional[str]]:
+	""" Gets the audio, mode and audio mimetype of a raw body, multipart or base64 speech recognition request """
+	# Raw bodies can only take the mode as a query parameter
+	mode: Optional[str] = request.args.get("mode")
+	if request.mimetype in ASR_WAV_MIMETYPES or request.mimetype in ASR_COMPRESSED_MIMETYPES:
+		logger.debug("Reading audio data from request body stream...")
+		return request.stream, mode, request.mimetype
+
+	if request.mimetype == "multipart/form-data" and "audio" in request.files:
+		logger.debug("Reading audio data from multipart file...")
+		file: FileStorage = request.files["audio"]
+		return file.stream, request.form.get("mode", mode), part_audio_mimetype(file.mimetype)
+
+	args: Namespace = create_speech_recognition_model_parser()
+
+	logger.debug("Decoding audio data...")
+	try:
+		# The container of base64 audio is detected from its content
+		return b64decode(args["audio"]), args["mode"], None
+
+	except Exception as e:
+		raise ValueError(f"Invalid base64 audio data: {e}")
+
+
 class SpeechRecognition(Resource):
 	@jwt_required()
 	def post(self) -> Response:
 		logger.debug("Starting speech recognition process...")
 
 		logger.debug("Checking request data...")
-		args: Namespace = create_speech_recognition_model_parser()
+		try:
+			audio, mode, mimetype = read_speech_recognition_input()
+
+		except ValueError as e:
+			logger.error(f"Error decoding audio data: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": "Invalid base64 audio data",
+				"error_code": "TT.D400"
+			}), 400)
 
-		logger.debug("Decoding audio data...")
+		logger.debug("Getting speech recognition mode grammar...")
 		try:
-			audio: bytes = b64decode(args["audio"])
+			grammar: Optional[str] = get_mode_grammar(mode)
+
+		except ValueError as e:
+			logger.error(f"Invalid speech recognition mode: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": f"Mode must be one of: {', '.join(ASR_MODES)}",
+				"error_code": "TT.D400"
+			}), 400)
 
 		except Exception as e:
-			logger.error(f"Error decoding audio data: {e}. Aborting request...")
+			logger.error(f"Error getting speech recognition grammar: {e}. Aborting request...")
 			return make_response(jsonify({
 				"status": "Failed",
 				"message": GENERAL_ERROR_MESSAGE,
 				"error_code": "TT.500"
 			}), 500)
 
-		logger.debug("Saving audio data as a temp file...")
+		logger.debug("Processing audio data with model...")
 		try:
-			with open(join("/tmp", TEMP_FILE_NAME), "wb") as file:
-				file.write(audio)
+			# Waiting on the model holds a server thread, so only a few requests may do it at once
+			with model_requests.admitted_request():
+				text: str = speech_recognition(audio, grammar, mimetype)
 
-		except Exception:
-			logger.error("Error saving audio data as a temp file. Aborting request...")
+		except InvalidAudio as e:
+			logger.error(f"Invalid audio data: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": str(e),
+				"error_code": "TT.D400"
+			}), 400)
+
+		except WorkerPoolFull:
+			logger.error("Speech recognition queue is full. Aborting request...")
+			response: Response = make_response(jsonify({
+				"status": "Failed",
+				"message": "Speech recognition service is busy, try again later",
+				"error_code": "TT.503"
+			}), 503)
+			response.headers["Retry-After"] = str(ASR_RETRY_AFTER)
+			return response
+
+		except Exception as e:
+			logger.error(f"Error during speech recognition process: {e}. Aborting request...")
 			return make_response(jsonify({
 				"status": "Failed",
 				"message": GENERAL_ERROR_MESSAGE,
 				"error_code": "TT.500"
 			}), 500)
 
-		logger.debug("Processing audio data with model...")
+		logger.info("Return successfull response...")
+		return make_response(jsonify({
+			"status": "Success",
+			"message": "Speech recognition process completed successfully",
+			"text": text
+		}), 201)
+
+
+class SpeechRecognitionBatch(Resource):
+	@jwt_required()
+	def post(self) -> Response:
+		logger.debug("Starting batch speech recognition process...")
+
+		logger.debug("Checking request data...")
+		clips: list[Optional[bytes | BinaryIO]] = []
+		mimetypes: Optional[list[Optional[str]]] = None
+		mode: Optional[str] = request.args.get("mode")
+		multipart: bool = request.mimetype == "multipart/form-data" and "audio" in request.files
+		if multipart:
+			files: list[FileStorage] = request.files.getlist("audio")
+			clips_count: int = len(files)
+		else:
+			args: Namespace = create_speech_recognition_batch_model_parser()
+			clips_count = len(args["clips"])
+
+		# The batch size is checked before any clip is read or decoded
+		if clips_count > ASR_BATCH_MAX_CLIPS:
+			logger.error("Too many clips in batch. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": f"A batch can have at most {ASR_BATCH_MAX_CLIPS} clips",
+				"error_code": "TT.D400"
+			}), 400)
+
+		if multipart:
+			logger.debug("Reading audio data from multipart files...")
+			clips = [file.stream for file in files]
+			mimetypes = [part_audio_mimetype(file.mimetype) for file in files]
+			mode = request.form.get("mode", mode)
+
+		else:
+			mode = args["mode"]
+
+			logger.debug("Decoding audio data...")
+			for clip in args["clips"]:
+				try:
+					clips.append(b64decode(clip))
+
+				except Exception as e:
+					# The clip fails on its own without failing the batch
+					logger.error(f"Error decoding batch clip: {e}")
+					clips.append(None)
+
+		logger.debug("Getting speech recognition mode grammar...")
 		try:
-			text: str = speech_recognition()
+			grammar: Optional[str] = get_mode_grammar(mode)
+
+		except ValueError as e:
+			logger.error(f"Invalid speech recognition mode: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": f"Mode must be one of: {', '.join(ASR_MODES)}",
+				"error_code": "TT.D400"
+			}), 400)
 
 		except Exception as e:
-			logger.error(f"Error during speech recognition process: {e}. Aborting request...")
+			logger.error(f"Error getting speech recognition grammar: {e}. Aborting request...")
 			return make_response(jsonify({
 				"status": "Failed",
 				"message": GENERAL_ERROR_MESSAGE,
 				"error_code": "TT.500"
 			}), 500)
 
-		logger.info("Deleting temp audio file...")
+		logger.debug(f"Processing {len(clips)} audio clips with model...")
 		try:
-			remove(join("/tmp", TEMP_FILE_NAME))
+			with model_requests.admitted_request():
+				results: list[dict] = speech_recognition_batch(clips, grammar, mimetypes)
+
+		except WorkerPoolFull:
+			logger.error("Too many model requests in flight. Aborting request...")
+			response: Response = make_response(jsonify({
+				"status": "Failed",
+				"message": "Speech recognition service is busy, try again later",
+				"error_code": "TT.503"
+			}), 503)
+			response.headers["Retry-After"] = str(ASR_RETRY_AFTER)
+			return response
 
 		except Exception as e:
-			logger.error(f"Error deleting audio file: {e}. Aborting request...")
+			logger.error(f"Error during batch speech recognition process: {e}. Aborting request...")
 			return make_response(jsonify({
 				"status": "Failed",
 				"message": GENERAL_ERROR_MESSAGE,
@@ -79,11 +226,47 @@ class SpeechRecognition(Resource):
 		logger.info("Return successfull response...")
 		return make_response(jsonify({
 			"status": "Success",
-			"message": "Speech recognition process completed successfully",
-			"text": text
+			"message": "Batch speech recognition process completed successfully",
+			"results": results
 		}), 201)
 
 
+class SpeechRecognitionStats(Resource):
+	@jwt_required()
+	def get(self) -> Response:
+		logger.debug("Getting speech recognition stats...")
+
+		logger.info("Checking user permissions...")
+		jwt_data: dict = get_jwt()
+		is_admin: bool = jwt_data["sub"]["is_admin"]
+		if not is_admin:
+			logger.error("Forbidden access for given user. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": "Forbidden access",
+				"error_code": "TT.D403"
+			}), 403)
+
+		try:
+			stats: dict = asr_stats()
+			stats["grammar"] = place_grammar.stats()
+
+		except Exception as e:
+			logger.error(f"Error getting speech recognition stats: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		logger.info("Returning speech recognition stats...")
+		return make_response(jsonify({
+			"status": "Success",
+			"message": "Speech recognition stats retrieved successfully",
+			"stats": stats
+		}), 200)
+
+
 class Agent(Resource):
 	@jwt_required()
 	def post(self, id: int) -> Response:
@@ -112,6 +295,16 @@ class Agent(Resource):
 		}), 201)
 
 
+def tts_busy_response() -> Response:
+	response: Response = make_response(jsonify({
+		"status": "Failed",
+		"message": "TTS service is busy, try again later",
+		"error_code": "TT.503"
+	}), 503)
+	response.headers["Retry-After"] = str(TTS_RETRY_AFTER)
+	return response
+
+
 class TTS(Resource):
 	@jwt_required()
 	def post(self) -> Response:
@@ -119,11 +312,22 @@ class TTS(Resource):
 
 		logger.debug("Checking request data...")
 		args: Namespace = create_tts_model_parser()
+		mimetype: str = request.accept_mimetypes.best_match(TTS_OUTPUT_MIMETYPES, default=TTS_OUTPUT_MIMETYPES[0])
 
 		logger.debug("Procesing text with TTS model...")
 
 		try:
-			audio_data: dict = tts_func(args["text"])
+			# ASR and TTS requests share the server threads, so they share the admission limit
+			with model_requests.admitted_request():
+				wav: bytes = synthesize_wav(args["text"])
+			if mimetype == "application/json":
+				audio_data: dict = wav_to_audio_data(wav)
+			else:
+				audio: bytes = encode_audio(wav, mimetype)
+
+		except WorkerPoolFull:
+			logger.error("TTS queue is full. Aborting request...")
+			return tts_busy_response()
 
 		except Exception as e:
 			logger.error(f"Error during tts process: {e}.\nAborting request...")
@@ -134,13 +338,153 @@ class TTS(Resource):
 			}), 500)
 
 		logger.info("TTS process completed successfully")
+		if mimetype != "application/json":
+			response = Response(audio, status=201, mimetype=mimetype)
+		else:
+			response = make_response(jsonify({
+				"status": "Success",
+				"message": "TTS process completed successfully",
+				"audio_data": audio_data
+			}), 201)
+
+		# Caches must not serve one format to a client that asked for another
+		response.vary.add("Accept")
+		return response
+
+
+class TTSStream(Resource):
+	@jwt_required()
+	def post(self) -> Response:
+		logger.debug("Starting streaming tts process...")
+
+		logger.debug("Checking request data...")
+		args: Namespace = create_tts_model_parser()
+
+		def events(text: str) -> Iterator[str]:
+			sentences: int = 0
+			try:
+				for chunk in tts_stream(text):
+					sentences += 1
+					yield f"event: audio\ndata: {json.dumps(chunk)}\n\n"
+
+			except Exception as e:
+				logger.error(f"Error during streaming tts process: {e}")
+				yield f"event: error\ndata: {json.dumps({'message': GENERAL_ERROR_MESSAGE, 'error_code': 'TT.500'})}\n\n"
+				return
+
+			logger.info(f"Streaming tts process completed successfully with {sentences} sentences")
+			yield f"event: end\ndata: {json.dumps({'sentences': sentences})}\n\n"
+
+		# The stream holds a server thread for the whole synthesis
+		try:
+			model_requests.admit()
+
+		except WorkerPoolFull:
+			logger.error("Too many model requests in flight. Aborting request...")
+			return tts_busy_response()
+
+		try:
+			response: Response = Response(stream_with_context(events(args["text"])), mimetype="text/event-stream")
+			response.call_on_close(model_requests.release)
+
+		except Exception:
+			model_requests.release()
+			raise
+
+		response.headers["Cache-Control"] = "no-cache"
+		response.headers["X-Accel-Buffering"] = "no"
+		return response
+
+
+class TTSBatch(Resource):
+	@jwt_required()
+	def post(self) -> Response:
+		logger.debug("Starting batch tts process...")
+
+		logger.debug("Checking request data...")
+		args: Namespace = create_tts_batch_model_parser()
+		if len(args["texts"]) > TTS_BATCH_MAX_TEXTS:
+			logger.error("Too many texts in batch. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": f"A batch can have at most {TTS_BATCH_MAX_TEXTS} texts",
+				"error_code": "TT.D400"
+			}), 400)
+
+		def lines(texts: list[str]) -> Iterator[str]:
+			results: int = 0
+			try:
+				for result in tts_batch(texts):
+					results += 1
+					yield f"{json.dumps(result)}\n"
+
+			except Exception as e:
+				logger.error(f"Error during batch tts process: {e}")
+				yield f"{json.dumps({'status': 'Failed', 'message': GENERAL_ERROR_MESSAGE, 'error_code': 'TT.500'})}\n"
+				return
+
+			logger.info(f"Batch tts process completed successfully with {results} texts")
+
+		try:
+			model_requests.admit()
+
+		except WorkerPoolFull:
+			logger.error("Too many model requests in flight. Aborting request...")
+			return tts_busy_response()
+
+		try:
+			response: Response = Response(stream_with_context(lines(args["texts"])), mimetype="application/x-ndjson")
+			response.call_on_close(model_requests.release)
+
+		except Exception:
+			model_requests.release()
+			raise
+
+		response.headers["Cache-Control"] = "no-cache"
+		response.headers["X-Accel-Buffering"] = "no"
+		return response
+
+
+class TTSStats(Resource):
+	@jwt_required()
+	def get(self) -> Response:
+		logger.debug("Getting tts stats...")
+
+		logger.info("Checking user permissions...")
+		jwt_data: dict = get_jwt()
+		is_admin: bool = jwt_data["sub"]["is_admin"]
+		if not is_admin:
+			logger.error("Forbidden access for given user. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": "Forbidden access",
+				"error_code": "TT.D403"
+			}), 403)
+
+		try:
+			stats: dict = {**tts_stats(), "narrations": narration_renderer.stats()}
+
+		except Exception as e:
+			logger.error(f"Error getting tts stats: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		logger.info("Returning tts stats...")
 		return make_response(jsonify({
 			"status": "Success",
-			"message": "TTS process completed successfully",
-			"audio_data": audio_data
-		}), 201)
+			"message": "TTS stats retrieved successfully",
+			"stats": stats
+		}), 200)
 
 
 api.add_resource(TTS, "/tts")
+api.add_resource(TTSStream, "/tts/stream")
+api.add_resource(TTSBatch, "/tts/batch")
+api.add_resource(TTSStats, "/tts/stats")
 api.add_resource(Agent, "/agent/<int:id>")
 api.add_resource(SpeechRecognition, "/asr")
+api.add_resource(SpeechRecognitionBatch, "/asr/batch")
+api.add_resource(SpeechRecognitionStats, "/asr/stats")
@@ -1,19 +1,22 @@
 from os import getenv
 from typing import Any
+from os.path import isfile
 from dotenv import load_dotenv
 from requests import Response
 from logging import Logger, getLogger
 from sqlalchemy.orm.query import Query
 from flask_restful import Api, Resource
-from werkzeug.exceptions import NotFound
+from werkzeug.exceptions import NotFound, RequestedRangeNotSatisfiable
 from sqlalchemy.exc import IntegrityError
 from flask_restful.reqparse import Namespace
 from flask_jwt_extended import jwt_required, get_jwt
-from flask import Blueprint, Response, make_response, jsonify
+from flask import Blueprint, Response, make_response, jsonify, send_file
 
 from app.resources.config import *
 from app.resources.parsers import *
 from app.resources.database import db
+from app.resources.grammar import place_grammar
+from app.resources.narration import narration_renderer
 from app.resources.functions import get_place_distance
 from app.resources.models import Place, Review, Address, Favorite, User
 
@@ -329,6 +332,10 @@ class PlaceList(Resource):
 				"error_code": "TT.500"
 			}), 500)
 
+		# New names must be part of the speech recognition grammar
+		place_grammar.invalidate()
+		narration_renderer.schedule(new_place.id, new_place.description)
+
 		logger.debug("Returning place id...")
 		return make_response(jsonify({
 			"status": "Success",
@@ -526,6 +533,8 @@ class PlaceDetail(Resource):
 			}), 500)
 
 		logger.debug("Updating place...")
+		# The narration is only rendered again when the description actually changes
+		description_changed: bool = bool(args["description"]) and args["description"] != place.description
 		if args["name"]:
 			place.name = args["name"]
 		if args["classification"]:
@@ -601,6 +610,10 @@ class PlaceDetail(Resource):
 				"error_code": "TT.500"
 			}), 500)
 
+		place_grammar.invalidate()
+		if description_changed:
+			narration_renderer.schedule(id, place.description)
+
 		logger.debug("Returning place id...")
 		return make_response(jsonify({
 			"status": "Success",
@@ -658,6 +671,9 @@ class PlaceDetail(Resource):
 				"error_code": "TT.500"
 			}), 500)
 
+		place_grammar.invalidate()
+		narration_renderer.remove(id)
+
 		logger.debug("Returning success message...")
 		return make_response(jsonify({
 			"status": "Success",
@@ -665,5 +681,79 @@ class PlaceDetail(Resource):
 		}), 200)
 
 
+class PlaceNarration(Resource):
+	@jwt_required()
+	def get(self, id: int) -> Response:
+		logger.debug(f"Getting narration of place with id {id}...")
+
+		path: str = narration_renderer.path(id)
+		if isfile(path):
+			try:
+				# Conditional responses answer If-None-Match with 304 and Range with 206
+				return send_file(path, mimetype=narration_renderer.mimetype, conditional=True, etag=True)
+
+			except RequestedRangeNotSatisfiable as e:
+				logger.error("Requested range not satisfiable. Aborting request...")
+				response: Response = make_response(jsonify({
+					"status": "Failed",
+					"message": "Requested range not satisfiable",
+					"error_code": "TT.D416"
+				}), 416)
+				if e.length is not None:
+					response.headers["Content-Range"] = f"bytes */{e.length}"
+				return response
+
+			except FileNotFoundError:
+				logger.debug("Narration deleted while being sent...")
+
+			except Exception as e:
+				logger.error(f"Error sending narration: {e}. Aborting request...")
+				return make_response(jsonify({
+					"status": "Failed",
+					"message": GENERAL_ERROR_MESSAGE,
+					"error_code": "TT.500"
+				}), 500)
+
+		logger.debug("Checking if place exists...")
+		try:
+			place: Place = Place.query.get_or_404(id)
+
+		except NotFound:
+			logger.error("Place not found. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": "Place not found",
+				"error_code": "TT.D404"
+			}), 404)
+
+		except Exception as e:
+			logger.error(f"Error checking if place exists: {e}. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": GENERAL_ERROR_MESSAGE,
+				"error_code": "TT.500"
+			}), 500)
+
+		# Without a text there is nothing to render, so clients must not keep retrying
+		if not NARRATIONS_ENABLED or not place.description or not place.description.strip():
+			logger.error("Place has no narration. Aborting request...")
+			return make_response(jsonify({
+				"status": "Failed",
+				"message": "Place has no description to narrate" if NARRATIONS_ENABLED else "Narrations are disabled",
+				"error_code": "TT.D404"
+			}), 404)
+
+		# Places created before narrations existed are rendered the first time they are asked for
+		narration_renderer.schedule(place.id, place.description)
+
+		logger.info("Narration not rendered yet")
+		return make_response(jsonify({
+			"status": "Failed",
+			"message": "Narration not rendered yet, try again later",
+			"error_code": "TT.D404"
+		}), 404)
+
+
 api.add_resource(PlaceList, '/')
 api.add_resource(PlaceDetail, "/<int:id>")
+api.add_resource(PlaceNarration, "/<int:id>/narration")
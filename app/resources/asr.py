@@ -0,0 +1,531 @@
+import json
+from os.path import isdir
+from hashlib import blake2b
+from os import getpid
+from threading import BoundedSemaphore, Condition, Lock
+from contextlib import contextmanager
+from logging import Logger, getLogger
+from typing import Iterable, Iterator, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from vosk import Model, KaldiRecognizer, SetLogLevel
+
+from app.resources.config import *
+from app.resources.audio import audio_stats
+from app.resources.cache import LRUCache, DiskCache
+from app.resources.workers import WorkerPool, WorkerPoolFull, model_requests
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.asr")
+
+# Vosk only accepts objects cffi can pass as a char pointer, wrapping any other
+# buffer (like memoryview slices of the request body) avoids copying it to bytes
+try:
+	from vosk import _ffi
+	as_waveform = _ffi.from_buffer
+except ImportError:
+	as_waveform = bytes
+
+
+###############################################################################
+########################### Recognizer Pool ###################################
+###############################################################################
+
+models: dict[str, Model] = {}
+models_lock: Lock = Lock()
+
+
+def get_model(model_path: str) -> Model:
+	""" Loads a Vosk model once per process """
+	model: Optional[Model] = models.get(model_path)
+	if model is None:
+		with models_lock:
+			model = models.get(model_path)
+			if model is None:
+				logger.info(f"Loading Vosk model from {model_path}...")
+				model = Model(model_path=model_path)
+				models[model_path] = model
+
+	return model
+
+
+class RecognizerPoolBusy(Exception):
+	""" Raised when no recognizer is freed before the acquire timeout """
+
+
+class RecognizerPool:
+	""" Process-wide pool of reusable Vosk recognizers sharing one loaded model """
+
+	def __init__(self, model_path: str, grammar: Optional[str] = None, size: int = ASR_RECOGNIZER_POOL_SIZE) -> None:
+		self.model_path: str = model_path
+		self.grammar: Optional[str] = grammar
+		self.size: int = size
+		self.recognizers: list[KaldiRecognizer] = []
+		# Waiters are woken by a released recognizer or by a discarded one freeing its place
+		self.condition: Condition = Condition()
+
+		self.created: int = 0
+		self.hits: int = 0
+		self.waits: int = 0
+		self.timeouts: int = 0
+
+	def load_model(self) -> Model:
+		return get_model(self.model_path)
+
+	def create_recognizer(self) -> KaldiRecognizer:
+		if self.grammar is not None:
+			recognizer: KaldiRecognizer = KaldiRecognizer(self.load_model(), SAMPLING_RATE, self.grammar)
+		else:
+			recognizer = KaldiRecognizer(self.load_model(), SAMPLING_RATE)
+
+		# Word confidences decide whether a transcript is escalated to the large model
+		if cascade_available():
+			recognizer.SetWords(True)
+
+		return recognizer
+
+	def discard(self) -> None:
+		with self.condition:
+			self.created -= 1
+			self.condition.notify()
+
+	def acquire(self, timeout: Optional[float] = None) -> KaldiRecognizer:
+		with self.condition:
+			if not self.recognizers and self.created >= self.size:
+				logger.debug("Recognizer pool exhausted, waiting for a free recognizer...")
+				self.waits += 1
+				if not self.condition.wait_for(lambda: self.recognizers or self.created < self.size, timeout=timeout):
+					self.timeouts += 1
+					raise RecognizerPoolBusy(f"No free recognizer after {timeout} seconds")
+
+			if self.recognizers:
+				self.hits += 1
+				return self.recognizers.pop()
+
+			self.created += 1
+
+		try:
+			return self.create_recognizer()
+
+		except Exception:
+			self.discard()
+			raise
+
+	def release(self, recognizer: KaldiRecognizer) -> None:
+		try:
+			recognizer.Reset()
+
+		except Exception as e:
+			logger.error(f"Error resetting recognizer, discarding it: {e}")
+			self.discard()
+			return
+
+		with self.condition:
+			self.recognizers.append(recognizer)
+			self.condition.notify()
+
+	@contextmanager
+	def recognizer(self, timeout: Optional[float] = None) -> Iterator[KaldiRecognizer]:
+		recognizer: KaldiRecognizer = self.acquire(timeout)
+		try:
+			yield recognizer
+		finally:
+			self.release(recognizer)
+
+	def stats(self) -> dict:
+		with self.condition:
+			return {
+				"model_path": self.model_path,
+				"model_loaded": self.model_path in models,
+				"grammar": self.grammar is not None,
+				"size": self.size,
+				"created": self.created,
+				"available": len(self.recognizers),
+				"hits": self.hits,
+				"waits": self.waits,
+				"timeouts": self.timeouts
+			}
+
+
+recognizer_pools: dict[tuple[str, Optional[str]], RecognizerPool] = {}
+recognizer_pools_lock: Lock = Lock()
+
+
+def get_recognizer_pool(model_path: str = VOSK_ABSPATH, grammar: Optional[str] = None) -> RecognizerPool:
+	""" Returns the pool of the given model and grammar, creating it on first use """
+	key: tuple[str, Optional[str]] = (model_path, grammar)
+	pool: Optional[RecognizerPool] = recognizer_pools.get(key)
+	if pool is None:
+		with recognizer_pools_lock:
+			pool = recognizer_pools.get(key)
+			if pool is None:
+				if grammar is not None:
+					# A new grammar replaces the previous one of the same model
+					for other in [other for other in recognizer_pools if other[0] == model_path and other[1] is not None]:
+						del recognizer_pools[other]
+
+				pool = RecognizerPool(model_path, grammar)
+				recognizer_pools[key] = pool
+
+	return pool
+
+
+def recognizer_pools_stats() -> list[dict]:
+	return [pool.stats() for pool in list(recognizer_pools.values())]
+
+
+# Pools of the worker processes, as reported with their last transcription
+worker_recognizer_pools: dict[int, list[dict]] = {}
+worker_recognizer_pools_lock: Lock = Lock()
+
+
+###############################################################################
+############################## Decoding #######################################
+###############################################################################
+
+def join_results(results: list[dict]) -> str:
+	return f"{' '.join([res['text'] for res in results])}."
+
+
+def mean_confidence(results: list[dict]) -> Optional[float]:
+	""" Mean word confidence of recognizer results, only present when SetWords is enabled """
+	confidences: list[float] = [word["conf"] for res in results for word in res.get("result", [])]
+	if not confidences:
+		return None
+
+	return sum(confidences) / len(confidences)
+
+
+class StreamDecoder:
+	""" Feeds audio chunks to a recognizer and keeps track of the recognized text """
+
+	def __init__(self, recognizer: KaldiRecognizer) -> None:
+		self.recognizer: KaldiRecognizer = recognizer
+		self.results: list[dict] = []
+		self.partial: str = ""
+
+	def accept(self, data: bytes | memoryview) -> Optional[dict]:
+		""" Returns a result or partial result event if the transcript changed """
+		if len(data) == 0:
+			return None
+		if not isinstance(data, bytes):
+			data = as_waveform(data)
+
+		if self.recognizer.AcceptWaveform(data):
+			result: dict = json.loads(self.recognizer.Result())
+			self.results.append(result)
+			self.partial = ""
+			return {"type": "result", "text": result["text"]}
+
+		partial: str = json.loads(self.recognizer.PartialResult())["partial"]
+		if partial != self.partial:
+			self.partial = partial
+			return {"type": "partial", "text": partial}
+
+		return None
+
+	def finish(self) -> str:
+		self.results.append(json.loads(self.recognizer.FinalResult()))
+		return join_results(self.results)
+
+
+def decode_results(recognizer: KaldiRecognizer, chunks: Iterable[bytes | memoryview]) -> list[dict]:
+	results: list[dict] = []
+	for data in chunks:
+		if len(data) == 0:
+			continue
+		if not isinstance(data, bytes):
+			data = as_waveform(data)
+		if recognizer.AcceptWaveform(data):
+			results.append(json.loads(recognizer.Result()))
+
+	results.append(json.loads(recognizer.FinalResult()))
+
+	return results
+
+
+def split_chunks(data: bytes | memoryview, chunk_size: int) -> Iterator[memoryview]:
+	view: memoryview = memoryview(data)
+	for start in range(0, len(view), chunk_size):
+		yield view[start:start + chunk_size]
+
+
+###############################################################################
+########################### Transcript Cache ##################################
+###############################################################################
+
+class TranscriptCache:
+	""" Transcripts of already decoded audio, keyed by a hash of the normalized PCM """
+
+	def __init__(self) -> None:
+		self.memory: LRUCache = LRUCache(ASR_CACHE_MAX_ITEMS)
+		self.disk: Optional[DiskCache] = DiskCache(
+			ASR_CACHE_ABSPATH,
+			ASR_CACHE_DISK_MAX_BYTES,
+			suffix=".txt"
+		) if ASR_CACHE_DISK_ENABLED else None
+
+	def key(self, pcm: bytes, grammar: Optional[str] = None, model_path: str = VOSK_ABSPATH) -> str:
+		# The same audio gives a different transcript with another model or grammar
+		digest = blake2b(pcm, digest_size=20)
+		digest.update(model_path.encode())
+		digest.update(b"\0")
+		# or once a large model is installed that low-confidence transcripts escalate to
+		if cascade_available():
+			digest.update(f"{VOSK_LARGE_ABSPATH}\0{ASR_CASCADE_CONFIDENCE_THRESHOLD}".encode())
+		digest.update(b"\0")
+		if grammar is not None:
+			digest.update(grammar.encode())
+		return digest.hexdigest()
+
+	def get(self, key: str) -> Optional[str]:
+		text: Optional[str] = self.memory.get(key)
+		if text is not None or self.disk is None:
+			return text
+
+		data: Optional[bytes] = self.disk.get(key)
+		if data is None:
+			return None
+
+		text = data.decode()
+		self.memory.put(key, text)
+		return text
+
+	def put(self, key: str, text: str) -> None:
+		self.memory.put(key, text)
+		if self.disk is not None:
+			self.disk.put(key, text.encode())
+
+	def stats(self) -> dict:
+		return {
+			"memory": self.memory.stats(),
+			"disk": self.disk.stats() if self.disk is not None else None
+		}
+
+
+transcript_cache: Optional[TranscriptCache] = TranscriptCache() if ASR_CACHE_ENABLED else None
+
+
+###############################################################################
+########################### Worker Processes ##################################
+###############################################################################
+
+def cascade_available() -> bool:
+	return ASR_CASCADE_ENABLED and isdir(VOSK_LARGE_ABSPATH)
+
+
+def init_asr_worker() -> None:
+	""" Loads the models when an ASR worker process starts """
+	SetLogLevel(-1)
+	get_recognizer_pool().load_model()
+	if cascade_available():
+		get_recognizer_pool(VOSK_LARGE_ABSPATH).load_model()
+
+
+def transcribe_pcm(pcm: bytes, grammar: Optional[str] = None) -> dict:
+	""" Transcribes 16 bit mono PCM at SAMPLING_RATE with a pooled recognizer
+
+	Free-form transcripts whose mean word confidence is under the cascade threshold
+	are decoded again with the large model. Large models have a static decoding graph
+	and can't take a grammar, so grammar transcripts always stay on the small model.
+	"""
+	with get_recognizer_pool(grammar=grammar).recognizer() as recognizer:
+		results: list[dict] = decode_results(recognizer, split_chunks(pcm, FRAMES_FLOW * 2))
+
+	confidence: Optional[float] = mean_confidence(results)
+	escalate: bool = (
+		grammar is None
+		and confidence is not None
+		and confidence < ASR_CASCADE_CONFIDENCE_THRESHOLD
+		and cascade_available()
+	)
+	if escalate:
+		with get_recognizer_pool(VOSK_LARGE_ABSPATH).recognizer() as recognizer:
+			results = decode_results(recognizer, split_chunks(pcm, FRAMES_FLOW * 2))
+
+	return {
+		"text": join_results(results),
+		"confidence": confidence,
+		"escalated": escalate,
+		# The pools live in the worker process, their stats travel back with the result
+		"pid": getpid(),
+		"recognizer_pools": recognizer_pools_stats()
+	}
+
+
+class CascadeStats:
+	""" Fraction of transcriptions escalated from the small to the large model """
+
+	def __init__(self) -> None:
+		self.lock: Lock = Lock()
+		self.transcriptions: int = 0
+		self.scored: int = 0
+		self.escalated: int = 0
+		self.confidence_total: float = 0.0
+
+	def record(self, transcription: dict) -> None:
+		with self.lock:
+			self.transcriptions += 1
+			if transcription["confidence"] is not None:
+				self.scored += 1
+				self.confidence_total += transcription["confidence"]
+			if transcription["escalated"]:
+				self.escalated += 1
+
+	def stats(self) -> dict:
+		with self.lock:
+			return {
+				"enabled": cascade_available(),
+				"threshold": ASR_CASCADE_CONFIDENCE_THRESHOLD,
+				"large_model_path": VOSK_LARGE_ABSPATH,
+				"transcriptions": self.transcriptions,
+				"escalated": self.escalated,
+				"escalation_rate": self.escalated / self.transcriptions if self.transcriptions else None,
+				"confidence_avg": self.confidence_total / self.scored if self.scored else None
+			}
+
+
+cascade_stats: CascadeStats = CascadeStats()
+
+
+asr_worker_pool: Optional[WorkerPool] = WorkerPool(
+	"asr",
+	workers=ASR_WORKERS,
+	queue_depth=ASR_QUEUE_DEPTH,
+	initializer=init_asr_worker
+) if ASR_WORKERS > 0 else None
+
+
+# Without worker processes jobs run on threads bounded by the recognizer pool
+asr_thread_pool: Optional[ThreadPoolExecutor] = ThreadPoolExecutor(
+	max_workers=ASR_RECOGNIZER_POOL_SIZE,
+	thread_name_prefix="asr"
+) if asr_worker_pool is None else None
+
+# The thread executor queue has no limit, so pending jobs are bounded like the worker pool ones
+asr_thread_slots: Optional[BoundedSemaphore] = BoundedSemaphore(
+	ASR_RECOGNIZER_POOL_SIZE + ASR_QUEUE_DEPTH
+) if asr_worker_pool is None else None
+
+
+def reserve_transcription(block: bool = False, timeout: Optional[float] = None) -> None:
+	""" Takes an ASR queue slot before the audio is read, raises WorkerPoolFull if the queue is full """
+	if asr_worker_pool is not None:
+		asr_worker_pool.reserve(block, timeout)
+	elif not asr_thread_slots.acquire(blocking=block, timeout=timeout if block else None):
+		raise WorkerPoolFull("asr thread pool queue is full")
+
+
+def unreserve_transcription() -> None:
+	""" Gives back a slot taken by reserve_transcription that no transcription used """
+	if asr_worker_pool is not None:
+		asr_worker_pool.unreserve()
+	else:
+		asr_thread_slots.release()
+
+
+def submit_transcription(
+		pcm: bytes,
+		grammar: Optional[str] = None,
+		block: bool = False,
+		timeout: Optional[float] = None,
+		reserved: bool = False
+	) -> Future:
+	""" Sends a transcription to the ASR workers, raises WorkerPoolFull if the queue is full
+
+	Reserved transcriptions use the slot taken by reserve_transcription, which is given back
+	when the transcript comes from the cache.
+	"""
+	key: Optional[str] = None
+	if transcript_cache is not None:
+		key = transcript_cache.key(pcm, grammar)
+		text: Optional[str] = transcript_cache.get(key)
+		if text is not None:
+			logger.debug("Transcript found in cache")
+			if reserved:
+				unreserve_transcription()
+			future: Future = Future()
+			future.set_result(text)
+			return future
+
+	if asr_worker_pool is None:
+		job: Future = submit_thread_transcription(pcm, grammar, block, timeout, reserved)
+	else:
+		job = asr_worker_pool.submit(transcribe_pcm, pcm, grammar, block=block, timeout=timeout, reserved=reserved)
+
+	future = Future()
+	job.add_done_callback(lambda done: finish_transcription(done, future, key))
+
+	return future
+
+
+def submit_thread_transcription(
+		pcm: bytes,
+		grammar: Optional[str],
+		block: bool,
+		timeout: Optional[float],
+		reserved: bool = False
+	) -> Future:
+	""" Runs a transcription on the ASR threads, raises WorkerPoolFull if every slot is taken """
+	slots: BoundedSemaphore = asr_thread_slots
+	if not reserved and not slots.acquire(blocking=block, timeout=timeout if block else None):
+		raise WorkerPoolFull("asr thread pool queue is full")
+
+	try:
+		job: Future = asr_thread_pool.submit(transcribe_pcm, pcm, grammar)
+
+	except Exception:
+		slots.release()
+		raise
+
+	job.add_done_callback(lambda done: slots.release())
+
+	return job
+
+
+def finish_transcription(job: Future, future: Future, key: Optional[str]) -> None:
+	""" Records the worker transcription metrics and resolves the text future """
+	if job.cancelled():
+		future.cancel()
+		return
+
+	error: Optional[BaseException] = job.exception()
+	if error is not None:
+		future.set_exception(error)
+		return
+
+	transcription: dict = job.result()
+	cascade_stats.record(transcription)
+	with worker_recognizer_pools_lock:
+		worker_recognizer_pools[transcription["pid"]] = transcription["recognizer_pools"]
+
+	if key is not None:
+		try:
+			transcript_cache.put(key, transcription["text"])
+
+		except Exception as e:
+			logger.error(f"Error caching transcript: {e}")
+
+	future.set_result(transcription["text"])
+
+
+def asr_stats() -> dict:
+	worker_pool: Optional[dict] = asr_worker_pool.stats() if asr_worker_pool is not None else None
+
+	# Pools of workers that were replaced are left out
+	worker_pids: set[int] = {worker["pid"] for worker in worker_pool["worker_processes"]} if worker_pool is not None else set()
+	with worker_recognizer_pools_lock:
+		for pid in [pid for pid in worker_recognizer_pools if pid not in worker_pids]:
+			del worker_recognizer_pools[pid]
+		worker_pools: list[dict] = [{"pid": pid, "pools": pools} for pid, pools in worker_recognizer_pools.items()]
+
+	return {
+		# Pools of this process, used by the WebSocket streams, and by every transcription without workers
+		"recognizer_pools": recognizer_pools_stats(),
+		"worker_recognizer_pools": worker_pools,
+		"worker_pool": worker_pool,
+		# Shared with TTS
+		"model_requests": model_requests.stats(),
+		"transcript_cache": transcript_cache.stats() if transcript_cache is not None else None,
+		"cascade": cascade_stats.stats(),
+		"preprocessing": audio_stats()
+	}
@@ -0,0 +1,191 @@
+import json
+from time import monotonic
+from flask import Flask
+from threading import Thread
+from soxr import ResampleStream
+from contextlib import ExitStack
+from vosk import KaldiRecognizer
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+from logging import Logger, getLogger
+from flask_jwt_extended import decode_token
+from websockets.sync.server import serve, ServerConnection
+from websockets.exceptions import ConnectionClosed
+
+from app.resources.config import *
+from app.resources.grammar import get_mode_grammar
+from app.resources.audio import AudioNormalizer, LowPassFilter, resampler_cache
+from app.resources.asr import RecognizerPoolBusy, StreamDecoder, get_recognizer_pool, split_chunks
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.asr_stream")
+
+# Streamed audio is 16 bit PCM, mono or stereo, at the rate given on connection
+SAMPLE_WIDTH: int = 2
+MAX_CHANNELS: int = 2
+MAX_MESSAGE_SIZE: int = FRAMES_PER_BUFFER * SAMPLE_WIDTH * MAX_CHANNELS
+FEED_SIZE: int = FRAMES_FLOW * SAMPLE_WIDTH
+
+
+class UnsupportedMessage(Exception):
+	""" Raised when a text message is not a JSON object control event """
+
+
+def get_control_event(message: str) -> Optional[str]:
+	try:
+		return json.loads(message).get("event")
+
+	except (ValueError, AttributeError) as e:
+		raise UnsupportedMessage(f"Invalid control message: {e}")
+
+
+def get_stream_query(websocket: ServerConnection) -> dict[str, str]:
+	query: dict[str, list[str]] = parse_qs(urlparse(websocket.request.path).query)
+	return {key: values[0] for key, values in query.items()}
+
+
+def get_stream_token(websocket: ServerConnection) -> Optional[str]:
+	""" Gets the JWT from the Authorization header or the token query parameter """
+	authorization: Optional[str] = websocket.request.headers.get("Authorization")
+	if authorization and authorization.startswith("Bearer "):
+		return authorization[len("Bearer "):]
+
+	return get_stream_query(websocket).get("token")
+
+
+def handle_asr_stream(app: Flask, websocket: ServerConnection) -> None:
+	logger.debug("Starting streaming speech recognition session...")
+
+	logger.debug("Checking session token...")
+	token: Optional[str] = get_stream_token(websocket)
+	try:
+		if token is None:
+			raise ValueError("Missing token")
+
+		with app.app_context():
+			decode_token(token)
+
+	except Exception as e:
+		logger.error(f"Invalid token for streaming session: {e}. Closing connection...")
+		websocket.close(code=1008, reason="Invalid token")
+		return
+
+	try:
+		query: dict[str, str] = get_stream_query(websocket)
+		framerate: int = int(query.get("sample_rate", SAMPLING_RATE))
+		nchannels: int = int(query.get("channels", CHANNELS))
+		if nchannels > MAX_CHANNELS:
+			raise ValueError(f"Unsupported number of channels: {nchannels}")
+		normalizer: AudioNormalizer = AudioNormalizer(framerate, SAMPLE_WIDTH, nchannels)
+
+		with app.app_context():
+			grammar: Optional[str] = get_mode_grammar(query.get("mode"))
+		lowpass_filter: Optional[LowPassFilter] = LowPassFilter() if ASR_LOWPASS_ENABLED else None
+
+	except ValueError as e:
+		logger.error(f"Invalid parameters for streaming session: {e}. Closing connection...")
+		websocket.close(code=1003, reason="Invalid audio format or mode")
+		return
+
+	except Exception as e:
+		logger.error(f"Error preparing streaming session: {e}. Closing connection...")
+		websocket.close(code=1011, reason=GENERAL_ERROR_MESSAGE)
+		return
+
+	try:
+		with ExitStack() as stack:
+			# A session keeps its recognizer until it ends, so new ones can't wait forever for one
+			recognizer: KaldiRecognizer = stack.enter_context(get_recognizer_pool(grammar=grammar).recognizer(ASR_STREAM_ACQUIRE_TIMEOUT))
+			resampler: Optional[ResampleStream] = None
+			if framerate != SAMPLING_RATE:
+				resampler = stack.enter_context(resampler_cache.resampler(framerate))
+
+			decoder: StreamDecoder = StreamDecoder(recognizer)
+
+			def feed(pcm: bytes | memoryview) -> None:
+				if lowpass_filter is not None:
+					pcm = lowpass_filter.process(pcm)
+				for chunk in split_chunks(pcm, FEED_SIZE):
+					event: Optional[dict] = decoder.accept(chunk)
+					if event is not None:
+						websocket.send(json.dumps(event))
+
+			# Messages reset the idle timeout, the deadline caps the whole session
+			deadline: float = monotonic() + ASR_STREAM_MAX_SECONDS
+			too_long: bool = False
+			while True:
+				remaining: float = deadline - monotonic()
+				if remaining <= 0:
+					logger.error("Streaming session reached its maximum length. Finishing it...")
+					too_long = True
+					break
+
+				try:
+					message: str | bytes = websocket.recv(timeout=min(ASR_STREAM_IDLE_TIMEOUT, remaining))
+
+				except TimeoutError:
+					if monotonic() < deadline:
+						raise
+					continue
+
+				# Text messages are control events, binary messages are audio
+				if isinstance(message, str):
+					if get_control_event(message) == "eos":
+						break
+					continue
+
+				feed(normalizer.process(message, resampler))
+
+			if resampler is not None:
+				feed(normalizer.process(b"", resampler, last=True))
+
+			text: str = decoder.finish()
+
+		websocket.send(json.dumps({"type": "final", "text": text}))
+		if too_long:
+			websocket.close(code=1008, reason="Session too long")
+			return
+
+		websocket.close()
+		logger.info("Streaming speech recognition session completed successfully")
+
+	except RecognizerPoolBusy:
+		logger.error("No free recognizer for streaming session. Closing connection...")
+		websocket.close(code=1013, reason="Speech recognition service is busy, try again later")
+
+	except TimeoutError:
+		logger.error("Streaming session idle for too long. Closing connection...")
+		websocket.close(code=1001, reason="Idle timeout")
+
+	except UnsupportedMessage as e:
+		logger.error(f"{e}. Closing connection...")
+		websocket.close(code=1003, reason="Text messages must be JSON objects")
+
+	except ConnectionClosed:
+		logger.info("Streaming session closed by the client")
+
+	except Exception as e:
+		logger.error(f"Error during streaming speech recognition: {e}. Closing connection...")
+		websocket.close(code=1011, reason=GENERAL_ERROR_MESSAGE)
+
+
+def start_asr_stream_server(app: Flask) -> Optional[Thread]:
+	""" Serves streaming speech recognition on its own port in a daemon thread """
+	def run() -> None:
+		try:
+			with serve(
+				lambda websocket: handle_asr_stream(app, websocket),
+				ASR_STREAM_HOST,
+				ASR_STREAM_PORT,
+				max_size=MAX_MESSAGE_SIZE
+			) as server:
+				logger.info(f"Streaming speech recognition listening on port {ASR_STREAM_PORT}")
+				server.serve_forever()
+
+		except OSError as e:
+			logger.error(f"Error starting streaming speech recognition server: {e}")
+
+	thread: Thread = Thread(target=run, name="asr-stream", daemon=True)
+	thread.start()
+
+	return thread
@@ -0,0 +1,690 @@
+import wave
+import numpy as np
+from io import BytesIO
+from time import perf_counter
+from threading import Lock, Thread
+from subprocess import Popen, PIPE, TimeoutExpired
+from collections import deque
+from contextlib import contextmanager
+from logging import Logger, getLogger
+from typing import BinaryIO, Callable, Generator, Iterator, Optional
+from soxr import ResampleStream
+from functools import lru_cache
+from scipy.signal import butter, sosfilt
+
+from app.resources.config import *
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.audio")
+
+# Recognizers take 16 bit mono PCM at SAMPLING_RATE
+TARGET_SAMPWIDTH: int = 2
+
+
+class InvalidAudio(ValueError):
+	""" Raised when client audio can't be read or is outside the accepted limits """
+
+
+###############################################################################
+############################### Stage stats ###################################
+###############################################################################
+
+class StageStats:
+	""" Running totals of an audio stage, either overall or kept per key like the input rate or format """
+
+	def __init__(self, fields: tuple[str, ...], summary: Callable[[dict], dict], keyed: bool = True) -> None:
+		self.fields: tuple[str, ...] = fields
+		self.summary: Callable[[dict], dict] = summary
+		self.keyed: bool = keyed
+		self.lock: Lock = Lock()
+		self.totals: dict[Optional[int | str], dict] = {}
+
+	def record(self, key: Optional[int | str] = None, **values: float) -> None:
+		with self.lock:
+			totals: dict = self.totals.setdefault(key, dict.fromkeys(self.fields, 0))
+			for field, value in values.items():
+				totals[field] += value
+
+	def stats(self) -> dict:
+		with self.lock:
+			summaries: dict = {key: {**totals, **self.summary(totals)} for key, totals in self.totals.items()}
+
+		if self.keyed:
+			return {str(key): summary for key, summary in summaries.items()}
+
+		empty: dict = dict.fromkeys(self.fields, 0)
+		return summaries.get(None, {**empty, **self.summary(empty)})
+
+
+def ratio(numerator: float, denominator: float) -> float:
+	return numerator / denominator if denominator else 0.0
+
+
+def real_time_factor(totals: dict) -> dict:
+	return {"real_time_factor": ratio(totals["process_seconds"], totals["audio_seconds"])}
+
+
+###############################################################################
+########################### Sample conversion #################################
+###############################################################################
+
+def pcm_to_float(data: bytes | memoryview, sampwidth: int, nchannels: int) -> np.ndarray:
+	""" Converts interleaved PCM to a float32 mono array in [-1, 1) """
+	if sampwidth == 1:
+		samples: np.ndarray = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+	elif sampwidth == 2:
+		samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32_768.0
+	elif sampwidth == 3:
+		raw: np.ndarray = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+		# Shift the 24 bit value to the top of the int32 so the sign is kept
+		packed: np.ndarray = (raw[:, 0] << 8) | (raw[:, 1] << 16) | (raw[:, 2] << 24)
+		samples = packed.astype(np.float32) / 2_147_483_648.0
+	elif sampwidth == 4:
+		samples = np.frombuffer(data, dtype="<i4").astype(np.float32) / 2_147_483_648.0
+	else:
+		raise ValueError(f"Unsupported sample width: {sampwidth}")
+
+	if nchannels > 1:
+		samples = samples.reshape(-1, nchannels).mean(axis=1, dtype=np.float32)
+
+	return samples
+
+
+def float_to_pcm(samples: np.ndarray) -> bytes:
+	""" Converts a float array in [-1, 1) to 16 bit little endian PCM """
+	return np.clip(samples * 32_768.0, -32_768, 32_767).astype("<i2").tobytes()
+
+
+def peak_normalized_pcm(samples: np.ndarray) -> bytes:
+	""" Converts a float array to 16 bit PCM scaled to full scale, like Coqui does when saving WAV files """
+	if samples.size == 0:
+		return b""
+
+	return (samples * (32_767 / max(0.01, float(np.max(np.abs(samples)))))).astype("<i2").tobytes()
+
+
+def pcm_to_wav(pcm: bytes, framerate: int, sampwidth: int = TARGET_SAMPWIDTH, nchannels: int = CHANNELS) -> bytes:
+	""" Frames PCM as a WAV file in memory """
+	buffer: BytesIO = BytesIO()
+	with wave.open(buffer, "wb") as file:
+		file.setnchannels(nchannels)
+		file.setsampwidth(sampwidth)
+		file.setframerate(framerate)
+		file.writeframes(pcm)
+
+	return buffer.getvalue()
+
+
+def wav_to_pcm(wav: bytes) -> tuple[bytes, int]:
+	""" Reads the PCM and frame rate of a WAV file in memory with the output sample format """
+	with wave.open(BytesIO(wav), "rb") as file:
+		if file.getsampwidth() != TARGET_SAMPWIDTH or file.getnchannels() != CHANNELS:
+			raise ValueError(f"Unexpected WAV format: {file.getsampwidth()} bytes width and {file.getnchannels()} channels")
+
+		return file.readframes(file.getnframes()), file.getframerate()
+
+
+def silence_pcm(framerate: int, milliseconds: int) -> bytes:
+	return bytes(framerate * milliseconds // 1_000 * TARGET_SAMPWIDTH * CHANNELS)
+
+
+###############################################################################
+############################# Resampling ######################################
+###############################################################################
+
+class ResamplerCache:
+	""" Reusable soxr resample streams to SAMPLING_RATE, kept per input rate """
+
+	def __init__(self) -> None:
+		self.streams: dict[int, list[ResampleStream]] = {}
+		self.lock: Lock = Lock()
+
+	@contextmanager
+	def resampler(self, framerate: int) -> Iterator[ResampleStream]:
+		with self.lock:
+			available: list[ResampleStream] = self.streams.get(framerate, [])
+			stream: Optional[ResampleStream] = available.pop() if available else None
+
+		if stream is None:
+			logger.debug(f"Creating resampler from {framerate} Hz to {SAMPLING_RATE} Hz...")
+			stream = ResampleStream(framerate, SAMPLING_RATE, 1, dtype="float32", quality="HQ")
+
+		try:
+			yield stream
+		finally:
+			# Only common rates are kept, so clients can't grow the cache with made up rates
+			if framerate in ASR_CACHED_SAMPLING_RATES:
+				stream.clear()
+				with self.lock:
+					self.streams.setdefault(framerate, []).append(stream)
+
+	def stats(self) -> dict:
+		with self.lock:
+			return {str(rate): len(streams) for rate, streams in self.streams.items()}
+
+
+resampler_cache: ResamplerCache = ResamplerCache()
+
+
+###############################################################################
+########################### Normalization #####################################
+###############################################################################
+
+normalization_stats: StageStats = StageStats(("clips", "audio_seconds", "process_seconds"), real_time_factor)
+
+
+class AudioNormalizer:
+	""" Downmixes, converts sample width and resamples chunks of PCM to recognizer format """
+
+	def __init__(self, framerate: int, sampwidth: int, nchannels: int) -> None:
+		if sampwidth not in (1, 2, 3, 4):
+			raise InvalidAudio(f"Unsupported sample width: {sampwidth}")
+		if nchannels < 1:
+			raise InvalidAudio("Invalid audio format")
+		# Resampling a made up low rate to SAMPLING_RATE would multiply the size of the clip
+		if not ASR_MIN_SAMPLING_RATE <= framerate <= ASR_MAX_SAMPLING_RATE:
+			raise InvalidAudio(f"Sample rate must be between {ASR_MIN_SAMPLING_RATE} and {ASR_MAX_SAMPLING_RATE} Hz")
+
+		self.framerate: int = framerate
+		self.sampwidth: int = sampwidth
+		self.nchannels: int = nchannels
+		self.frame_size: int = sampwidth * nchannels
+		self.passthrough: bool = (framerate, sampwidth, nchannels) == (SAMPLING_RATE, TARGET_SAMPWIDTH, CHANNELS)
+		self.remainder: bytes = b""
+		self.input_frames: int = 0
+		self.process_seconds: float = 0.0
+
+	def process(self, data: bytes | memoryview, resampler: Optional[ResampleStream] = None, last: bool = False) -> bytes | memoryview:
+		start: float = perf_counter()
+
+		# Chunks may split a frame, the leftover bytes go with the next chunk
+		if self.remainder:
+			data = self.remainder + bytes(data)
+			self.remainder = b""
+		usable: int = len(data) - len(data) % self.frame_size
+		if usable < len(data):
+			self.remainder = bytes(data[usable:])
+			data = data[:usable]
+		self.input_frames += usable // self.frame_size
+
+		if self.passthrough:
+			self.process_seconds += perf_counter() - start
+			return data
+
+		samples: np.ndarray = pcm_to_float(data, self.sampwidth, self.nchannels)
+		if resampler is not None:
+			samples = resampler.resample_chunk(samples, last=last)
+
+		pcm: bytes = float_to_pcm(samples)
+		self.process_seconds += perf_counter() - start
+
+		return pcm
+
+	def normalize(self, chunks: Iterator[bytes | memoryview]) -> Iterator[bytes | memoryview]:
+		""" Normalizes a sequence of chunks, flushing the resampler at the end """
+		if self.framerate == SAMPLING_RATE:
+			for data in chunks:
+				yield self.process(data)
+		else:
+			with resampler_cache.resampler(self.framerate) as resampler:
+				for data in chunks:
+					yield self.process(data, resampler)
+				yield self.process(b"", resampler, last=True)
+
+		normalization_stats.record(
+			self.framerate if self.framerate in ASR_CACHED_SAMPLING_RATES or self.framerate == SAMPLING_RATE else "other",
+			clips=1,
+			audio_seconds=self.input_frames / self.framerate,
+			process_seconds=self.process_seconds
+		)
+
+
+###############################################################################
+############################### WAV input #####################################
+###############################################################################
+
+def read_wav_frames(audio: bytes | BinaryIO) -> Iterator[bytes | memoryview]:
+	""" Yields the frames of a WAV file given as bytes or as a readable stream, in recognizer format """
+	in_memory: bool = isinstance(audio, bytes)
+	buffer: BinaryIO = BytesIO(audio) if in_memory else audio
+
+	try:
+		file: wave.Wave_read = wave.open(buffer, "rb")
+
+	except (wave.Error, EOFError) as e:
+		raise InvalidAudio(f"Invalid WAV audio: {e}")
+
+	with file:
+		normalizer: AudioNormalizer = AudioNormalizer(
+			file.getframerate(),
+			file.getsampwidth(),
+			file.getnchannels()
+		)
+
+		if not in_memory:
+			# Streams are read incrementally so the body is never fully buffered
+			def stream_frames() -> Iterator[bytes]:
+				while True:
+					data: bytes = file.readframes(FRAMES_FLOW)
+					if len(data) == 0:
+						return
+					yield data
+
+			yield from normalizer.normalize(stream_frames())
+			return
+
+		# After the header is parsed the buffer sits at the start of the data chunk
+		offset: int = buffer.tell()
+		nframes: int = file.getnframes()
+
+	frames: memoryview = memoryview(audio)[offset:offset + nframes * normalizer.frame_size]
+	chunk_size: int = FRAMES_FLOW * normalizer.frame_size
+	yield from normalizer.normalize(frames[start:start + chunk_size] for start in range(0, len(frames), chunk_size))
+
+
+###############################################################################
+########################### Compressed audio ##################################
+###############################################################################
+
+decoder_stats: StageStats = StageStats(("clips", "failed", "input_bytes", "audio_seconds", "process_seconds"), real_time_factor)
+
+
+def decode_compressed(audio: bytes | BinaryIO, container: str = "unknown") -> Iterator[bytes]:
+	""" Decodes any container ffmpeg understands into recognizer format PCM while it's being read
+
+	The input is pumped into ffmpeg from a thread, so the upload is never fully buffered
+	and the recognizer gets the first frames before the rest of the body has arrived.
+	"""
+	started_at: float = perf_counter()
+	process: Popen = Popen(
+		[
+			FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+			"-i", "pipe:0",
+			"-f", "s16le", "-acodec", "pcm_s16le", "-ac", str(CHANNELS), "-ar", str(SAMPLING_RATE),
+			"pipe:1"
+		],
+		stdin=PIPE,
+		stdout=PIPE,
+		stderr=PIPE
+	)
+	input_bytes: int = 0
+
+	def pump() -> None:
+		nonlocal input_bytes
+		try:
+			if isinstance(audio, bytes):
+				input_bytes = len(audio)
+				process.stdin.write(audio)
+			else:
+				while data := audio.read(FFMPEG_PIPE_BUFFER):
+					input_bytes += len(data)
+					process.stdin.write(data)
+
+		except (BrokenPipeError, ValueError):
+			# ffmpeg exited early, its error is reported from stderr
+			pass
+
+		finally:
+			try:
+				process.stdin.close()
+			except BrokenPipeError:
+				pass
+
+	errors: bytearray = bytearray()
+
+	def drain() -> None:
+		# Corrupt streams log an error per packet, if nobody read them ffmpeg would block
+		# writing to a full stderr pipe while this generator blocks reading stdout
+		while data := process.stderr.read(FFMPEG_PIPE_BUFFER):
+			errors.extend(data)
+			del errors[:-FFMPEG_STDERR_MAX_BYTES]
+
+	writer: Thread = Thread(target=pump, name="ffmpeg-writer", daemon=True)
+	reader: Thread = Thread(target=drain, name="ffmpeg-stderr", daemon=True)
+	writer.start()
+	reader.start()
+
+	output_bytes: int = 0
+	failed: bool = True
+	try:
+		while data := process.stdout.read(FRAMES_FLOW * TARGET_SAMPWIDTH):
+			output_bytes += len(data)
+			yield data
+
+		if process.wait(timeout=FFMPEG_TIMEOUT) != 0:
+			reader.join(timeout=FFMPEG_TIMEOUT)
+			logger.error(f"ffmpeg could not decode {container} audio: {bytes(errors).decode(errors='replace').strip()}")
+			raise InvalidAudio(f"Could not decode {container} audio")
+		failed = False
+
+	finally:
+		if process.poll() is None:
+			process.kill()
+		try:
+			process.wait(timeout=FFMPEG_TIMEOUT)
+		except TimeoutExpired:
+			logger.error("ffmpeg process did not exit after being killed")
+		writer.join(timeout=FFMPEG_TIMEOUT)
+		reader.join(timeout=FFMPEG_TIMEOUT)
+		process.stdout.close()
+		process.stderr.close()
+
+		decoder_stats.record(
+			container,
+			clips=1,
+			failed=int(failed),
+			input_bytes=input_bytes,
+			audio_seconds=output_bytes / (SAMPLING_RATE * TARGET_SAMPWIDTH),
+			process_seconds=perf_counter() - started_at
+		)
+
+
+encoder_stats: StageStats = StageStats(
+	("responses", "input_bytes", "output_bytes", "encode_seconds"),
+	lambda totals: {
+		"avg_output_bytes": ratio(totals["output_bytes"], totals["responses"]),
+		"avg_encode_seconds": ratio(totals["encode_seconds"], totals["responses"]),
+		"compression_ratio": ratio(totals["input_bytes"], totals["output_bytes"])
+	}
+)
+
+
+def encode_audio(wav: bytes, mimetype: str) -> bytes:
+	""" Encodes a WAV file in memory into one of AUDIO_OUTPUT_ENCODERS formats with ffmpeg """
+	started_at: float = perf_counter()
+	if mimetype == "audio/wav":
+		encoded: bytes = wav
+	else:
+		process: Popen = Popen(
+			[
+				FFMPEG_BINARY, "-nostdin", "-hide_banner", "-loglevel", "error",
+				"-f", "wav", "-i", "pipe:0",
+				*AUDIO_OUTPUT_ENCODERS[mimetype],
+				"pipe:1"
+			],
+			stdin=PIPE,
+			stdout=PIPE,
+			stderr=PIPE
+		)
+		try:
+			encoded, errors = process.communicate(wav, timeout=FFMPEG_TIMEOUT)
+
+		except TimeoutExpired:
+			process.kill()
+			process.communicate()
+			raise
+
+		if process.returncode != 0:
+			raise ValueError(f"Could not encode {mimetype} audio: {errors.decode(errors='replace').strip()}")
+
+	encoder_stats.record(mimetype, responses=1, input_bytes=len(wav), output_bytes=len(encoded), encode_seconds=perf_counter() - started_at)
+	return encoded
+
+
+def limit_length(frames: Generator[bytes | memoryview, None, None], max_seconds: int = ASR_MAX_CLIP_SECONDS) -> Iterator[bytes | memoryview]:
+	""" Stops a clip of recognizer format frames with InvalidAudio once it's longer than max_seconds """
+	max_bytes: int = max_seconds * SAMPLING_RATE * TARGET_SAMPWIDTH * CHANNELS
+	total_bytes: int = 0
+	try:
+		for data in frames:
+			total_bytes += len(data)
+			if total_bytes > max_bytes:
+				raise InvalidAudio(f"Audio can be at most {max_seconds} seconds long")
+			yield data
+
+	finally:
+		# Stops ffmpeg right away instead of when the generator is collected
+		frames.close()
+
+
+class PeekedStream:
+	""" Readable stream that gives back the bytes already peeked from another stream before the rest of it """
+
+	def __init__(self, head: bytes, stream: BinaryIO) -> None:
+		self.head: bytes = head
+		self.stream: BinaryIO = stream
+
+	def read(self, size: int = -1) -> bytes:
+		if not self.head:
+			return self.stream.read(size)
+
+		if size < 0:
+			data: bytes = self.head + self.stream.read()
+			self.head = b""
+			return data
+
+		data = self.head[:size]
+		self.head = self.head[size:]
+		if len(data) < size:
+			data += self.stream.read(size - len(data))
+		return data
+
+
+def read_audio_frames(audio: bytes | BinaryIO, mimetype: Optional[str] = None) -> Iterator[bytes | memoryview]:
+	""" Yields recognizer format frames of a WAV or compressed audio file, up to ASR_MAX_CLIP_SECONDS
+
+	Without a mimetype, audio that doesn't start like a RIFF file is handed to ffmpeg.
+	"""
+	if mimetype in ASR_COMPRESSED_MIMETYPES:
+		return limit_length(decode_compressed(audio, mimetype))
+
+	if mimetype is None:
+		if isinstance(audio, bytes):
+			head: bytes = audio[:4]
+		else:
+			head = audio.read(4)
+			audio = PeekedStream(head, audio)
+
+		if head != b"RIFF":
+			return limit_length(decode_compressed(audio))
+
+	return limit_length(read_wav_frames(audio))
+
+
+###############################################################################
+########################### Low-pass filter ###################################
+###############################################################################
+
+@lru_cache(maxsize=8)
+def get_lowpass_sos(cutoff: int, order: int, framerate: int) -> np.ndarray:
+	""" Designs a Butterworth low-pass filter as second-order sections """
+	return butter(order, cutoff, btype="lowpass", output="sos", fs=framerate).astype(np.float32)
+
+
+filter_stats: StageStats = StageStats(("audio_seconds", "process_seconds"), real_time_factor, keyed=False)
+
+
+class LowPassFilter:
+	""" Butterworth low-pass over recognizer format PCM that keeps its state between chunks """
+
+	def __init__(self, cutoff: int = CUTOFF, order: int = ORDER) -> None:
+		self.sos: np.ndarray = get_lowpass_sos(cutoff, order, SAMPLING_RATE)
+		self.zi: np.ndarray = np.zeros((self.sos.shape[0], 2), dtype=np.float32)
+
+	def process(self, data: bytes | memoryview) -> bytes:
+		if len(data) == 0:
+			return b""
+
+		start: float = perf_counter()
+		samples: np.ndarray = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32_768.0
+		filtered, self.zi = sosfilt(self.sos, samples, zi=self.zi)
+		pcm: bytes = float_to_pcm(filtered)
+		filter_stats.record(audio_seconds=len(samples) / SAMPLING_RATE, process_seconds=perf_counter() - start)
+
+		return pcm
+
+
+def lowpass(chunks: Iterator[bytes | memoryview]) -> Iterator[bytes]:
+	""" Low-pass filters a sequence of recognizer format chunks """
+	lowpass_filter: LowPassFilter = LowPassFilter()
+	for data in chunks:
+		yield lowpass_filter.process(data)
+
+
+###############################################################################
+####################### Voice activity detection ##############################
+###############################################################################
+
+vad_stats: StageStats = StageStats(
+	("clips", "untrimmed_clips", "input_seconds", "discarded_seconds"),
+	lambda totals: {"discarded_ratio": ratio(totals["discarded_seconds"], totals["input_seconds"])},
+	keyed=False
+)
+
+
+class VoiceActivityDetector:
+	""" Energy and zero-crossing VAD over recognizer format PCM that drops silent frames """
+
+	def __init__(
+			self,
+			frame_ms: int = ASR_VAD_FRAME_MS,
+			energy_threshold: float = ASR_VAD_ENERGY_THRESHOLD,
+			zcr_threshold: float = ASR_VAD_ZCR_THRESHOLD,
+			padding_ms: int = ASR_VAD_PADDING_MS,
+			max_pause_ms: Optional[int] = ASR_VAD_MAX_PAUSE_MS if ASR_VAD_SHORTEN_PAUSES else None
+		) -> None:
+
+		self.frame_length: int = SAMPLING_RATE * frame_ms // 1_000
+		self.frame_bytes: int = self.frame_length * TARGET_SAMPWIDTH
+		self.energy_threshold: float = energy_threshold
+		self.zcr_threshold: float = zcr_threshold
+		self.padding_frames: int = max(padding_ms // frame_ms, 1)
+		self.max_pause_frames: Optional[int] = max_pause_ms // frame_ms if max_pause_ms is not None else None
+
+		self.buffer: bytearray = bytearray()
+		self.started: bool = False
+		# Silence since the last speech frame, split in the padding kept after the
+		# speech and the most recent frames kept before the next speech frame
+		self.pause_head: list[bytes] = []
+		self.pause_tail: deque = deque()
+
+		# Counted in samples, the last frame of a clip is usually partial
+		self.input_samples: int = 0
+		self.discarded_samples: int = 0
+
+	def classify(self, frames: np.ndarray) -> np.ndarray:
+		""" Returns a speech flag per frame, frames is a (n, frame_length) int16 array """
+		samples: np.ndarray = frames.astype(np.float32) / 32_768.0
+		rms: np.ndarray = np.sqrt(np.mean(samples * samples, axis=1))
+		energy: np.ndarray = 20.0 * np.log10(rms + 1e-10)
+		signs: np.ndarray = np.signbit(samples)
+		zcr: np.ndarray = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+		# Unvoiced sounds like "s" are quiet but cross zero a lot
+		return (energy > self.energy_threshold) | ((energy > self.energy_threshold - 10.0) & (zcr > self.zcr_threshold))
+
+	def on_silence(self, frame: bytes) -> None:
+		if self.started and len(self.pause_head) < self.padding_frames:
+			self.pause_head.append(frame)
+			return
+
+		self.pause_tail.append(frame)
+
+		# Before speech only the padding is kept, inside the clip pauses longer
+		# than the maximum are shortened to it when ASR_VAD_SHORTEN_PAUSES is enabled
+		if not self.started:
+			limit: Optional[int] = self.padding_frames
+		elif self.max_pause_frames is not None:
+			limit = max(self.max_pause_frames - self.padding_frames, self.padding_frames)
+		else:
+			limit = None
+
+		if limit is not None and len(self.pause_tail) > limit:
+			self.discarded_samples += len(self.pause_tail.popleft()) // TARGET_SAMPWIDTH
+
+	def on_speech(self, frame: bytes) -> list[bytes]:
+		kept: list[bytes] = [*self.pause_head, *self.pause_tail, frame]
+
+		self.started = True
+		self.pause_head = []
+		self.pause_tail = deque()
+
+		return kept
+
+	def process(self, data: bytes | memoryview) -> bytes:
+		self.buffer += data
+		nframes: int = len(self.buffer) // self.frame_bytes
+		if nframes == 0:
+			return b""
+
+		raw: bytes = bytes(self.buffer[:nframes * self.frame_bytes])
+		del self.buffer[:nframes * self.frame_bytes]
+		self.input_samples += nframes * self.frame_length
+
+		speech: np.ndarray = self.classify(np.frombuffer(raw, dtype="<i2").reshape(nframes, self.frame_length))
+
+		kept: list[bytes] = []
+		for index, is_speech in enumerate(speech.tolist()):
+			frame: bytes = raw[index * self.frame_bytes:(index + 1) * self.frame_bytes]
+			if is_speech:
+				kept.extend(self.on_speech(frame))
+			else:
+				self.on_silence(frame)
+
+		return b"".join(kept)
+
+	def flush(self) -> bytes:
+		""" Ends the clip, trailing silence beyond the padding is dropped """
+		if self.buffer:
+			self.input_samples += len(self.buffer) // TARGET_SAMPWIDTH
+			self.on_silence(bytes(self.buffer))
+			self.buffer = bytearray()
+
+		kept: list[bytes] = self.pause_head if self.started else []
+		discarded: list[bytes] = [*self.pause_tail, *([] if self.started else self.pause_head)]
+		self.discarded_samples += sum(len(frame) for frame in discarded) // TARGET_SAMPWIDTH
+		self.pause_head = []
+		self.pause_tail = deque()
+
+		return b"".join(kept)
+
+	@property
+	def input_seconds(self) -> float:
+		return self.input_samples / SAMPLING_RATE
+
+	@property
+	def discarded_seconds(self) -> float:
+		return self.discarded_samples / SAMPLING_RATE
+
+
+def trim_silence(chunks: Iterator[bytes | memoryview]) -> Iterator[bytes]:
+	""" Drops leading, trailing and long internal silence from recognizer format PCM
+
+	Clips where no frame is detected as speech, like quiet but valid recordings under
+	the energy threshold, are passed on untrimmed so the recognizer still gets a try.
+	"""
+	detector: VoiceActivityDetector = VoiceActivityDetector()
+	# Input is only held until the first speech frame is found
+	untrimmed: Optional[list[bytes]] = []
+	for data in chunks:
+		if untrimmed is not None:
+			untrimmed.append(bytes(data))
+
+		kept: bytes = detector.process(data)
+		if kept:
+			untrimmed = None
+			yield kept
+
+	kept = detector.flush()
+	if kept:
+		untrimmed = None
+		yield kept
+
+	if untrimmed:
+		logger.info(f"VAD found no speech in {detector.input_seconds:.2f}s of audio, keeping it untrimmed")
+		yield from untrimmed
+		vad_stats.record(clips=1, untrimmed_clips=1, input_seconds=detector.input_seconds)
+		return
+
+	logger.debug(f"VAD discarded {detector.discarded_seconds:.2f}s of {detector.input_seconds:.2f}s of audio")
+	vad_stats.record(clips=1, input_seconds=detector.input_seconds, discarded_seconds=detector.discarded_seconds)
+
+
+def audio_stats() -> dict:
+	return {
+		"normalization": normalization_stats.stats(),
+		"decoding": decoder_stats.stats(),
+		"cached_resamplers": resampler_cache.stats(),
+		"lowpass": filter_stats.stats(),
+		"vad": vad_stats.stats()
+	}
@@ -0,0 +1,219 @@
+from os import makedirs, remove, replace, scandir, utime
+from os.path import join
+from queue import Full, Queue
+from threading import Lock, Thread
+from collections import OrderedDict
+from tempfile import NamedTemporaryFile
+from logging import Logger, getLogger
+from typing import Any, Callable, Optional
+
+from app.resources.config import *
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.cache")
+
+
+class LRUCache:
+	""" Thread safe in-memory LRU bounded by number of items and optionally by size """
+
+	def __init__(self, max_items: int, max_bytes: Optional[int] = None, sizeof: Callable[[Any], int] = len) -> None:
+		self.max_items: int = max_items
+		self.max_bytes: Optional[int] = max_bytes
+		self.sizeof: Callable[[Any], int] = sizeof
+		self.items: OrderedDict[str, Any] = OrderedDict()
+		self.bytes: int = 0
+		self.lock: Lock = Lock()
+
+		self.hits: int = 0
+		self.misses: int = 0
+		self.evictions: int = 0
+
+	def get(self, key: str) -> Optional[Any]:
+		with self.lock:
+			value: Optional[Any] = self.items.get(key)
+			if value is None:
+				self.misses += 1
+				return None
+
+			self.items.move_to_end(key)
+			self.hits += 1
+			return value
+
+	def put(self, key: str, value: Any) -> None:
+		size: int = self.sizeof(value)
+		if self.max_bytes is not None and size > self.max_bytes:
+			return
+
+		with self.lock:
+			previous: Optional[Any] = self.items.pop(key, None)
+			if previous is not None:
+				self.bytes -= self.sizeof(previous)
+
+			self.items[key] = value
+			self.bytes += size
+
+			while len(self.items) > self.max_items or (self.max_bytes is not None and self.bytes > self.max_bytes):
+				_, evicted = self.items.popitem(last=False)
+				self.bytes -= self.sizeof(evicted)
+				self.evictions += 1
+
+	def stats(self) -> dict:
+		with self.lock:
+			lookups: int = self.hits + self.misses
+			return {
+				"items": len(self.items),
+				"max_items": self.max_items,
+				"bytes": self.bytes,
+				"max_bytes": self.max_bytes,
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_rate": self.hits / lookups if lookups else None,
+				"evictions": self.evictions
+			}
+
+
+class DiskCache:
+	""" Directory of cached files bounded by size, evicting the least recently used first """
+
+	def __init__(self, directory: str, max_bytes: int, suffix: str = "") -> None:
+		self.directory: str = directory
+		self.max_bytes: int = max_bytes
+		self.suffix: str = suffix
+		self.bytes: Optional[int] = None
+		self.lock: Lock = Lock()
+		# Files are written by a background thread, puts come from the model future callbacks
+		self.writes: Queue = Queue(maxsize=CACHE_DISK_WRITE_QUEUE_SIZE)
+		self.writer: Optional[Thread] = None
+
+		self.hits: int = 0
+		self.misses: int = 0
+		self.evictions: int = 0
+		self.errors: int = 0
+		self.dropped: int = 0
+
+	def path(self, key: str) -> str:
+		return join(self.directory, f"{key}{self.suffix}")
+
+	def get(self, key: str) -> Optional[bytes]:
+		try:
+			with open(self.path(key), "rb") as file:
+				data: bytes = file.read()
+			# The modification time is the recency used for eviction
+			utime(self.path(key))
+
+		except FileNotFoundError:
+			with self.lock:
+				self.misses += 1
+			return None
+
+		except Exception as e:
+			logger.error(f"Error reading {key} from disk cache: {e}")
+			with self.lock:
+				self.misses += 1
+				self.errors += 1
+			return None
+
+		with self.lock:
+			self.hits += 1
+		return data
+
+	def put(self, key: str, data: bytes) -> None:
+		""" Queues the file to be written, it is dropped when the writer is too far behind """
+		if len(data) > self.max_bytes:
+			return
+
+		with self.lock:
+			if self.writer is None:
+				self.writer = Thread(target=self.write_files, name="disk-cache-writer", daemon=True)
+				self.writer.start()
+
+		try:
+			self.writes.put_nowait((key, data))
+
+		except Full:
+			with self.lock:
+				self.dropped += 1
+
+	def write_files(self) -> None:
+		while True:
+			key, data = self.writes.get()
+			try:
+				self.write(key, data)
+
+			except Exception as e:
+				logger.error(f"Error writing {key} to disk cache: {e}")
+
+			finally:
+				self.writes.task_done()
+
+	def write(self, key: str, data: bytes) -> None:
+		try:
+			makedirs(self.directory, exist_ok=True)
+			# Written aside and renamed so readers never see a partial file
+			with NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+				file.write(data)
+			replace(file.name, self.path(key))
+
+		except Exception as e:
+			logger.error(f"Error writing {key} to disk cache: {e}")
+			with self.lock:
+				self.errors += 1
+			return
+
+		# Only the writer thread changes the files, so the directory is scanned without the lock
+		if self.bytes is None:
+			scanned: int = self.scan_bytes()
+			with self.lock:
+				self.bytes = scanned
+		else:
+			with self.lock:
+				self.bytes += len(data)
+
+		if self.bytes > self.max_bytes:
+			self.evict()
+
+	def cached_files(self) -> list:
+		# Files still being written by this or another process are not part of the cache yet
+		return [entry for entry in scandir(self.directory) if entry.is_file() and not entry.name.endswith(".tmp")]
+
+	def scan_bytes(self) -> int:
+		return sum(entry.stat().st_size for entry in self.cached_files())
+
+	def evict(self) -> None:
+		""" Deletes the oldest files until the cache is back under 90% of its size """
+		entries: list = sorted(self.cached_files(), key=lambda entry: entry.stat().st_mtime)
+		total: int = sum(entry.stat().st_size for entry in entries)
+		evicted: int = 0
+
+		for entry in entries:
+			if total <= self.max_bytes * 0.9:
+				break
+
+			try:
+				size: int = entry.stat().st_size
+				remove(entry.path)
+				total -= size
+				evicted += 1
+
+			except FileNotFoundError:
+				pass
+
+		with self.lock:
+			self.bytes = total
+			self.evictions += evicted
+
+	def stats(self) -> dict:
+		with self.lock:
+			lookups: int = self.hits + self.misses
+			return {
+				"directory": self.directory,
+				"bytes": self.bytes,
+				"max_bytes": self.max_bytes,
+				"hits": self.hits,
+				"misses": self.misses,
+				"hit_rate": self.hits / lookups if lookups else None,
+				"evictions": self.evictions,
+				"errors": self.errors,
+				"pending_writes": self.writes.qsize(),
+				"dropped_writes": self.dropped
+			}
@@ -1,4 +1,3 @@
-import torch
 from os import getcwd
 from os.path import join
 
@@ -6,7 +5,11 @@ from os.path import join
 PROJECT_NAME: str = "Tip_Trip"
 LOGGING_FORMAT: str = "[%(asctime)s] %(levelname)s in %(name)s: %(message)s"
 GENERAL_ERROR_MESSAGE: str = "An error ocurred while processing the request"
-TEMP_FILE_NAME: str = "temp_audio.wav"
+
+# Server variables
+SERVER_THREADS: int = 20 # waitress threads, read by entrypoint.sh
+MODEL_REQUESTS_MAX_IN_FLIGHT: int = 10 # ASR and TTS requests waiting on the models at once, kept with JOBS_EVENTS_MAX_STREAMS under SERVER_THREADS so other routes keep threads
+MODEL_REQUESTS_RETRY_AFTER: int = 2
 
 # Speech recognition variables
 SAMPLING_RATE: int = 16_000
@@ -16,10 +19,98 @@ FRAMES_FLOW: int = 4_096
 CUTOFF: int = 3_000
 ORDER: int = 6
 LIBROSA_CACHE_DIR: str = "/tmp/librosa_cache"
+ASR_RECOGNIZER_POOL_SIZE: int = 4
+ASR_WORKERS: int = 2 # 0 decodes on the request threads
+ASR_QUEUE_DEPTH: int = 8
+ASR_RETRY_AFTER: int = 2
+ASR_BATCH_MAX_CLIPS: int = 100
+ASR_BATCH_SUBMIT_TIMEOUT: float = 60.0
+ASR_BATCH_IN_FLIGHT: int = 2 # Batch clips queued at once, the rest of the queue stays free for interactive requests
+ASR_MIN_SAMPLING_RATE: int = 8_000
+ASR_MAX_SAMPLING_RATE: int = 96_000
+ASR_CACHED_SAMPLING_RATES: list[int] = [8_000, 11_025, 12_000, 22_050, 24_000, 32_000, 44_100, 48_000, 88_200, 96_000] # Other rates get a resampler per clip
+ASR_MAX_CLIP_SECONDS: int = 5 * 60
+ASR_LOWPASS_ENABLED: bool = False # Uses CUTOFF and ORDER, Vosk features go up to 8 kHz so check WER before enabling it
+ASR_VAD_ENABLED: bool = True
+ASR_VAD_FRAME_MS: int = 30
+ASR_VAD_ENERGY_THRESHOLD: float = -45.0 # dBFS
+ASR_VAD_ZCR_THRESHOLD: float = 0.3
+ASR_VAD_PADDING_MS: int = 300
+ASR_VAD_SHORTEN_PAUSES: bool = True # Internal pauses longer than ASR_VAD_MAX_PAUSE_MS are cut down to it, the clip stays one utterance
+ASR_VAD_MAX_PAUSE_MS: int = 1_000
+ASR_MODES: list[str] = ["free", "places"]
+ASR_GRAMMAR_PHRASES: list[str] = [
+	"qué", "que", "cuál", "cual", "dónde", "donde", "cómo", "como", "cuánto", "cuanto",
+	"hay", "es", "está", "esta", "queda", "llego", "ir", "a", "al", "el", "la", "los", "las",
+	"de", "del", "en", "un", "una", "mí", "mi", "me", "cerca", "cercano", "cercanos",
+	"lugares", "sitios", "museos", "monumentos", "murales", "esculturas", "iglesias",
+	"recomiéndame", "recomiendas", "información", "horario", "horarios", "precio", "precios",
+	"dirección", "kilómetros", "todos", "hola", "adiós", "gracias", "sí", "no"
+]
+ASR_WAV_MIMETYPES: list[str] = ["audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"]
+ASR_COMPRESSED_MIMETYPES: list[str] = [
+	"audio/ogg", "audio/opus", "audio/webm", "video/webm",
+	"audio/aac", "audio/mp4", "audio/m4a", "audio/x-m4a", "audio/mpeg"
+]
+FFMPEG_BINARY: str = "ffmpeg"
+FFMPEG_PIPE_BUFFER: int = 64 * 1024 # bytes
+FFMPEG_STDERR_MAX_BYTES: int = 4_096 # Tail of the ffmpeg errors kept for the logs
+FFMPEG_TIMEOUT: float = 10.0 # seconds
+ASR_STREAM_HOST: str = "0.0.0.0"
+ASR_STREAM_PORT: int = 5001
+ASR_STREAM_IDLE_TIMEOUT: float = 30.0
+ASR_STREAM_ACQUIRE_TIMEOUT: float = 5.0 # Wait for a free recognizer before closing with 1013
+ASR_STREAM_MAX_SECONDS: float = 5 * 60 # Sessions hold a recognizer, so they end after this long
+ASR_CASCADE_ENABLED: bool = True # Only when the large model is in VOSK_LARGE_ABSPATH
+ASR_CASCADE_CONFIDENCE_THRESHOLD: float = 0.8
+ASR_CACHE_ENABLED: bool = True
+ASR_CACHE_MAX_ITEMS: int = 1_024
+ASR_CACHE_DISK_ENABLED: bool = True
+ASR_CACHE_DISK_MAX_BYTES: int = 16 * 1024 * 1024
+
+# Async jobs variables
+JOBS_WORKERS: int = 4
+JOBS_MAX_PENDING: int = 32 # Queued plus running jobs, queued ASR jobs keep their audio in memory
+JOBS_RETRY_AFTER: int = 10
+JOBS_SUBMIT_TIMEOUT: float = 120.0 # Wait for a free ASR worker before the job fails
+JOBS_RESULT_TTL: int = 60 * 60 # seconds
+JOBS_CLEANUP_INTERVAL: int = 5 * 60 # seconds
+JOBS_EVENTS_TIMEOUT: float = 60.0 # Each events stream holds a server thread while it waits, clients reconnect after it
+JOBS_EVENTS_MAX_STREAMS: int = 4 # Under SERVER_THREADS minus MODEL_REQUESTS_MAX_IN_FLIGHT
 
 # TTS variables
-DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
 TTS_MODEL_NAME: str = "tts_models/es/css10/vits"
+TTS_WARMUP_ON_STARTUP: bool = True
+TTS_WARMUP_TEXT: str = "Hola, bienvenido a Tip Trip."
+TTS_WORKERS: int = 2 # 0 synthesizes on the request threads
+TTS_QUEUE_DEPTH: int = 8
+TTS_TORCH_THREADS: int = 2 # Per worker, workers * threads should not exceed the cores
+TTS_RETRY_AFTER: int = 5
+TTS_SUBMIT_TIMEOUT: float = 120.0
+TTS_BATCH_MAX_TEXTS: int = 1_000
+TTS_BATCH_IN_FLIGHT: int = 4 # Batch texts or reply segments queued at once, the rest of the queue stays free
+TTS_QUANTIZE: bool = False # int8 dynamic quantization, CPU only
+TTS_QUANTIZATION_TEXT: str = "El Palacio de Bellas Artes abre de martes a domingo y la entrada general cuesta setenta y cinco pesos."
+TTS_QUANTIZATION_MIN_SIMILARITY: float = 0.9
+TTS_CACHE_ENABLED: bool = True
+TTS_CACHE_MAX_ITEMS: int = 512
+TTS_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+TTS_CACHE_DISK_ENABLED: bool = True
+TTS_CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024
+CACHE_DISK_WRITE_QUEUE_SIZE: int = 64 # Files waiting for the disk cache writer, later ones are only kept in memory
+TTS_CACHE_PRERENDER: bool = True # Renders AGENT_CANNED_RESPONSES after the warm-up
+TTS_SEGMENTS_ENABLED: bool = True # List replies are cached per line segment, needs the TTS cache
+TTS_SEGMENT_PAUSE_MS: int = 150 # Between the segments of a line
+TTS_LINE_PAUSE_MS: int = 400 # Between lines
+NARRATIONS_ENABLED: bool = True # Renders place descriptions when places are created or updated
+NARRATIONS_MIMETYPE: str = "audio/ogg" # One of AUDIO_OUTPUT_ENCODERS
+NARRATIONS_SUFFIX: str = ".ogg"
+# The first one is the fallback when the client doesn't ask for a format
+TTS_OUTPUT_MIMETYPES: list[str] = ["application/json", "audio/wav", "audio/ogg", "audio/mpeg"]
+AUDIO_OUTPUT_ENCODERS: dict[str, list[str]] = {
+	"audio/ogg": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip", "-f", "ogg"],
+	"audio/mpeg": ["-c:a", "libmp3lame", "-b:a", "48k", "-f", "mp3"]
+}
 TEXT_REPLACEMENTS: dict[str, str] = {
 	'&': 'y',
 	'%': "por ciento",
@@ -33,9 +124,16 @@ TEXT_REPLACEMENTS: dict[str, str] = {
 PROJECT_DIR_ABSPATH: str = getcwd()
 DOTENV_ABSPATH: str = join(PROJECT_DIR_ABSPATH, ".env")
 TEMP_ABSPATH: str = join(PROJECT_DIR_ABSPATH, "app", "temp")
+JOBS_DB_ABSPATH: str = join(TEMP_ABSPATH, "jobs.sqlite3")
+ASR_CACHE_ABSPATH: str = join(TEMP_ABSPATH, "asr_cache")
+TTS_CACHE_ABSPATH: str = join(TEMP_ABSPATH, "tts_cache")
+TTS_QUANTIZED_ABSPATH: str = join(TEMP_ABSPATH, "tts_quantized")
+# Outside STATIC_ABSPATH, Flask would serve them at /static without authentication
+NARRATIONS_ABSPATH: str = join(TEMP_ABSPATH, "narrations")
 RESOURCES_ABSPATH: str = join(PROJECT_DIR_ABSPATH, "app", "resources")
 STATIC_ABSPATH: str = join(PROJECT_DIR_ABSPATH, "app", "static")
 VOSK_ABSPATH: str = join(STATIC_ABSPATH, "vosk-model-small-es-0.42")
+VOSK_LARGE_ABSPATH: str = join(STATIC_ABSPATH, "vosk-model-es-0.42")
 DATASET_ABSPATH: str = join(STATIC_ABSPATH, "dataset.csv")
 
 # LangChain variables
@@ -78,3 +176,37 @@ CATEGORIAS: list[str] = [
 	"Museo",
 	"Zona arqueológica"
 ]
+
+# Fixed agent responses, pre-rendered into the TTS cache at startup
+AGENT_UNAVAILABLE_RESPONSE: str = "Lo siento, por el momento no puedo ayudarte. Por favor, intenta de nuevo más tarde."
+AGENT_GREETING_RESPONSE: str = "¡Hola! ¿En qué puedo ayudarte hoy con información turística sobre la Ciudad de México?"
+AGENT_FAREWELL_RESPONSE: str = "Gracias por usar TripBot. ¡Espero que tengas un excelente día! 😊"
+AGENT_ASK_DISTANCE_RESPONSE: str = "¿Deseas que busque lugares en una distancia específica? Por favor, indícame la distancia en kilómetros, o escribe 'todos' para mostrarte todos los lugares sin filtrar por distancia."
+AGENT_NO_INFORMATION_RESPONSE: str = "Lo siento, no tengo información específica sobre ese tema, pero puedo recomendarte lugares turísticos en la Ciudad de México."
+AGENT_IRRELEVANT_RESPONSE: str = "Lo siento, no estoy seguro de haber entendido tu pregunta. Recuerda que estoy aquí para proporcionarte información sobre turismo en la Ciudad de México. ¡No dudes en intentarlo de nuevo!"
+AGENT_UNKNOWN_INTENT_RESPONSE: str = "Lo siento, no pude entender tu intención. Por favor, intenta formular tu pregunta de otra manera."
+AGENT_NOT_UNDERSTOOD_RESPONSE: str = "Lo siento, no entendí tu respuesta. ¿Podrías intentarlo de nuevo?"
+AGENT_NO_USER_LOCATION_RESPONSE: str = "No se pudo obtener la ubicación del usuario."
+AGENT_NO_LOCATION_DATA_RESPONSE: str = "Datos de ubicación no disponibles."
+AGENT_NO_PLACES_RESPONSE: str = "Lo siento, no encontré sitios turísticos en el radio especificado."
+AGENT_INVALID_COORDINATES_RESPONSE: str = "Por favor, ingresa coordenadas válidas y un número para el radio de búsqueda."
+AGENT_UNKNOWN_CATEGORY_RESPONSE: str = "Lo siento, no pude determinar la categoría de sitio que te interesa. Por favor, especifica una categoría como 'Museo', 'Monumento', 'Centro cultural', etc."
+AGENT_UNCLEAR_REFERENCE_RESPONSE: str = "Tengo dificultades por interpretar el lugar de referencia, trata de ser más específico con su nombre."
+AGENT_MISSING_REFERENCE_RESPONSE: str = "Por favor, especifica un lugar de referencia."
+AGENT_CANNED_RESPONSES: list[str] = [
+	AGENT_UNAVAILABLE_RESPONSE,
+	AGENT_GREETING_RESPONSE,
+	AGENT_FAREWELL_RESPONSE,
+	AGENT_ASK_DISTANCE_RESPONSE,
+	AGENT_NO_INFORMATION_RESPONSE,
+	AGENT_IRRELEVANT_RESPONSE,
+	AGENT_UNKNOWN_INTENT_RESPONSE,
+	AGENT_NOT_UNDERSTOOD_RESPONSE,
+	AGENT_NO_USER_LOCATION_RESPONSE,
+	AGENT_NO_LOCATION_DATA_RESPONSE,
+	AGENT_NO_PLACES_RESPONSE,
+	AGENT_INVALID_COORDINATES_RESPONSE,
+	AGENT_UNKNOWN_CATEGORY_RESPONSE,
+	AGENT_UNCLEAR_REFERENCE_RESPONSE,
+	AGENT_MISSING_REFERENCE_RESPONSE
+]
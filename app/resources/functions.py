@@ -1,21 +1,27 @@
 import wave
-import json
-from re import sub
+import re
+from typing import BinaryIO, Iterator, Optional
+from io import BytesIO
+from functools import lru_cache
+from time import perf_counter
 from os import getenv
-from TTS.api import TTS
-from os.path import join
-from pyaudio import paInt16
 from base64 import b64encode
 from dotenv import load_dotenv
 from num2words import num2words
 from geopy.distance import geodesic
 from cryptography.fernet import Fernet
-from vosk import Model, KaldiRecognizer
+from concurrent.futures import Future, FIRST_COMPLETED, as_completed, wait
+from logging import Logger, getLogger
 
 from app.resources.config import *
+from app.resources.audio import read_audio_frames, trim_silence, lowpass, encoder_stats, pcm_to_wav, wav_to_pcm, silence_pcm
+from app.resources.asr import reserve_transcription, submit_transcription, unreserve_transcription
+from app.resources.tts import tts_engine, tts_cache, submit_synthesis
+from app.resources.workers import WorkerPoolFull
 
 
 load_dotenv(DOTENV_ABSPATH)
+logger: Logger = getLogger(f"{PROJECT_NAME}.functions")
 
 
 ###############################################################################
@@ -46,76 +52,257 @@ def get_place_distance(
 	return geodesic(current_position, place_position).kilometers
 
 
-def speech_recognition() -> str:
-	with wave.open(join("/tmp", TEMP_FILE_NAME), "rb") as file:
-		if not any([
-			file.getnchannels() != CHANNELS,
-			file.getsampwidth() != paInt16,
-			file.getframerate() != SAMPLING_RATE
-		]):
-			raise ValueError("vosk_audio_file")
+def prepare_speech(audio: bytes | BinaryIO, mimetype: Optional[str] = None) -> bytes:
+	""" Reads a WAV or compressed audio file and runs the preprocessing stages, returns recognizer format PCM """
+	frames: Iterator[bytes | memoryview] = read_audio_frames(audio, mimetype)
+	if ASR_VAD_ENABLED:
+		frames = trim_silence(frames)
+	if ASR_LOWPASS_ENABLED:
+		frames = lowpass(frames)
 
-		model = Model(model_path=VOSK_ABSPATH)
-		recognizer = KaldiRecognizer(model, SAMPLING_RATE)
+	# Decoding runs on the ASR worker processes, which only take picklable PCM
+	return b"".join(frames)
 
-		results: list = []
-		while True:
-			data: bytes = file.readframes(FRAMES_FLOW)
-			if len(data) == 0:
-				break
-			if recognizer.AcceptWaveform(data):
-				result = recognizer.Result()
-				results.append(json.loads(result))
 
-		final_result = recognizer.FinalResult()
-		results.append(json.loads(final_result))
+def speech_recognition(audio: bytes | BinaryIO, grammar: Optional[str] = None, mimetype: Optional[str] = None) -> str:
+	""" Transcribes an audio file, raises WorkerPoolFull before reading it when the ASR queue is full """
+	reserve_transcription()
+	try:
+		pcm: bytes = prepare_speech(audio, mimetype)
 
-		return f"{' '.join([res['text'] for res in results])}."
+	except BaseException:
+		unreserve_transcription()
+		raise
+
+	return submit_transcription(pcm, grammar, reserved=True).result()
+
+
+def speech_recognition_batch(
+		clips: list[Optional[bytes | BinaryIO]],
+		grammar: Optional[str] = None,
+		mimetypes: Optional[list[Optional[str]]] = None
+	) -> list[dict]:
+	""" Transcribes many clips in parallel, results keep the input order and failures are per clip
+
+	Clips that couldn't be read from the request are given as None and fail without being decoded.
+	"""
+	mimetypes = mimetypes or [None] * len(clips)
+	jobs: list[Future | dict] = []
+	running: list[Future] = []
+	for clip, mimetype in zip(clips, mimetypes):
+		if clip is None:
+			jobs.append({"status": "Failed", "message": "Invalid base64 audio data", "error_code": "TT.D400"})
+			continue
+
+		try:
+			pcm: bytes = prepare_speech(clip, mimetype)
+
+			# Only a few clips are queued at a time so the batch doesn't take every slot from interactive requests
+			running = [job for job in running if not job.done()]
+			if len(running) >= ASR_BATCH_IN_FLIGHT:
+				wait(running, return_when=FIRST_COMPLETED)
+
+			# Clips are queued as soon as they are prepared so decoding overlaps preprocessing
+			job: Future = submit_transcription(pcm, grammar, block=True, timeout=ASR_BATCH_SUBMIT_TIMEOUT)
+			jobs.append(job)
+			running.append(job)
+
+		except WorkerPoolFull:
+			jobs.append({"status": "Failed", "message": "Speech recognition service is busy", "error_code": "TT.503"})
+
+		except Exception as e:
+			logger.error(f"Error preparing batch clip: {e}")
+			jobs.append({"status": "Failed", "message": "Audio could not be processed", "error_code": "TT.D400"})
+
+	results: list[dict] = []
+	for index, job in enumerate(jobs):
+		if isinstance(job, dict):
+			results.append({"index": index, **job})
+			continue
+
+		try:
+			results.append({"index": index, "status": "Success", "text": job.result()})
+
+		except Exception as e:
+			logger.error(f"Error during batch speech recognition: {e}")
+			results.append({"index": index, "status": "Failed", "message": GENERAL_ERROR_MESSAGE, "error_code": "TT.500"})
+
+	return results
+
+
+# str.translate takes a slow per character path on non-ASCII text, so symbols are
+# still replaced with str.replace and the rules only compile the regex passes
+TEXT_REPLACEMENTS_ITEMS: tuple[tuple[str, str], ...] = tuple(TEXT_REPLACEMENTS.items())
+PESOS_PATTERN: re.Pattern = re.compile(r"\$(\d+)")
+NUMBER_PATTERN: re.Pattern = re.compile(r"\b\d+(\.\d+)?\b")
+DIGIT_PATTERN: re.Pattern = re.compile(r"\d")
+URL_PATTERN: re.Pattern = re.compile(r"https?://(www\.)?([^/]+)")
+URL_PATH_PATTERN: re.Pattern = re.compile(r"\b([\w\-]+ punto [\w\-]+(?: punto [\w\-]+)?)(/.*)?\b(/)?")
+SPECIAL_CHARACTERS_PATTERN: re.Pattern = re.compile(r"[*;=¡!()\[\]{}]")
+
+
+@lru_cache(maxsize=4_096)
+def pesos_to_words(digits: str) -> str:
+	return f"{num2words(int(digits), lang='es')} pesos"
+
+
+@lru_cache(maxsize=4_096)
+def number_to_words(number: str) -> str:
+	return num2words(float(number), lang="es").replace('.', " punto ")
 
 
 def format_text(text: str) -> str:
-	for symbol, word in TEXT_REPLACEMENTS.items():
+	for symbol, word in TEXT_REPLACEMENTS_ITEMS:
 		text = text.replace(symbol, word)
 
-	# Replace the symbol $ followed by a number, like "$50" or "$25", with "fifty pesos"
-	text = sub(r"\$(\d+)", lambda x: f"{num2words(int(x.group(1)), lang='es')} pesos", text)
+	# The substring checks skip regex passes that can't match, most texts have no prices or URLs
+	if DIGIT_PATTERN.search(text):
+		# Replace the symbol $ followed by a number, like "$50" or "$25", with "fifty pesos"
+		if '$' in text:
+			text = PESOS_PATTERN.sub(lambda x: pesos_to_words(x.group(1)), text)
 
-	# Replace numbers with words for other cases (without the $ symbol in front)
-	# This also converts numbers with decimals correctly
-	text = sub(r"\b\d+(\.\d+)?\b", lambda x: num2words(float(x.group()), lang="es").replace('.', " punto "), text)
+		# Replace numbers with words for other cases (without the $ symbol in front)
+		# This also converts numbers with decimals correctly
+		text = NUMBER_PATTERN.sub(lambda x: number_to_words(x.group()), text)
 
 	text = text.replace("hrs.", "horas")
 
 	# Remove "http://", "https://", and "www." and replace "." with "punto" on URLs
-	text = sub(r"https?://(www\.)?([^/]+)", lambda x: x.group(2).replace('.', " punto "), text)
-	text = sub(r"\b([\w\-]+ punto [\w\-]+(?: punto [\w\-]+)?)(/.*)?\b(/)?", r"\1", text)
+	if "http" in text:
+		text = URL_PATTERN.sub(lambda x: x.group(2).replace('.', " punto "), text)
+	if " punto " in text:
+		text = URL_PATH_PATTERN.sub(r"\1", text)
 
 	# Replace more special characters
-	text = text \
-		.replace(':', ',') \
-		.replace('*', "") \
-		.replace(';', "") \
-		.replace('=', "") \
-		.replace('¡', "") \
-		.replace('!', "") \
-		.replace('(', "").replace(')', "") \
-		.replace('[', "").replace(']', "") \
-		.replace('{', "").replace('}', "") \
-
-	return text
-
-
-def tts_func(text: str) -> dict:
-	text = format_text(text)
-
-	tts: TTS = TTS(model_name=TTS_MODEL_NAME, progress_bar=False).to(DEVICE)
-	tts.tts_to_file(
-		text=text,
-		speaker_wav="my/cloning/audio.wav",
-		file_path=join("/tmp", TEMP_FILE_NAME)
-	)
-
-	with wave.open(join("/tmp", TEMP_FILE_NAME), "rb") as file:
+	return SPECIAL_CHARACTERS_PATTERN.sub("", text.replace(':', ','))
+
+
+def submit_wav(text: str, block: bool = False, timeout: Optional[float] = None) -> Future:
+	""" Sends an already formatted text to synthesize, the future resolves with its WAV file
+
+	Raises WorkerPoolFull when the TTS queue is full, unless block waits for a free slot.
+	"""
+	key: Optional[str] = None
+	if tts_cache is not None:
+		key = tts_cache.key(text, tts_engine.model_name)
+		wav: Optional[bytes] = tts_cache.get(key) if key is not None else None
+		if wav is not None:
+			logger.debug("Synthesized audio found in cache")
+			future: Future = Future()
+			future.set_result(wav)
+			return future
+
+	job: Future = submit_synthesis(text, block=block, timeout=timeout)
+	future = Future()
+	job.add_done_callback(lambda done: finish_synthesis(done, future, key))
+
+	return future
+
+
+def finish_synthesis(job: Future, future: Future, key: Optional[str]) -> None:
+	""" Wraps the synthesized audio in a WAV file, caches it and resolves the WAV future """
+	if job.cancelled():
+		future.cancel()
+		return
+
+	error: Optional[BaseException] = job.exception()
+	if error is not None:
+		future.set_exception(error)
+		return
+
+	try:
+		pcm, framerate = job.result()
+		wav: bytes = pcm_to_wav(pcm, framerate)
+
+	except Exception as e:
+		future.set_exception(e)
+		return
+
+	if key is not None:
+		tts_cache.put(key, wav)
+
+	future.set_result(wav)
+
+
+# Items of the agent recommendation lists, "- <place name> a <distance> km"
+LIST_ITEM_PATTERN: re.Pattern = re.compile(r"^- (.+?) (a \d+(?:\.\d+)? km)$", re.MULTILINE)
+WORD_PATTERN: re.Pattern = re.compile(r"\w")
+
+
+def split_segments(text: str) -> list[list[str]]:
+	""" Splits a list reply in lines, and every list item in its place name and its distance """
+	lines: list[list[str]] = []
+	for line in text.splitlines():
+		line = line.strip()
+		if not WORD_PATTERN.search(line):
+			continue
+
+		match: Optional[re.Match] = LIST_ITEM_PATTERN.fullmatch(line)
+		lines.append(list(match.groups()) if match is not None else [line])
+
+	return lines
+
+
+def synthesize_segmented_wav(text: str, block: bool = False) -> bytes:
+	""" Synthesizes a list reply by segments, so headers and place names are cached across replies
+
+	Segments missing from the cache are sent to the workers a few at a time, and the audios are
+	joined with a short pause between the segments of a line and a longer one between lines.
+	"""
+	lines: list[list[str]] = []
+	for line in split_segments(text):
+		# Segments left with only punctuation, like a "***:" header, have nothing to synthesize
+		segments: list[str] = [segment for segment in map(format_text, line) if WORD_PATTERN.search(segment)]
+		if segments:
+			lines.append(segments)
+
+	jobs: dict[str, Future] = {}
+	for line in lines:
+		for segment in line:
+			if segment in jobs:
+				continue
+
+			running: list[Future] = [job for job in jobs.values() if not job.done()]
+			if len(running) >= TTS_BATCH_IN_FLIGHT:
+				wait(running, return_when=FIRST_COMPLETED)
+
+			jobs[segment] = submit_wav(segment, block, TTS_SUBMIT_TIMEOUT if block else None)
+			# Once a segment is accepted the reply is being served, so the rest wait for a slot
+			if not jobs[segment].done():
+				block = True
+
+	chunks: list[bytes] = []
+	framerate: Optional[int] = None
+	for line in lines:
+		for index, segment in enumerate(line):
+			pcm, segment_framerate = wav_to_pcm(jobs[segment].result())
+			if framerate is None:
+				framerate = segment_framerate
+			elif segment_framerate != framerate:
+				raise ValueError(f"Segment frame rate {segment_framerate} differs from {framerate}")
+
+			if chunks:
+				chunks.append(silence_pcm(framerate, TTS_SEGMENT_PAUSE_MS if index else TTS_LINE_PAUSE_MS))
+			chunks.append(pcm)
+
+	logger.debug(f"Synthesized list reply from {len(jobs)} segments")
+	return pcm_to_wav(b"".join(chunks), framerate)
+
+
+def synthesize_wav(text: str, block: bool = False) -> bytes:
+	""" Returns the WAV file of a text, taken from the cache when it was already synthesized
+
+	Raises WorkerPoolFull when the TTS queue is full, unless block waits for a free slot.
+	"""
+	if TTS_SEGMENTS_ENABLED and tts_cache is not None and LIST_ITEM_PATTERN.search(text):
+		return synthesize_segmented_wav(text, block)
+
+	return submit_wav(format_text(text), block, TTS_SUBMIT_TIMEOUT if block else None).result()
+
+
+def wav_to_audio_data(wav: bytes) -> dict:
+	started_at: float = perf_counter()
+	with wave.open(BytesIO(wav), "rb") as file:
 		nchannels: int = file.getnchannels()
 		sampwidth: int = file.getsampwidth()
 		framerate: int = file.getframerate()
@@ -127,6 +314,8 @@ def tts_func(text: str) -> dict:
 		audio: bytes = file.readframes(nframes)
 		audio_base64: str = b64encode(audio).decode("utf-8")
 
+	encoder_stats.record("application/json", responses=1, input_bytes=len(wav), output_bytes=len(audio_base64), encode_seconds=perf_counter() - started_at)
+
 	return {
 		"nchannels": nchannels,
 		"sampwidth": sampwidth,
@@ -137,3 +326,90 @@ def tts_func(text: str) -> dict:
 		"duration": duration,
 		"audio": audio_base64
 	}
+
+
+def tts_func(text: str, block: bool = False) -> dict:
+	return wav_to_audio_data(synthesize_wav(text, block))
+
+
+# Sentences end on punctuation followed by spaces, so decimals, URLs and "hrs." keep their dots
+SENTENCE_END_PATTERN: re.Pattern = re.compile(r"(?<=[.!?])(?<!hrs\.)\s+|\n+")
+
+
+def split_sentences(text: str) -> list[str]:
+	return [sentence.strip() for sentence in SENTENCE_END_PATTERN.split(text) if WORD_PATTERN.search(sentence)]
+
+
+def tts_stream(text: str) -> Iterator[dict]:
+	""" Synthesizes a text one sentence at a time, yielding each audio as soon as it is ready """
+	for index, sentence in enumerate(split_sentences(text)):
+		yield {
+			"index": index,
+			"text": sentence,
+			# The response has already started, so sentences wait for a worker instead of failing
+			"audio_data": tts_func(sentence, block=True)
+		}
+
+
+def prerender_tts(texts: list[str]) -> None:
+	""" Fills the TTS cache with texts that are spoken often """
+	logger.info(f"Pre-rendering {len(texts)} TTS responses...")
+	for text in texts:
+		try:
+			synthesize_wav(text, block=True)
+
+		except Exception as e:
+			logger.error(f"Error pre-rendering TTS response: {e}")
+
+
+def tts_batch_results(job: Future, indexes: list[int]) -> Iterator[dict]:
+	try:
+		result: dict = {"status": "Success", "audio_data": wav_to_audio_data(job.result())}
+
+	except Exception as e:
+		logger.error(f"Error during batch tts: {e}")
+		result = {"status": "Failed", "message": GENERAL_ERROR_MESSAGE, "error_code": "TT.500"}
+
+	for index in indexes:
+		yield {"index": index, **result}
+
+
+def tts_batch(texts: list[str]) -> Iterator[dict]:
+	""" Synthesizes many texts over the TTS workers, yielding each result as soon as it is ready
+
+	The longest texts are submitted first so the short ones fill the workers at the end instead of
+	a long one finishing alone, repeated texts are synthesized once and failures are per text.
+	"""
+	indexes: dict[str, list[int]] = {}
+	for index, text in enumerate(texts):
+		try:
+			text = format_text(text)
+
+		except Exception as e:
+			logger.error(f"Error formatting batch text: {e}")
+			yield {"index": index, "status": "Failed", "message": GENERAL_ERROR_MESSAGE, "error_code": "TT.500"}
+			continue
+
+		if not WORD_PATTERN.search(text):
+			yield {"index": index, "status": "Failed", "message": "Text has nothing to synthesize", "error_code": "TT.D400"}
+			continue
+
+		indexes.setdefault(text, []).append(index)
+
+	# Only a few texts are queued at a time so the batch doesn't take every slot from interactive requests
+	jobs: dict[Future, str] = {}
+	for text in sorted(indexes, key=len, reverse=True):
+		if len(jobs) >= TTS_BATCH_IN_FLIGHT:
+			done, _ = wait(jobs, return_when=FIRST_COMPLETED)
+			for job in done:
+				yield from tts_batch_results(job, indexes[jobs.pop(job)])
+
+		try:
+			jobs[submit_wav(text, block=True, timeout=TTS_SUBMIT_TIMEOUT)] = text
+
+		except WorkerPoolFull:
+			for index in indexes[text]:
+				yield {"index": index, "status": "Failed", "message": "TTS service is busy", "error_code": "TT.503"}
+
+	for job in as_completed(jobs):
+		yield from tts_batch_results(job, indexes[jobs[job]])
@@ -0,0 +1,91 @@
+import re
+import json
+import pandas as pd
+from time import time
+from threading import Lock
+from typing import Optional
+from logging import Logger, getLogger
+
+from app.resources.config import *
+from app.resources.models import Place
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.grammar")
+
+# Vosk grammars are made of lowercase words, punctuation is not part of them
+NON_WORD_PATTERN: re.Pattern = re.compile(r"[^\w\s]")
+SPACES_PATTERN: re.Pattern = re.compile(r"\s+")
+
+
+def normalize_phrase(phrase: str) -> str:
+	return SPACES_PATTERN.sub(' ', NON_WORD_PATTERN.sub(' ', phrase.lower())).strip()
+
+
+class PlaceGrammar:
+	""" Vosk grammar made of the catalog place names, categories and common query words """
+
+	def __init__(self) -> None:
+		self.lock: Lock = Lock()
+		self.grammar: Optional[str] = None
+		self.stale: bool = True
+		self.phrases: int = 0
+		self.builds: int = 0
+		self.built_at: Optional[float] = None
+
+	def invalidate(self) -> None:
+		""" Marks the grammar to be rebuilt, called whenever the places catalog changes """
+		self.stale = True
+
+	def get_place_names(self) -> set[str]:
+		names: set[str] = set(pd.read_csv(DATASET_ABSPATH, usecols=["name"])["name"].dropna())
+
+		try:
+			names.update(name for (name,) in Place.query.with_entities(Place.name).all())
+
+		except Exception as e:
+			logger.error(f"Error getting place names from database, using the dataset only: {e}")
+
+		return names
+
+	def build(self) -> str:
+		phrases: set[str] = {normalize_phrase(name) for name in self.get_place_names()}
+		phrases.update(normalize_phrase(categoria) for categoria in CATEGORIAS)
+		phrases.update(normalize_phrase(phrase) for phrase in ASR_GRAMMAR_PHRASES)
+		phrases.discard("")
+
+		return json.dumps(sorted(phrases) + ["[unk]"], ensure_ascii=False)
+
+	def get(self) -> str:
+		""" Returns the grammar, rebuilding it first if the catalog changed. Needs an app context """
+		if self.stale or self.grammar is None:
+			with self.lock:
+				if self.stale or self.grammar is None:
+					logger.info("Building places grammar for speech recognition...")
+					self.stale = False
+					self.grammar = self.build()
+					self.phrases = len(json.loads(self.grammar))
+					self.builds += 1
+					self.built_at = time()
+
+		return self.grammar
+
+	def stats(self) -> dict:
+		return {
+			"phrases": self.phrases,
+			"builds": self.builds,
+			"built_at": self.built_at,
+			"stale": self.stale
+		}
+
+
+place_grammar: PlaceGrammar = PlaceGrammar()
+
+
+def get_mode_grammar(mode: Optional[str]) -> Optional[str]:
+	""" Returns the grammar of a speech recognition mode, None for free-form recognition """
+	if mode is None or mode == "free":
+		return None
+	if mode == "places":
+		return place_grammar.get()
+
+	raise ValueError(f"Unknown speech recognition mode: {mode}")
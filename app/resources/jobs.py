@@ -0,0 +1,237 @@
+import json
+import sqlite3
+from uuid import uuid4
+from time import time
+from flask import Flask
+from threading import Condition, Lock, BoundedSemaphore
+from os import makedirs
+from os.path import dirname
+from typing import Any, Callable, Optional
+from logging import Logger, getLogger
+from concurrent.futures import ThreadPoolExecutor
+
+from app.resources.config import *
+from app.resources.workers import AdmissionLimit
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.jobs")
+
+JOB_QUEUED: str = "queued"
+JOB_RUNNING: str = "running"
+JOB_DONE: str = "done"
+JOB_FAILED: str = "failed"
+JOB_FINISHED_STATUSES: list[str] = [JOB_DONE, JOB_FAILED]
+
+
+class JobQueueFull(Exception):
+	""" Raised when a job is submitted while JOBS_MAX_PENDING jobs are pending """
+
+
+class JobStore:
+	""" SQLite store of asynchronous model jobs that survives restarts """
+
+	def __init__(self, path: str = JOBS_DB_ABSPATH) -> None:
+		self.path: str = path
+		self.initialized: bool = False
+		self.init_lock: Lock = Lock()
+
+	def connect(self) -> sqlite3.Connection:
+		if not self.initialized:
+			with self.init_lock:
+				if not self.initialized:
+					self.initialize()
+					self.initialized = True
+
+		connection: sqlite3.Connection = sqlite3.connect(self.path, timeout=10)
+		connection.row_factory = sqlite3.Row
+		return connection
+
+	def initialize(self) -> None:
+		makedirs(dirname(self.path), exist_ok=True)
+		with sqlite3.connect(self.path, timeout=10) as connection:
+			connection.execute("PRAGMA journal_mode=WAL")
+			connection.execute("""
+				CREATE TABLE IF NOT EXISTS jobs (
+					id TEXT PRIMARY KEY,
+					kind TEXT NOT NULL,
+					user_id INTEGER,
+					status TEXT NOT NULL,
+					result TEXT,
+					error TEXT,
+					created_at REAL NOT NULL,
+					updated_at REAL NOT NULL,
+					expires_at REAL
+				)
+			""")
+			connection.execute("CREATE INDEX IF NOT EXISTS jobs_expires_at ON jobs (expires_at)")
+
+			# Jobs of a previous process will never finish
+			connection.execute(
+				"UPDATE jobs SET status = ?, error = ?, updated_at = ?, expires_at = ? WHERE status IN (?, ?)",
+				(JOB_FAILED, "Interrupted by a server restart", time(), time() + JOBS_RESULT_TTL, JOB_QUEUED, JOB_RUNNING)
+			)
+		connection.close()
+
+	def create(self, kind: str, user_id: Optional[int]) -> str:
+		job_id: str = uuid4().hex
+		now: float = time()
+		connection: sqlite3.Connection = self.connect()
+		with connection:
+			connection.execute(
+				"INSERT INTO jobs (id, kind, user_id, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+				(job_id, kind, user_id, JOB_QUEUED, now, now)
+			)
+		connection.close()
+
+		return job_id
+
+	def update(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+		now: float = time()
+		expires_at: Optional[float] = now + JOBS_RESULT_TTL if status in JOB_FINISHED_STATUSES else None
+		connection: sqlite3.Connection = self.connect()
+		with connection:
+			connection.execute(
+				"UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ?, expires_at = ? WHERE id = ?",
+				(status, json.dumps(result) if result is not None else None, error, now, expires_at, job_id)
+			)
+		connection.close()
+
+	def get(self, job_id: str) -> Optional[dict]:
+		connection: sqlite3.Connection = self.connect()
+		row: Optional[sqlite3.Row] = connection.execute(
+			"SELECT * FROM jobs WHERE id = ? AND (expires_at IS NULL OR expires_at > ?)",
+			(job_id, time())
+		).fetchone()
+		connection.close()
+
+		if row is None:
+			return None
+
+		return {
+			"id": row["id"],
+			"kind": row["kind"],
+			"user_id": row["user_id"],
+			"status": row["status"],
+			"result": json.loads(row["result"]) if row["result"] is not None else None,
+			"error": row["error"],
+			"created_at": row["created_at"],
+			"updated_at": row["updated_at"],
+			"expires_at": row["expires_at"]
+		}
+
+	def cleanup(self) -> int:
+		connection: sqlite3.Connection = self.connect()
+		with connection:
+			deleted: int = connection.execute("DELETE FROM jobs WHERE expires_at <= ?", (time(),)).rowcount
+		connection.close()
+
+		return deleted
+
+
+class JobRunner:
+	""" Runs model functions in the background and keeps their state in a JobStore """
+
+	def __init__(self, store: JobStore, max_pending: int = JOBS_MAX_PENDING) -> None:
+		self.store: JobStore = store
+		self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=JOBS_WORKERS, thread_name_prefix="jobs")
+		# The executor queue has no limit, so queued plus running jobs are bounded here
+		self.slots: BoundedSemaphore = BoundedSemaphore(max_pending)
+		self.last_cleanup: float = 0.0
+		# Status of the pending jobs, each with a condition notified when it changes
+		self.statuses: dict[str, str] = {}
+		self.conditions: dict[str, Condition] = {}
+		self.conditions_lock: Lock = Lock()
+
+	def submit(self, app: Flask, kind: str, user_id: Optional[int], function: Callable, *args: Any) -> str:
+		""" Queues a job and returns its id, raises JobQueueFull if too many jobs are pending """
+		self.cleanup()
+		if not self.slots.acquire(blocking=False):
+			raise JobQueueFull("Too many pending jobs")
+
+		try:
+			job_id: str = self.store.create(kind, user_id)
+			with self.conditions_lock:
+				self.statuses[job_id] = JOB_QUEUED
+				self.conditions[job_id] = Condition()
+			self.executor.submit(self.run, app, job_id, function, *args)
+
+		except Exception:
+			self.slots.release()
+			raise
+
+		return job_id
+
+	def run(self, app: Flask, job_id: str, function: Callable, *args: Any) -> None:
+		try:
+			self.run_job(app, job_id, function, *args)
+		finally:
+			self.slots.release()
+			# Event streams still waiting on the job read its final state from the store
+			self.set_status(job_id, None)
+
+	def run_job(self, app: Flask, job_id: str, function: Callable, *args: Any) -> None:
+		logger.debug(f"Running {job_id} job...")
+		try:
+			self.store.update(job_id, JOB_RUNNING)
+			self.set_status(job_id, JOB_RUNNING)
+
+			with app.app_context():
+				result: Any = function(*args)
+
+			self.store.update(job_id, JOB_DONE, result=result)
+			logger.info(f"Job {job_id} completed successfully")
+
+		except Exception as e:
+			logger.error(f"Error running job {job_id}: {e}")
+			try:
+				self.store.update(job_id, JOB_FAILED, error=GENERAL_ERROR_MESSAGE)
+			except Exception as e:
+				logger.error(f"Error saving failed job {job_id}: {e}")
+
+	def set_status(self, job_id: str, status: Optional[str]) -> None:
+		""" Wakes the event streams of a job, a None status forgets the finished job """
+		with self.conditions_lock:
+			condition: Optional[Condition] = self.conditions.get(job_id)
+			if status is None:
+				self.conditions.pop(job_id, None)
+
+		if condition is None:
+			return
+
+		with condition:
+			if status is None:
+				self.statuses.pop(job_id, None)
+			else:
+				self.statuses[job_id] = status
+			condition.notify_all()
+
+	def wait_for_change(self, job_id: str, status: str, timeout: float) -> bool:
+		""" Waits until a job leaves the given status, False if it isn't pending in this process """
+		with self.conditions_lock:
+			condition: Optional[Condition] = self.conditions.get(job_id)
+
+		if condition is None:
+			return False
+
+		with condition:
+			condition.wait_for(lambda: self.statuses.get(job_id) != status, timeout=timeout)
+
+		return True
+
+	def cleanup(self) -> None:
+		""" Deletes expired jobs, at most once per cleanup interval """
+		if time() - self.last_cleanup < JOBS_CLEANUP_INTERVAL:
+			return
+
+		self.last_cleanup = time()
+		try:
+			deleted: int = self.store.cleanup()
+			logger.debug(f"Deleted {deleted} expired jobs")
+
+		except Exception as e:
+			logger.error(f"Error deleting expired jobs: {e}")
+
+
+job_store: JobStore = JobStore()
+job_runner: JobRunner = JobRunner(job_store)
+job_event_streams: AdmissionLimit = AdmissionLimit("job event streams", JOBS_EVENTS_MAX_STREAMS)
@@ -188,7 +188,7 @@ class AgenteConversacional:
 	# ---------------------------- UBICACION --------------------------------------
 	def recomendar_sitios_cercanos(self, lat, lon, radio_km=None) -> str:
 		if 'latitude' not in self.df.columns or 'longitude' not in self.df.columns:
-			return "Datos de ubicación no disponibles."
+			return AGENT_NO_LOCATION_DATA_RESPONSE
 
 		sitios_cercanos = self.df.dropna(subset=['latitude', 'longitude']).copy()
 		sitios_cercanos['distancia'] = sitios_cercanos.apply(
@@ -202,7 +202,7 @@ class AgenteConversacional:
 		sitios_cercanos = sitios_cercanos.sort_values(by='distancia')
 
 		if sitios_cercanos.empty:
-			return "Lo siento, no encontré sitios turísticos en el radio especificado."
+			return AGENT_NO_PLACES_RESPONSE
 
 		recomendacion = "Te recomiendo los siguientes lugares cercanos a tu ubicación:\n"
 		for _, row in sitios_cercanos.iterrows():
@@ -212,7 +212,7 @@ class AgenteConversacional:
 	# ---------------------------- LUGARES POR CATEGORIA -----------------------------
 	def recomendar_sitios_cercanos_categoria(self, lat, lon, radio_km=None, categoria=None) -> str:
 		if 'latitude' not in self.df.columns or 'longitude' not in self.df.columns:
-			return "Datos de ubicación no disponibles."
+			return AGENT_NO_LOCATION_DATA_RESPONSE
 
 		sitios_cercanos: DataFrame = self.df.dropna(subset=['latitude', 'longitude']).copy()
 
@@ -233,7 +233,7 @@ class AgenteConversacional:
 			if categoria:
 				return f"Lo siento, no encontré sitios de la categoría '{categoria}' en el radio especificado."
 			else:
-				return "Lo siento, no encontré sitios turísticos en el radio especificado."
+				return AGENT_NO_PLACES_RESPONSE
 
 		if categoria:
 			recomendacion = f"Te recomiendo los siguientes lugares de la categoría '{categoria}' cercanos a tu ubicación:\n"
@@ -256,10 +256,10 @@ class AgenteConversacional:
 						return self.recomendar_sitios_cercanos_categoria(lat, lon, distancia, categoria)
 
 					else:
-						return "No se pudo obtener la ubicación del usuario."
+						return AGENT_NO_USER_LOCATION_RESPONSE
 
 				except ValueError:
-					return "Por favor, ingresa coordenadas válidas y un número para el radio de búsqueda."
+					return AGENT_INVALID_COORDINATES_RESPONSE
 			else:
 				self.esperando_respuesta = True
 				self.contexto_pendiente = 'solicitar_distancia_categoria'
@@ -267,7 +267,7 @@ class AgenteConversacional:
 				return f"¿Deseas que busque {categoria}s en una distancia específica? Por favor, indícame la distancia en kilómetros, o escribe 'todos' para mostrarte todos los {categoria}s sin filtrar por distancia."
 
 		else:
-			return "Lo siento, no pude determinar la categoría de sitio que te interesa. Por favor, especifica una categoría como 'Museo', 'Monumento', 'Centro cultural', etc."
+			return AGENT_UNKNOWN_CATEGORY_RESPONSE
 
 	#----------------------------- LUGARES POR REFERENCIA --------------------------------
 	def manejar_lugares_referencia(self, mensaje) -> str:
@@ -285,10 +285,10 @@ class AgenteConversacional:
 					return f"No pude encontrar la ubicación de {lugar_referencia}."
 
 			except ValueError:
-				return "Tengo dificultades por interpretar el lugar de referencia, trata de ser más específico con su nombre."
+				return AGENT_UNCLEAR_REFERENCE_RESPONSE
 
 		else:
-			return "Por favor, especifica un lugar de referencia."
+			return AGENT_MISSING_REFERENCE_RESPONSE
 
 	def manejar_respuesta_pendiente(self, respuesta_usuario, user_id) -> str:
 			if self.contexto_pendiente == 'solicitar_distancia':
@@ -301,7 +301,7 @@ class AgenteConversacional:
 						return self.recomendar_sitios_cercanos(lat, lon, distancia)
 
 					else:
-						return "No se pudo obtener la ubicación del usuario."
+						return AGENT_NO_USER_LOCATION_RESPONSE
 
 				elif 'todos' in respuesta_usuario.lower():
 					self.esperando_respuesta = False
@@ -311,7 +311,7 @@ class AgenteConversacional:
 						return self.recomendar_sitios_cercanos(lat, lon)
 
 					else:
-						return "No se pudo obtener la ubicación del usuario."
+						return AGENT_NO_USER_LOCATION_RESPONSE
 
 				else:
 					self.esperando_respuesta = False
@@ -330,7 +330,7 @@ class AgenteConversacional:
 						return self.recomendar_sitios_cercanos_categoria(lat, lon, distancia, categoria)
 
 					else:
-						return "No se pudo obtener la ubicación del usuario."
+						return AGENT_NO_USER_LOCATION_RESPONSE
 
 				elif 'todos' in respuesta_usuario.lower():
 					self.esperando_respuesta = False
@@ -340,7 +340,7 @@ class AgenteConversacional:
 					if lat is not None and lon is not None:
 						return self.recomendar_sitios_cercanos_categoria(lat, lon, categoria=categoria)
 					else:
-						return "No se pudo obtener la ubicación del usuario."
+						return AGENT_NO_USER_LOCATION_RESPONSE
 
 				else:
 					self.esperando_respuesta = False
@@ -351,12 +351,12 @@ class AgenteConversacional:
 			else:
 				self.esperando_respuesta = False
 				self.contexto_pendiente = None
-				return "Lo siento, no entendí tu respuesta. ¿Podrías intentarlo de nuevo?"
+				return AGENT_NOT_UNDERSTOOD_RESPONSE
 
 	# --------------------------------- AGENTE --------------------------------------
 	def consultar_agente(self, pregunta: str, user_id: int, radio_km: int = 7) -> str:
 		if self.error_count >= MAX_ERROR_COUNT:
-			return "Lo siento, por el momento no puedo ayudarte. Por favor, intenta de nuevo más tarde."
+			return AGENT_UNAVAILABLE_RESPONSE
 
 		# Verificar si estamos esperando una respuesta
 		if self.esperando_respuesta:
@@ -365,10 +365,10 @@ class AgenteConversacional:
 		intencion: str = self.analizar_intencion_llm(pregunta)
 
 		if intencion == 'saludo':
-			return "¡Hola! ¿En qué puedo ayudarte hoy con información turística sobre la Ciudad de México?"
+			return AGENT_GREETING_RESPONSE
 
 		elif intencion == 'despedida':
-			return "Gracias por usar TripBot. ¡Espero que tengas un excelente día! 😊"
+			return AGENT_FAREWELL_RESPONSE
 
 		elif intencion == 'ubicacion':
 			distancia: Optional[float] = self.extraer_numero(pregunta)
@@ -378,12 +378,12 @@ class AgenteConversacional:
 					return self.recomendar_sitios_cercanos(lat, lon, distancia)
 
 				else:
-					return "No se pudo obtener la ubicación del usuario."
+					return AGENT_NO_USER_LOCATION_RESPONSE
 
 			else:
 				self.esperando_respuesta = True
 				self.contexto_pendiente = 'solicitar_distancia'
-				return "¿Deseas que busque lugares en una distancia específica? Por favor, indícame la distancia en kilómetros, o escribe 'todos' para mostrarte todos los lugares sin filtrar por distancia."
+				return AGENT_ASK_DISTANCE_RESPONSE
 
 		elif intencion == 'ubicacion_cercana':
 			return self.manejar_ubicacion_cercana(pregunta, user_id)
@@ -397,7 +397,7 @@ class AgenteConversacional:
 				resultados: DataFrame = self.df[self.df['description'].str.contains('|'.join(palabras_clave), case=False, na=False)]
 
 				if resultados.empty:
-					return "Lo siento, no tengo información específica sobre ese tema, pero puedo recomendarte lugares turísticos en la Ciudad de México."
+					return AGENT_NO_INFORMATION_RESPONSE
 
 				prompt_template_informacion: str = f"""
 				Eres un guía turístico experto, especializado en brindar información sobre destinos turísticos de la Ciudad de México. Tu tono debe ser amable, entusiasta y profesional.
@@ -418,7 +418,7 @@ class AgenteConversacional:
 				return self.manejar_errores(e)
 
 		elif intencion == 'irrelevante':
-			return "Lo siento, no estoy seguro de haber entendido tu pregunta. Recuerda que estoy aquí para proporcionarte información sobre turismo en la Ciudad de México. ¡No dudes en intentarlo de nuevo!"
+			return AGENT_IRRELEVANT_RESPONSE
 
 		else:
-			return "Lo siento, no pude entender tu intención. Por favor, intenta formular tu pregunta de otra manera."
+			return AGENT_UNKNOWN_INTENT_RESPONSE
@@ -0,0 +1,127 @@
+from os import makedirs, remove, replace
+from os.path import join
+from time import perf_counter
+from threading import Lock
+from tempfile import NamedTemporaryFile
+from logging import Logger, getLogger
+from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+
+from app.resources.config import *
+from app.resources.audio import encode_audio
+from app.resources.functions import synthesize_wav
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.narration")
+
+
+class NarrationRenderer:
+	""" Renders the place descriptions to compressed audio files in the background
+
+	Narrations are rendered one at a time so they never take more than one TTS worker from the
+	interactive requests, and a place updated again before its render starts is rendered once.
+	"""
+
+	def __init__(self, directory: str = NARRATIONS_ABSPATH, mimetype: str = NARRATIONS_MIMETYPE) -> None:
+		self.directory: str = directory
+		self.mimetype: str = mimetype
+		self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="narrations")
+		self.pending: dict[int, str] = {}
+		self.rendering: dict[int, str] = {}
+		self.removed: set[int] = set()
+		self.lock: Lock = Lock()
+
+		self.rendered: int = 0
+		self.errors: int = 0
+		self.render_seconds: float = 0.0
+
+	def path(self, place_id: int) -> str:
+		return join(self.directory, f"{place_id}{NARRATIONS_SUFFIX}")
+
+	def schedule(self, place_id: int, text: str) -> None:
+		""" Queues the narration of a place, replacing the text of a render that didn't start yet """
+		if not NARRATIONS_ENABLED or not text or not text.strip():
+			return
+
+		with self.lock:
+			if place_id not in self.pending and self.rendering.get(place_id) == text:
+				return
+
+			queued: bool = place_id in self.pending
+			self.pending[place_id] = text
+			self.removed.discard(place_id)
+
+		if not queued:
+			logger.debug(f"Scheduling narration of place {place_id}...")
+			self.executor.submit(self.render, place_id)
+
+	def remove(self, place_id: int) -> None:
+		""" Deletes the narration of a place, a render already running is discarded when it ends """
+		with self.lock:
+			self.pending.pop(place_id, None)
+			self.removed.add(place_id)
+
+		try:
+			remove(self.path(place_id))
+
+		except FileNotFoundError:
+			pass
+
+		except Exception as e:
+			logger.error(f"Error deleting narration of place {place_id}: {e}")
+
+	def render(self, place_id: int) -> None:
+		with self.lock:
+			text: Optional[str] = self.pending.pop(place_id, None)
+			if text is None:
+				return
+			self.rendering[place_id] = text
+
+		logger.debug(f"Rendering narration of place {place_id}...")
+		start: float = perf_counter()
+		try:
+			audio: bytes = encode_audio(synthesize_wav(text, block=True), self.mimetype)
+
+			makedirs(self.directory, exist_ok=True)
+			# Written aside and renamed so a narration being served is never partial
+			with NamedTemporaryFile(dir=self.directory, suffix=".tmp", delete=False) as file:
+				file.write(audio)
+
+			with self.lock:
+				if place_id in self.removed:
+					remove(file.name)
+					return
+				replace(file.name, self.path(place_id))
+
+		except Exception as e:
+			logger.error(f"Error rendering narration of place {place_id}: {e}")
+			with self.lock:
+				self.errors += 1
+			return
+
+		finally:
+			with self.lock:
+				self.rendering.pop(place_id, None)
+
+		elapsed: float = perf_counter() - start
+		with self.lock:
+			self.rendered += 1
+			self.render_seconds += elapsed
+
+		logger.info(f"Narration of place {place_id} rendered in {elapsed:.2f} seconds")
+
+	def stats(self) -> dict:
+		with self.lock:
+			return {
+				"enabled": NARRATIONS_ENABLED,
+				"mimetype": self.mimetype,
+				"pending": len(self.pending),
+				"rendered": self.rendered,
+				"errors": self.errors,
+				"render_seconds": {
+					"avg": self.render_seconds / self.rendered if self.rendered else 0.0
+				}
+			}
+
+
+narration_renderer: NarrationRenderer = NarrationRenderer()
@@ -1,6 +1,8 @@
 from flask_restful import reqparse
 from flask_restful.reqparse import Namespace
 
+from app.resources.config import ASR_MODES
+
 
 ###############################################################################
 ######################### Places Blueprints Parsers ###########################
@@ -170,6 +172,14 @@ def create_post_coordinates_parser() -> Namespace:
 def create_speech_recognition_model_parser() -> Namespace:
 	parser = reqparse.RequestParser()
 	parser.add_argument("audio", required=True, help="Audio field (str) required")
+	parser.add_argument("mode", choices=ASR_MODES, help="Mode field (str)")
+	return parser.parse_args()
+
+
+def create_speech_recognition_batch_model_parser() -> Namespace:
+	parser = reqparse.RequestParser()
+	parser.add_argument("clips", action="append", required=True, help="Clips field (list[str]) required")
+	parser.add_argument("mode", choices=ASR_MODES, help="Mode field (str)")
 	return parser.parse_args()
 
 
@@ -184,6 +194,12 @@ def create_tts_model_parser() -> Namespace:
 	parser.add_argument("text", required=True, help="Text field (str) required")
 	return parser.parse_args()
 
+
+def create_tts_batch_model_parser() -> Namespace:
+	parser = reqparse.RequestParser()
+	parser.add_argument("texts", action="append", required=True, help="Texts field (list[str]) required")
+	return parser.parse_args()
+
 ###############################################################################
 ########################## Logs Blueprints Parsers ############################
 ###############################################################################
@@ -17,7 +17,8 @@ swagger_template: dict[str, Any] = {
 		{ "name": "Places", "description": "Places CRUD operations" },
 		{ "name": "Favorites", "description": "Favorites saved places by users" },
 		{ "name": "Users", "description": "Users CRUD operations" },
-		{ "name": "Models", "description": "Artificial intelligence models operations" }
+		{ "name": "Models", "description": "Artificial intelligence models operations" },
+		{ "name": "Jobs", "description": "Background artificial intelligence models jobs" }
 	],
 	"paths": {
 		'/': {
@@ -832,6 +833,66 @@ swagger_template: dict[str, Any] = {
 				"security": [{ "bearerAuth": [] }]
 			}
 		},
+		"/places/{id}/narration": {
+			"get": {
+				"tags": ["Places"],
+				"summary": "Retrieves the narration of a place",
+				"description": "Retrieves the pre-rendered audio of a place description. It is rendered in the background when the place is created or its description updated, so playing it does not run the TTS model. Supports ETag revalidation and Range requests.",
+				"produces": ["audio/ogg"],
+				"parameters": [
+					{
+						"name": "id",
+						"required": True,
+						"in": "path",
+						"schema": { "type": "integer", "format": "int64", "example": 1 }
+					}
+				],
+				"responses": {
+					"200": {
+						"description": "Narration audio",
+						"content": { "audio/ogg": { "schema": { "type": "string", "format": "binary" } } }
+					},
+					"206": {
+						"description": "Requested range of the narration audio",
+						"content": { "audio/ogg": { "schema": { "type": "string", "format": "binary" } } }
+					},
+					"304": {
+						"description": "Narration not modified since the given ETag"
+					},
+					"416": {
+						"description": "Requested range outside of the narration audio",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Requested range not satisfiable" },
+										"error_code": { "type": "string", "example": "TT.D416" }
+									}
+								}
+							}
+						}
+					},
+					"404": {
+						"description": "Place not found, place without a description to narrate, or narration not rendered yet. Only the last one is worth retrying",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Narration not rendered yet, try again later" },
+										"error_code": { "type": "string", "example": "TT.D404" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
 		"/users/favorites": {
 			"get": {
 				"tags": ["Favorites"],
@@ -1734,14 +1795,22 @@ swagger_template: dict[str, Any] = {
 			"post": {
 				"tags": ["Models"],
 				"summary": "Generates a text from an audio",
-				"description": "Generates a text from a given audio data using a speech recognition artificial intelligence model",
+				"description": "Generates a text from a given audio data using a speech recognition artificial intelligence model. The audio can be sent as a raw audio/wav request body, as an \"audio\" multipart file or as a base64 string field.",
+				"consumes": ["application/json", "audio/wav", "audio/ogg", "audio/webm", "audio/aac", "audio/mp4", "audio/mpeg", "multipart/form-data"],
 				"parameters": [
 					{
 						"name": "audio",
 						"required": True,
 						"in": "body",
 						"schema": { "type": "string", "example": "UklGRiQYAwBXQVZFZm10IB ... AAAAAAAAA//8=" },
-						"description": "Audio data encoded in base64 format"
+						"description": "Audio data encoded in base64 format, a raw audio body or an audio multipart file. Parts without an audio type are detected from their content"
+					},
+					{
+						"name": "mode",
+						"required": False,
+						"in": "query",
+						"schema": { "type": "string", "enum": ["free", "places"], "example": "places" },
+						"description": "Recognition mode, \"places\" restricts the vocabulary to place names, categories and common query words"
 					}
 				],
 				"responses": {
@@ -1760,6 +1829,36 @@ swagger_template: dict[str, Any] = {
 							}
 						}
 					},
+					"400": {
+						"description": "Invalid or undecodable audio, like bad base64 data, a sample rate outside 8000 to 96000 Hz or a clip longer than 5 minutes",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Sample rate must be between 8000 and 96000 Hz" },
+										"error_code": { "type": "string", "example": "TT.D400" }
+									}
+								}
+							}
+						}
+					},
+					"503": {
+						"description": "Speech recognition queue is full, the Retry-After header tells when to try again",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Speech recognition service is busy, try again later" },
+										"error_code": { "type": "string", "example": "TT.503" }
+									}
+								}
+							}
+						}
+					},
 					"500": {
 						"description": "Internal Server Error",
 						"content": {
@@ -1831,7 +1930,8 @@ swagger_template: dict[str, Any] = {
 			"post": {
 				"tags": ["Models"],
 				"summary": "Generates an audio from a given text",
-				"description": "Generates an audio from a given text using a text-to-speech artificial intelligence model",
+				"description": "Generates an audio from a given text using a text-to-speech artificial intelligence model. The Accept header picks the response format: audio/ogg (Opus), audio/mpeg (MP3) and audio/wav return the audio file as the body, anything else returns base64 PCM in JSON.",
+				"produces": ["application/json", "audio/wav", "audio/ogg", "audio/mpeg"],
 				"parameters": [
 					{
 						"name": "text",
@@ -1867,6 +1967,21 @@ swagger_template: dict[str, Any] = {
 							}
 						}
 					},
+					"503": {
+						"description": "TTS queue is full, the Retry-After header tells when to try again",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "TTS service is busy, try again later" },
+										"error_code": { "type": "string", "example": "TT.503" }
+									}
+								}
+							}
+						}
+					},
 					"500": {
 						"description": "Internal Server Error",
 						"content": {
@@ -1885,88 +2000,751 @@ swagger_template: dict[str, Any] = {
 				},
 				"security": [{ "bearerAuth": [] }]
 			}
-		}
-	},
-	"components": {
-		"schemas": {
-			"Place": {
-				"type": "object",
-				"properties": {
-					"id": { "type": "integer", "format": "int64", "example": 1 },
-					"info": {
-						"type": "object",
-						"properties": {
-							"name": { "type": "string", "example": "Central Park" },
-							"classification": { "type": "string", "example": "Park" },
-							"punctuation": { "type": "number", "format": "float", "example": 4.5 },
-							"description": { "type": "string", "example": "A large public park" },
-							"schedules": { "type": "string", "example": "9:00 - 18:00" },
-							"services": { "type": "string", "example": "Restrooms, Parking" },
-							"activities": { "type": "string", "example": "Jogging, Picnics" },
-							"prices": { "type": "string", "example": "Free" },
-							"permanent_exhibitions": { "type": "string", "example": "Historical Statues" },
-							"temporal_exhibitions": { "type": "string", "example": "Art Gallery" },
-							"mail": { "type": "string", "example": "info@centralpark.com" },
-							"phone": { "type": "string", "example": "555-1234" },
-							"website": { "type": "string", "example": "http://centralpark.com" },
-							"sic_website": { "type": "string", "example": "http://sic.gob.mx/centralpark" }
+		},
+		"models/asr/stats": {
+			"get": {
+				"tags": ["Models"],
+				"summary": "Shows speech recognition stats",
+				"description": "Shows the speech recognition model pools stats. Only admin users can use this endpoint.",
+				"responses": {
+					"200": {
+						"description": "Speech recognition stats retrieved successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "Speech recognition stats retrieved successfully" },
+										"stats": {
+											"type": "object",
+											"properties": {
+												"recognizer_pools": {
+													"type": "array",
+													"items": {
+														"type": "object",
+														"properties": {
+															"model_path": { "type": "string", "example": "/app/app/static/vosk-model-small-es-0.42" },
+															"model_loaded": { "type": "boolean", "example": True },
+															"size": { "type": "integer", "format": "int64", "example": 4 },
+															"created": { "type": "integer", "format": "int64", "example": 2 },
+															"available": { "type": "integer", "format": "int64", "example": 1 },
+															"hits": { "type": "integer", "format": "int64", "example": 120 },
+															"waits": { "type": "integer", "format": "int64", "example": 3 },
+															"timeouts": { "type": "integer", "format": "int64", "example": 0 }
+														}
+													}
+												},
+												"worker_recognizer_pools": {
+													"type": "array",
+													"items": {
+														"type": "object",
+														"properties": {
+															"pid": { "type": "integer", "format": "int64", "example": 4213 },
+															"pools": { "type": "array", "items": { "type": "object" } }
+														}
+													}
+												}
+											}
+										}
+									}
+								}
+							}
 						}
 					},
-					"address": {
-						"type": "object",
-						"properties": {
-							"street_number": { "type": "string", "example": "123" },
-							"colony": { "type": "string", "example": "Downtown" },
-							"municipality": { "type": "string", "example": "New York" },
-							"state": { "type": "string", "example": "NY" },
-							"cp": { "type": "string", "example": "10001" },
-							"latitude": { "type": "number", "format": "float", "example": 40.785091 },
-							"longitude": { "type": "number", "format": "float", "example": -73.968285 },
-							"how_to_arrive": { "type": "string", "example": "Near the main gate" }
+					"403": {
+						"description": "Forbidden access",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Forbidden access" },
+										"error_code": { "type": "string", "example": "TT.D403" }
+									}
+								}
+							}
 						}
 					},
-					"reviews": {
-						"type": "object",
-						"properties": {
-							"general": { "type": "string", "example": "Great place for a walk" },
-							"historic": { "type": "string", "example": "Visited by famous figures" }
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
 						}
-					},
-					"created_at": { "type": "string", "format": "date-time", "example": "2024-01-01T10:00:00Z" },
-					"distance": { "type": "number", "format": "float", "example": 1.5 }
-				}
-			},
-			"AllFavorites": {
-				"type": "object",
-				"properties": {
-					"user": {
-						"type": "object",
-						"properties": {
-							"id": { "type": "integer", "format": "int64", "example": 1 },
-							"username": { "type": "string", "example": "Juan Perez" },
-							"mail": { "type": "string", "example": "example@example.com" }
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"models/tts/stream": {
+			"post": {
+				"tags": ["Models"],
+				"summary": "Streams the audio of a given text sentence by sentence",
+				"description": "Generates an audio from a given text one sentence at a time. Every sentence is sent as a server-sent audio event as soon as it is synthesized, followed by an end event, or an error event if the synthesis fails.",
+				"parameters": [
+					{
+						"name": "text",
+						"required": True,
+						"in": "body",
+						"schema": { "type": "string", "example": "Palacio de Bellas Artes theather is..." }
+					}
+				],
+				"responses": {
+					"200": {
+						"description": "TTS events stream",
+						"content": {
+							"text/event-stream": {
+								"schema": {
+									"type": "string",
+									"example": "event: audio\ndata: {\"index\": 0, \"text\": \"Palacio de Bellas Artes...\", \"audio_data\": {...}}\n\nevent: end\ndata: {\"sentences\": 1}"
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"models/tts/batch": {
+			"post": {
+				"tags": ["Models"],
+				"summary": "Generates the audios of many texts",
+				"description": "Synthesizes many texts with the same model used by models/tts. Results are streamed as newline delimited JSON as soon as each text is synthesized, so they don't keep the input order and carry the index of their text. A failed text does not fail the whole batch.",
+				"parameters": [
+					{
+						"name": "texts",
+						"required": True,
+						"in": "body",
+						"schema": { "type": "array", "items": { "type": "string" }, "example": ["Palacio de Bellas Artes theather is...", "Museo Soumaya is..."] }
+					}
+				],
+				"responses": {
+					"200": {
+						"description": "TTS results stream",
+						"content": {
+							"application/x-ndjson": {
+								"schema": {
+									"type": "string",
+									"example": "{\"index\": 1, \"status\": \"Success\", \"audio_data\": {...}}\n{\"index\": 0, \"status\": \"Failed\", \"message\": \"TTS service is busy\", \"error_code\": \"TT.503\"}\n"
+								}
+							}
 						}
 					},
-					"favorites": {
-						"type": "object",
-						"properties": {
-							"id": { "type": "integer", "format": "int64", "example": 1 },
-							"name": { "type": "string", "example": "Central Park" },
-							"classification": { "type": "string", "example": "Park" },
-							"punctuation": { "type": "number", "format": "float", "example": 4.5 },
-							"created_at": { "type": "string", "format": "date-time", "example": "2024-01-01T10:00:00Z" }
+					"400": {
+						"description": "Too many texts in batch",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "A batch can have at most 1000 texts" },
+										"error_code": { "type": "string", "example": "TT.D400" }
+									}
+								}
+							}
 						}
 					}
-				}
-			},
-			"Favorite": {
-				"type": "object",
-				"properties": {
-					"id": { "type": "integer", "format": "int64", "example": 1 },
-					"name": { "type": "string", "example": "Central Park" },
-					"classification": { "type": "string", "example": "Park" },
-					"punctuation": { "type": "number", "format": "float", "example": 4.5 },
-					"created_at": { "type": "string", "format": "date-time", "example": "2024-01-01T10:00:00Z" }
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"models/tts/stats": {
+			"get": {
+				"tags": ["Models"],
+				"summary": "Shows text-to-speech stats",
+				"description": "Shows the text-to-speech model readiness and synthesis stats. Only admin users can use this endpoint.",
+				"responses": {
+					"200": {
+						"description": "TTS stats retrieved successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "TTS stats retrieved successfully" },
+										"stats": {
+											"type": "object",
+											"properties": {
+												"engine": {
+													"type": "object",
+													"properties": {
+														"model_name": { "type": "string", "example": "tts_models/es/css10/vits" },
+														"device": { "type": "string", "example": "cpu" },
+														"ready": { "type": "boolean", "example": True },
+														"loading": { "type": "boolean", "example": False },
+														"error": { "type": "string", "example": None },
+														"loaded_at": { "type": "number", "format": "float", "example": 1717000000.0 },
+														"load_seconds": { "type": "number", "format": "float", "example": 4.2 },
+														"warmup_seconds": { "type": "number", "format": "float", "example": 0.9 },
+														"syntheses": { "type": "integer", "format": "int64", "example": 35 }
+													}
+												}
+											}
+										}
+									}
+								}
+							}
+						}
+					},
+					"403": {
+						"description": "Forbidden access",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Forbidden access" },
+										"error_code": { "type": "string", "example": "TT.D403" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"models/asr/batch": {
+			"post": {
+				"tags": ["Models"],
+				"summary": "Generates the texts of many audios",
+				"description": "Transcribes many audio clips in parallel with the same models used by models/asr. Clips can be sent as a list of base64 strings or as several \"audio\" multipart files. Results keep the input order and a failed clip does not fail the whole batch.",
+				"consumes": ["application/json", "multipart/form-data"],
+				"parameters": [
+					{
+						"name": "clips",
+						"required": True,
+						"in": "body",
+						"schema": { "type": "array", "items": { "type": "string" }, "example": ["UklGRiQYAwBXQVZFZm10IB ... AAAAAAAAA//8="] },
+						"description": "Audio clips encoded in base64 format"
+					},
+					{
+						"name": "mode",
+						"required": False,
+						"in": "query",
+						"schema": { "type": "string", "enum": ["free", "places"], "example": "places" },
+						"description": "Recognition mode used for every clip"
+					}
+				],
+				"responses": {
+					"201": {
+						"description": "Batch speech recognition process completed successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "Batch speech recognition process completed successfully" },
+										"results": {
+											"type": "array",
+											"items": {
+												"type": "object",
+												"properties": {
+													"index": { "type": "integer", "format": "int64", "example": 0 },
+													"status": { "type": "string", "example": "Success" },
+													"text": { "type": "string", "example": "Example text resulting by speech recognition process" },
+													"message": { "type": "string", "example": "Audio could not be processed" },
+													"error_code": { "type": "string", "example": "TT.D400" }
+												}
+											}
+										}
+									}
+								}
+							}
+						}
+					},
+					"400": {
+						"description": "Too many clips in batch",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "A batch can have at most 100 clips" },
+										"error_code": { "type": "string", "example": "TT.D400" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"jobs/asr": {
+			"post": {
+				"tags": ["Jobs"],
+				"summary": "Submits a speech recognition job",
+				"description": "Submits a speech recognition job that runs in the background. Accepts the same audio formats as models/asr.",
+				"parameters": [
+					{
+						"name": "audio",
+						"required": True,
+						"in": "body",
+						"schema": { "type": "string", "example": "UklGRiSAAABXQVZFZm10IBAAAAABAAEAgD4AAAB9AAACABAAZGF0YQCAAAA..." }
+					},
+					{
+						"name": "mode",
+						"required": False,
+						"in": "body",
+						"schema": { "type": "string", "enum": ["free", "places"], "example": "places" }
+					}
+				],
+				"responses": {
+					"202": {
+						"description": "Job submitted successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "Job submitted successfully" },
+										"job_id": { "type": "string", "example": "3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f" }
+									}
+								}
+							}
+						}
+					},
+					"400": {
+						"description": "Invalid audio, like a sample rate outside 8000 to 96000 Hz or a clip longer than 5 minutes",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Sample rate must be between 8000 and 96000 Hz" },
+										"error_code": { "type": "string", "example": "TT.D400" }
+									}
+								}
+							}
+						}
+					},
+					"503": {
+						"description": "Too many pending jobs, the Retry-After header tells when to try again",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Too many pending jobs, try again later" },
+										"error_code": { "type": "string", "example": "TT.503" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"jobs/tts": {
+			"post": {
+				"tags": ["Jobs"],
+				"summary": "Submits a text-to-speech job",
+				"description": "Submits a text-to-speech job that runs in the background",
+				"parameters": [
+					{
+						"name": "text",
+						"required": True,
+						"in": "body",
+						"schema": { "type": "string", "example": "Palacio de Bellas Artes theather is..." }
+					}
+				],
+				"responses": {
+					"202": {
+						"description": "Job submitted successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "Job submitted successfully" },
+										"job_id": { "type": "string", "example": "3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f" }
+									}
+								}
+							}
+						}
+					},
+					"503": {
+						"description": "Too many pending jobs, the Retry-After header tells when to try again",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Too many pending jobs, try again later" },
+										"error_code": { "type": "string", "example": "TT.503" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"jobs/agent/{id}": {
+			"post": {
+				"tags": ["Jobs"],
+				"summary": "Submits an agent job",
+				"description": "Submits an agent job that runs in the background",
+				"parameters": [
+					{
+						"name": "id",
+						"required": True,
+						"in": "path",
+						"schema": { "type": "integer", "format": "int64", "example": 1 }
+					},
+					{
+						"name": "prompt",
+						"required": True,
+						"in": "body",
+						"schema": { "type": "string", "example": "¿Qué lugares puedo visitar cerca del Zócalo?" }
+					}
+				],
+				"responses": {
+					"202": {
+						"description": "Job submitted successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "Job submitted successfully" },
+										"job_id": { "type": "string", "example": "3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f" }
+									}
+								}
+							}
+						}
+					},
+					"503": {
+						"description": "Too many pending jobs, the Retry-After header tells when to try again",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Too many pending jobs, try again later" },
+										"error_code": { "type": "string", "example": "TT.503" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"jobs/{job_id}": {
+			"get": {
+				"tags": ["Jobs"],
+				"summary": "Shows a job",
+				"description": "Shows the status and result of a job. Users can only see their own jobs, admin users can see all of them. Finished jobs expire after a while.",
+				"parameters": [
+					{
+						"name": "job_id",
+						"required": True,
+						"in": "path",
+						"schema": { "type": "string", "example": "3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f" }
+					}
+				],
+				"responses": {
+					"200": {
+						"description": "Job retrieved successfully",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Success" },
+										"message": { "type": "string", "example": "Job retrieved successfully" },
+										"job": { "$ref": "#/components/schemas/Job" }
+									}
+								}
+							}
+						}
+					},
+					"404": {
+						"description": "Job not found",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Job not found" },
+										"error_code": { "type": "string", "example": "TT.D404" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		},
+		"jobs/{job_id}/events": {
+			"get": {
+				"tags": ["Jobs"],
+				"summary": "Streams job status changes",
+				"description": "Streams server-sent events with the job every time its status changes, until it finishes. The stream holds a server thread, so it ends with a timeout event after 60 seconds and clients reconnect if the job is still pending.",
+				"parameters": [
+					{
+						"name": "job_id",
+						"required": True,
+						"in": "path",
+						"schema": { "type": "string", "example": "3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f" }
+					}
+				],
+				"responses": {
+					"200": {
+						"description": "Job events stream",
+						"content": {
+							"text/event-stream": {
+								"schema": { "type": "string", "example": "event: done\ndata: {\"id\": \"3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f\", \"status\": \"done\", ...}" }
+							}
+						}
+					},
+					"404": {
+						"description": "Job not found",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": "Job not found" },
+										"error_code": { "type": "string", "example": "TT.D404" }
+									}
+								}
+							}
+						}
+					},
+					"500": {
+						"description": "Internal Server Error",
+						"content": {
+							"application/json": {
+								"schema": {
+									"type": "object",
+									"properties": {
+										"status": { "type": "string", "example": "Failed" },
+										"message": { "type": "string", "example": GENERAL_ERROR_MESSAGE },
+										"error_code": { "type": "string", "example": "TT.500" }
+									}
+								}
+							}
+						}
+					}
+				},
+				"security": [{ "bearerAuth": [] }]
+			}
+		}
+	},
+	"components": {
+		"schemas": {
+			"Place": {
+				"type": "object",
+				"properties": {
+					"id": { "type": "integer", "format": "int64", "example": 1 },
+					"info": {
+						"type": "object",
+						"properties": {
+							"name": { "type": "string", "example": "Central Park" },
+							"classification": { "type": "string", "example": "Park" },
+							"punctuation": { "type": "number", "format": "float", "example": 4.5 },
+							"description": { "type": "string", "example": "A large public park" },
+							"schedules": { "type": "string", "example": "9:00 - 18:00" },
+							"services": { "type": "string", "example": "Restrooms, Parking" },
+							"activities": { "type": "string", "example": "Jogging, Picnics" },
+							"prices": { "type": "string", "example": "Free" },
+							"permanent_exhibitions": { "type": "string", "example": "Historical Statues" },
+							"temporal_exhibitions": { "type": "string", "example": "Art Gallery" },
+							"mail": { "type": "string", "example": "info@centralpark.com" },
+							"phone": { "type": "string", "example": "555-1234" },
+							"website": { "type": "string", "example": "http://centralpark.com" },
+							"sic_website": { "type": "string", "example": "http://sic.gob.mx/centralpark" }
+						}
+					},
+					"address": {
+						"type": "object",
+						"properties": {
+							"street_number": { "type": "string", "example": "123" },
+							"colony": { "type": "string", "example": "Downtown" },
+							"municipality": { "type": "string", "example": "New York" },
+							"state": { "type": "string", "example": "NY" },
+							"cp": { "type": "string", "example": "10001" },
+							"latitude": { "type": "number", "format": "float", "example": 40.785091 },
+							"longitude": { "type": "number", "format": "float", "example": -73.968285 },
+							"how_to_arrive": { "type": "string", "example": "Near the main gate" }
+						}
+					},
+					"reviews": {
+						"type": "object",
+						"properties": {
+							"general": { "type": "string", "example": "Great place for a walk" },
+							"historic": { "type": "string", "example": "Visited by famous figures" }
+						}
+					},
+					"created_at": { "type": "string", "format": "date-time", "example": "2024-01-01T10:00:00Z" },
+					"distance": { "type": "number", "format": "float", "example": 1.5 }
+				}
+			},
+			"AllFavorites": {
+				"type": "object",
+				"properties": {
+					"user": {
+						"type": "object",
+						"properties": {
+							"id": { "type": "integer", "format": "int64", "example": 1 },
+							"username": { "type": "string", "example": "Juan Perez" },
+							"mail": { "type": "string", "example": "example@example.com" }
+						}
+					},
+					"favorites": {
+						"type": "object",
+						"properties": {
+							"id": { "type": "integer", "format": "int64", "example": 1 },
+							"name": { "type": "string", "example": "Central Park" },
+							"classification": { "type": "string", "example": "Park" },
+							"punctuation": { "type": "number", "format": "float", "example": 4.5 },
+							"created_at": { "type": "string", "format": "date-time", "example": "2024-01-01T10:00:00Z" }
+						}
+					}
+				}
+			},
+			"Favorite": {
+				"type": "object",
+				"properties": {
+					"id": { "type": "integer", "format": "int64", "example": 1 },
+					"name": { "type": "string", "example": "Central Park" },
+					"classification": { "type": "string", "example": "Park" },
+					"punctuation": { "type": "number", "format": "float", "example": 4.5 },
+					"created_at": { "type": "string", "format": "date-time", "example": "2024-01-01T10:00:00Z" }
+				}
+			},
+			"Job": {
+				"type": "object",
+				"properties": {
+					"id": { "type": "string", "example": "3f2b1c0e9d8a4b7c6e5f4a3b2c1d0e9f" },
+					"kind": { "type": "string", "enum": ["asr", "tts", "agent"], "example": "asr" },
+					"status": { "type": "string", "enum": ["queued", "running", "done", "failed"], "example": "done" },
+					"result": { "type": "object", "example": { "text": "Dónde está el museo de antropología." } },
+					"error": { "type": "string", "example": None },
+					"created_at": { "type": "number", "format": "float", "example": 1717000000.0 },
+					"updated_at": { "type": "number", "format": "float", "example": 1717000002.5 },
+					"expires_at": { "type": "number", "format": "float", "example": 1717003602.5 }
 				}
 			},
 			"User": {
@@ -0,0 +1,406 @@
+import json
+import torch
+import numpy as np
+from os import getpid, makedirs, replace
+from os.path import isfile, join
+from TTS.api import TTS
+from TTS import __version__ as coqui_version
+from hashlib import blake2b
+from time import perf_counter, time
+from threading import Event, Lock, Thread
+from logging import Logger, getLogger
+from typing import Callable, Optional
+from concurrent.futures import Future
+
+from app.resources.config import *
+from app.resources.audio import encoder_stats, peak_normalized_pcm
+from app.resources.cache import LRUCache, DiskCache
+from app.resources.workers import WorkerPool, model_requests
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.tts")
+
+# Kept out of the config so processes that don't synthesize never import torch
+DEVICE: str = "cuda" if torch.cuda.is_available() else "cpu"
+
+
+###############################################################################
+############################# Quantization ####################################
+###############################################################################
+
+def quantized_model_name(model_name: str) -> str:
+	# torch.save pickles the Coqui classes, so a new torch or Coqui version converts again
+	return f"{model_name.replace('/', '--')}-torch{torch.__version__}-tts{coqui_version}-int8"
+
+
+def quantization_paths(model_name: str) -> tuple[str, str]:
+	""" Paths of the quantized model and its validation record """
+	name: str = quantized_model_name(model_name)
+	return join(TTS_QUANTIZED_ABSPATH, f"{name}.pt"), join(TTS_QUANTIZED_ABSPATH, f"{name}.json")
+
+
+def quantization_mode(model_name: str = TTS_MODEL_NAME, device: str = DEVICE) -> Optional[str]:
+	""" Weights the audio of a model comes from, None until the int8 model has been validated
+
+	A rejected int8 model falls back to fp32, so the validation record decides the mode.
+	"""
+	if not TTS_QUANTIZE or device != "cpu":
+		return "fp32"
+
+	record: Optional[dict] = read_quantization_record(model_name)
+	if record is None:
+		return None
+
+	return quantized_model_name(model_name) if record["accepted"] else "fp32"
+
+
+def read_quantization_record(model_name: str = TTS_MODEL_NAME) -> Optional[dict]:
+	record_path: str = quantization_paths(model_name)[1]
+	if not isfile(record_path):
+		return None
+
+	with open(record_path, "r") as file:
+		return json.load(file)
+
+
+def mean_log_spectrum(samples: np.ndarray, frame_size: int = 1_024) -> np.ndarray:
+	frames: np.ndarray = samples[:len(samples) // frame_size * frame_size].reshape(-1, frame_size)
+	return np.log1p(np.abs(np.fft.rfft(frames * np.hanning(frame_size), axis=1))).mean(axis=0)
+
+
+def spectral_similarity(reference: np.ndarray, candidate: np.ndarray) -> float:
+	""" Cosine similarity of the average log spectra, VITS sampling noise keeps waveforms from matching """
+	a: np.ndarray = mean_log_spectrum(reference)
+	b: np.ndarray = mean_log_spectrum(candidate)
+	return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def benchmark_synthesis(tts: TTS, text: str) -> tuple[np.ndarray, float]:
+	""" Synthesizes a text and returns the samples with the real-time factor """
+	started_at: float = perf_counter()
+	samples: np.ndarray = np.asarray(tts.tts(text=text), dtype=np.float32)
+	elapsed: float = perf_counter() - started_at
+	return samples, elapsed / (len(samples) / tts.synthesizer.output_sample_rate)
+
+
+def quantize_model(tts: TTS, model_name: str, device: str) -> None:
+	""" Swaps the VITS model for an int8 dynamic quantized copy when it is faster and sounds the same
+
+	Dynamic quantization only supports Linear layers, the convolutions stay in fp32. The
+	quantized model and the validation result are cached on disk, so later startups skip
+	both the conversion and the benchmark, and a rejected model is not validated again.
+	"""
+	if device != "cpu":
+		logger.info("Skipping TTS quantization, int8 dynamic quantization only runs on CPU")
+		return
+
+	model_path, record_path = quantization_paths(model_name)
+	record: Optional[dict] = read_quantization_record(model_name)
+	if record is not None and not record["accepted"]:
+		logger.info("Using fp32 TTS model, the int8 model was rejected by a previous validation")
+		return
+
+	if record is not None and isfile(model_path):
+		try:
+			tts.synthesizer.tts_model = torch.load(model_path, weights_only=False).eval()
+			logger.info(f"Loaded int8 TTS model from {model_path}")
+			return
+
+		except Exception as e:
+			logger.error(f"Error loading cached int8 TTS model, converting it again: {e}")
+
+	logger.info("Quantizing TTS model to int8...")
+	fp32_model: torch.nn.Module = tts.synthesizer.tts_model
+	int8_model: torch.nn.Module = torch.ao.quantization.quantize_dynamic(
+		fp32_model,
+		{torch.nn.Linear},
+		dtype=torch.qint8
+	).eval()
+
+	# The first synthesis of each model pays one-time allocations, so it isn't measured
+	tts.tts(text=TTS_WARMUP_TEXT)
+	fp32_samples, fp32_rtf = benchmark_synthesis(tts, TTS_QUANTIZATION_TEXT)
+	tts.synthesizer.tts_model = int8_model
+	tts.tts(text=TTS_WARMUP_TEXT)
+	int8_samples, int8_rtf = benchmark_synthesis(tts, TTS_QUANTIZATION_TEXT)
+
+	similarity: float = spectral_similarity(fp32_samples, int8_samples)
+	accepted: bool = similarity >= TTS_QUANTIZATION_MIN_SIMILARITY and int8_rtf < fp32_rtf
+	record = {
+		"accepted": accepted,
+		"fp32_rtf": fp32_rtf,
+		"int8_rtf": int8_rtf,
+		"speedup": fp32_rtf / int8_rtf,
+		"similarity": similarity,
+		"validated_at": time()
+	}
+	logger.info(f"TTS quantization validation: {record}")
+
+	# Every worker process may convert at the same time, files are written aside and renamed
+	makedirs(TTS_QUANTIZED_ABSPATH, exist_ok=True)
+	if accepted:
+		torch.save(int8_model, f"{model_path}.{getpid()}.tmp")
+		replace(f"{model_path}.{getpid()}.tmp", model_path)
+	else:
+		logger.info("Using fp32 TTS model, the int8 model is slower or sounds different")
+		tts.synthesizer.tts_model = fp32_model
+
+	with open(f"{record_path}.{getpid()}.tmp", "w") as file:
+		json.dump(record, file)
+	replace(f"{record_path}.{getpid()}.tmp", record_path)
+
+
+class TTSEngine:
+	""" Process-wide TTS model, loaded and warmed up once and shared by every request """
+
+	def __init__(self, model_name: str = TTS_MODEL_NAME, device: str = DEVICE) -> None:
+		self.model_name: str = model_name
+		self.device: str = device
+		self.tts: Optional[TTS] = None
+		self.load_lock: Lock = Lock()
+		# Coqui models keep state between calls, so one synthesis runs at a time
+		self.synthesis_lock: Lock = Lock()
+
+		self.stats_lock: Lock = Lock()
+		self.loading: bool = False
+		self.error: Optional[str] = None
+		self.loaded_at: Optional[float] = None
+		self.load_seconds: Optional[float] = None
+		self.warmup_seconds: Optional[float] = None
+		self.syntheses: int = 0
+		self.synthesis_total: float = 0.0
+		self.synthesis_max: float = 0.0
+
+	@property
+	def ready(self) -> bool:
+		return self.tts is not None
+
+	def load(self) -> TTS:
+		""" Loads the model once and runs a warm-up synthesis so the first request is not the slow one """
+		if self.tts is not None:
+			return self.tts
+
+		with self.load_lock:
+			if self.tts is not None:
+				return self.tts
+
+			self.loading = True
+			try:
+				logger.info(f"Loading TTS model {self.model_name} on {self.device}...")
+				started_at: float = perf_counter()
+				tts: TTS = TTS(model_name=self.model_name, progress_bar=False).to(self.device)
+				if TTS_QUANTIZE:
+					quantize_model(tts, self.model_name, self.device)
+				self.load_seconds = perf_counter() - started_at
+
+				logger.info("Warming up TTS model...")
+				started_at = perf_counter()
+				tts.tts(text=TTS_WARMUP_TEXT)
+				self.warmup_seconds = perf_counter() - started_at
+
+				self.tts = tts
+				self.loaded_at = time()
+				self.error = None
+				logger.info(f"TTS model ready in {self.load_seconds + self.warmup_seconds:.2f} seconds")
+
+			except Exception as e:
+				self.error = str(e)
+				raise
+
+			finally:
+				self.loading = False
+
+		return self.tts
+
+	def start_warmup(self, after: Optional[Callable[[], None]] = None) -> None:
+		""" Loads the model on a background thread so startup is not blocked, then runs after """
+		def warmup() -> None:
+			try:
+				self.load()
+				if after is not None:
+					after()
+			except Exception as e:
+				logger.error(f"Error warming up TTS model: {e}")
+
+		Thread(target=warmup, name="tts-warmup", daemon=True).start()
+
+	def synthesize(self, text: str) -> tuple[bytes, int]:
+		""" Returns the 16 bit mono PCM of a text and its framerate """
+		tts: TTS = self.load()
+
+		with self.synthesis_lock:
+			started_at: float = perf_counter()
+			samples: list[float] = tts.tts(
+				text=text,
+				speaker_wav="my/cloning/audio.wav"
+			)
+			self.record(perf_counter() - started_at)
+
+		return peak_normalized_pcm(np.asarray(samples, dtype=np.float32)), tts.synthesizer.output_sample_rate
+
+	def record(self, seconds: float) -> None:
+		with self.stats_lock:
+			self.syntheses += 1
+			self.synthesis_total += seconds
+			self.synthesis_max = max(self.synthesis_max, seconds)
+
+	def stats(self) -> dict:
+		with self.stats_lock:
+			return {
+				"model_name": self.model_name,
+				"device": self.device,
+				"ready": self.ready,
+				"loading": self.loading,
+				"error": self.error,
+				"loaded_at": self.loaded_at,
+				"load_seconds": self.load_seconds,
+				"warmup_seconds": self.warmup_seconds,
+				"syntheses": self.syntheses,
+				"synthesis_seconds": {
+					"avg": self.synthesis_total / self.syntheses if self.syntheses else 0.0,
+					"max": self.synthesis_max
+				}
+			}
+
+
+tts_engine: TTSEngine = TTSEngine()
+
+
+###############################################################################
+########################### Worker Processes ##################################
+###############################################################################
+
+def init_tts_worker() -> None:
+	""" Pins the torch thread count and loads the model when a TTS worker process starts """
+	# Every worker using all cores oversubscribes the CPU as soon as two syntheses overlap
+	torch.set_num_threads(TTS_TORCH_THREADS)
+	tts_engine.load()
+
+
+def synthesize_pcm(text: str) -> tuple[bytes, int]:
+	return tts_engine.synthesize(text)
+
+
+def warmup_tts_worker() -> bool:
+	return tts_engine.load() is not None
+
+
+tts_worker_pool: Optional[WorkerPool] = WorkerPool(
+	"tts",
+	workers=TTS_WORKERS,
+	queue_depth=TTS_QUEUE_DEPTH,
+	initializer=init_tts_worker
+) if TTS_WORKERS > 0 else None
+
+tts_workers_ready: Event = Event()
+
+
+def submit_synthesis(text: str, block: bool = False, timeout: Optional[float] = None) -> Future:
+	""" Sends a synthesis to the TTS workers, raises WorkerPoolFull if the queue is full """
+	if tts_worker_pool is not None:
+		return tts_worker_pool.submit(synthesize_pcm, text, block=block, timeout=timeout)
+
+	future: Future = Future()
+	try:
+		future.set_result(tts_engine.synthesize(text))
+
+	except Exception as e:
+		future.set_exception(e)
+
+	return future
+
+
+def start_tts_warmup(after: Optional[Callable[[], None]] = None) -> None:
+	""" Loads the model in the background, on every worker process when there are any """
+	if tts_worker_pool is None:
+		tts_engine.start_warmup(after)
+		return
+
+	def warmup() -> None:
+		try:
+			# Workers are spawned on demand, submitting one job per worker starts all of them
+			jobs: list[Future] = [tts_worker_pool.submit(warmup_tts_worker, block=True) for _ in range(TTS_WORKERS)]
+			for job in jobs:
+				job.result()
+			tts_workers_ready.set()
+			logger.info(f"{TTS_WORKERS} TTS worker processes ready")
+
+			if after is not None:
+				after()
+
+		except Exception as e:
+			logger.error(f"Error warming up TTS workers: {e}")
+
+	Thread(target=warmup, name="tts-warmup", daemon=True).start()
+
+
+class TTSCache:
+	""" Synthesized WAV files keyed by the normalized text and the model and weights that spoke it """
+
+	def __init__(self) -> None:
+		self.memory: LRUCache = LRUCache(TTS_CACHE_MAX_ITEMS, max_bytes=TTS_CACHE_MAX_BYTES)
+		self.disk: Optional[DiskCache] = DiskCache(
+			TTS_CACHE_ABSPATH,
+			TTS_CACHE_DISK_MAX_BYTES,
+			suffix=".wav"
+		) if TTS_CACHE_DISK_ENABLED else None
+
+	def key(self, text: str, model_name: str = TTS_MODEL_NAME) -> Optional[str]:
+		""" None while it isn't known yet which weights will speak the text, the audio is then not cached """
+		# The int8 model sounds slightly different, toggling TTS_QUANTIZE must not serve the other model's audio
+		mode: Optional[str] = quantization_mode(model_name)
+		if mode is None:
+			return None
+
+		digest = blake2b(model_name.encode(), digest_size=20)
+		digest.update(b"\0")
+		digest.update(mode.encode())
+		digest.update(b"\0")
+		digest.update(text.encode())
+		return digest.hexdigest()
+
+	def get(self, key: str) -> Optional[bytes]:
+		wav: Optional[bytes] = self.memory.get(key)
+		if wav is not None or self.disk is None:
+			return wav
+
+		wav = self.disk.get(key)
+		if wav is not None:
+			self.memory.put(key, wav)
+
+		return wav
+
+	def put(self, key: str, wav: bytes) -> None:
+		self.memory.put(key, wav)
+		if self.disk is not None:
+			self.disk.put(key, wav)
+
+	def stats(self) -> dict:
+		return {
+			"memory": self.memory.stats(),
+			"disk": self.disk.stats() if self.disk is not None else None
+		}
+
+
+tts_cache: Optional[TTSCache] = TTSCache() if TTS_CACHE_ENABLED else None
+
+
+def tts_ready() -> bool:
+	if tts_worker_pool is None:
+		return tts_engine.ready
+
+	# Without the warm-up, workers load the model when they start, so a finished job means one is ready
+	return tts_workers_ready.is_set() or tts_worker_pool.stats()["completed"] > 0
+
+
+def tts_stats() -> dict:
+	return {
+		"ready": tts_ready(),
+		"engine": tts_engine.stats() if tts_worker_pool is None else None,
+		"worker_pool": tts_worker_pool.stats() if tts_worker_pool is not None else None,
+		# Shared with ASR
+		"model_requests": model_requests.stats(),
+		"cache": tts_cache.stats() if tts_cache is not None else None,
+		"encoding": encoder_stats.stats(),
+		"quantization": read_quantization_record() if TTS_QUANTIZE else None
+	}
@@ -0,0 +1,267 @@
+from os import getpid
+from time import time
+from threading import Lock, BoundedSemaphore
+from logging import Logger, getLogger
+from multiprocessing import get_context
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.resources.config import *
+
+
+logger: Logger = getLogger(f"{PROJECT_NAME}.workers")
+
+
+class WorkerPoolFull(Exception):
+	""" Raised when a job is submitted while the pool queue is full """
+
+
+def run_job(function: Callable, submitted_at: float, *args: Any) -> tuple:
+	""" Runs a job inside a worker process and reports its timings """
+	started_at: float = time()
+	try:
+		result: Any = function(*args)
+		error: Optional[Exception] = None
+
+	except Exception as e:
+		result = None
+		error = e
+
+	return result, error, started_at - submitted_at, time() - started_at, getpid()
+
+
+class WorkerPool:
+	""" Pool of model worker processes with a bounded number of pending jobs """
+
+	def __init__(
+			self,
+			name: str,
+			workers: int,
+			queue_depth: int,
+			initializer: Optional[Callable] = None
+		) -> None:
+
+		self.name: str = name
+		self.workers: int = workers
+		self.queue_depth: int = queue_depth
+		self.initializer: Optional[Callable] = initializer
+		self.executor: Optional[ProcessPoolExecutor] = None
+		self.executor_lock: Lock = Lock()
+
+		# Running jobs plus queued jobs can never exceed this many slots
+		self.slots: BoundedSemaphore = BoundedSemaphore(workers + queue_depth)
+
+		self.stats_lock: Lock = Lock()
+		self.in_flight: int = 0
+		self.submitted: int = 0
+		self.rejected: int = 0
+		self.completed: int = 0
+		self.failed: int = 0
+		self.queue_wait_total: float = 0.0
+		self.queue_wait_max: float = 0.0
+		self.run_total: float = 0.0
+		self.run_max: float = 0.0
+		# Busy time of every worker process, by pid
+		self.worker_stats: dict[int, dict] = {}
+
+	def get_executor(self) -> ProcessPoolExecutor:
+		with self.executor_lock:
+			if self.executor is None:
+				logger.info(f"Starting {self.workers} {self.name} worker processes...")
+				self.executor = ProcessPoolExecutor(
+					max_workers=self.workers,
+					mp_context=get_context("spawn"),
+					initializer=self.initializer
+				)
+
+			return self.executor
+
+	def reserve(self, block: bool = False, timeout: Optional[float] = None) -> None:
+		""" Takes a slot ahead of the submit, raises WorkerPoolFull if the queue is full """
+		if not self.slots.acquire(blocking=block, timeout=timeout if block else None):
+			with self.stats_lock:
+				self.rejected += 1
+			raise WorkerPoolFull(f"{self.name} worker pool queue is full")
+
+	def unreserve(self) -> None:
+		""" Gives back a reserved slot that was not used by a submit """
+		self.slots.release()
+
+	def submit(
+			self,
+			function: Callable,
+			*args: Any,
+			block: bool = False,
+			timeout: Optional[float] = None,
+			reserved: bool = False
+		) -> Future:
+		""" Queues a job, reserved jobs use the slot taken by a previous reserve call """
+		if not reserved:
+			self.reserve(block, timeout)
+
+		with self.stats_lock:
+			self.in_flight += 1
+			self.submitted += 1
+
+		future: Future = Future()
+		try:
+			executor: ProcessPoolExecutor = self.get_executor()
+			job: Future = executor.submit(run_job, function, time(), *args)
+
+		except BrokenProcessPool as e:
+			self.reset_executor(executor)
+			self.finish_job(future, None, e, 0.0, 0.0)
+			return future
+
+		except Exception as e:
+			# Like an executor shut down by another thread's reset, the slot must still be released
+			logger.error(f"Error submitting {self.name} job: {e}")
+			self.finish_job(future, None, e, 0.0, 0.0)
+			return future
+
+		job.add_done_callback(lambda job: self.on_job_done(job, future, executor))
+
+		return future
+
+	def on_job_done(self, job: Future, future: Future, executor: ProcessPoolExecutor) -> None:
+		try:
+			result, error, queue_wait, run_time, pid = job.result()
+
+		except BrokenProcessPool as e:
+			logger.error(f"{self.name} worker process died: {e}")
+			self.reset_executor(executor)
+			self.finish_job(future, None, e, 0.0, 0.0)
+			return
+
+		except Exception as e:
+			self.finish_job(future, None, e, 0.0, 0.0)
+			return
+
+		self.finish_job(future, result, error, queue_wait, run_time, pid)
+
+	def finish_job(
+			self,
+			future: Future,
+			result: Any,
+			error: Optional[BaseException],
+			queue_wait: float,
+			run_time: float,
+			pid: Optional[int] = None
+		) -> None:
+
+		with self.stats_lock:
+			if pid is not None:
+				worker: dict = self.worker_stats.setdefault(pid, {"jobs": 0, "busy_seconds": 0.0, "since": time() - run_time})
+				worker["jobs"] += 1
+				worker["busy_seconds"] += run_time
+
+			self.in_flight -= 1
+			if error is None:
+				self.completed += 1
+			else:
+				self.failed += 1
+			self.queue_wait_total += queue_wait
+			self.queue_wait_max = max(self.queue_wait_max, queue_wait)
+			self.run_total += run_time
+			self.run_max = max(self.run_max, run_time)
+
+		self.slots.release()
+
+		if error is None:
+			future.set_result(result)
+		else:
+			future.set_exception(error)
+
+	def reset_executor(self, executor: ProcessPoolExecutor) -> None:
+		""" Drops a broken executor so the next job starts fresh workers """
+		with self.executor_lock:
+			if self.executor is executor:
+				self.executor = None
+				with self.stats_lock:
+					self.worker_stats.clear()
+
+		executor.shutdown(wait=False, cancel_futures=True)
+
+	def stats(self) -> dict:
+		now: float = time()
+		with self.stats_lock:
+			finished: int = self.completed + self.failed
+			return {
+				"name": self.name,
+				"workers": self.workers,
+				"queue_depth": self.queue_depth,
+				"in_flight": self.in_flight,
+				"queued": max(self.in_flight - self.workers, 0),
+				"submitted": self.submitted,
+				"rejected": self.rejected,
+				"completed": self.completed,
+				"failed": self.failed,
+				"queue_wait_avg": self.queue_wait_total / finished if finished else 0.0,
+				"queue_wait_max": self.queue_wait_max,
+				"run_time_avg": self.run_total / finished if finished else 0.0,
+				"run_time_max": self.run_max,
+				"worker_processes": [
+					{
+						"pid": pid,
+						"jobs": worker["jobs"],
+						"busy_seconds": worker["busy_seconds"],
+						"utilization": min(worker["busy_seconds"] / (now - worker["since"]), 1.0) if now > worker["since"] else 0.0
+					}
+					for pid, worker in self.worker_stats.items()
+				]
+			}
+
+
+class AdmissionLimit:
+	""" Caps the requests that hold a server thread while they wait on the models """
+
+	def __init__(self, name: str, limit: int) -> None:
+		self.name: str = name
+		self.limit: int = limit
+		self.slots: BoundedSemaphore = BoundedSemaphore(limit)
+
+		self.stats_lock: Lock = Lock()
+		self.in_flight: int = 0
+		self.admitted: int = 0
+		self.rejected: int = 0
+
+	def admit(self) -> None:
+		""" Raises WorkerPoolFull instead of waiting, so the request is answered with a 503 right away """
+		if not self.slots.acquire(blocking=False):
+			with self.stats_lock:
+				self.rejected += 1
+			raise WorkerPoolFull(f"Too many {self.name} in flight")
+
+		with self.stats_lock:
+			self.in_flight += 1
+			self.admitted += 1
+
+	def release(self) -> None:
+		with self.stats_lock:
+			self.in_flight -= 1
+
+		self.slots.release()
+
+	@contextmanager
+	def admitted_request(self) -> Iterator[None]:
+		self.admit()
+		try:
+			yield
+		finally:
+			self.release()
+
+	def stats(self) -> dict:
+		with self.stats_lock:
+			return {
+				"name": self.name,
+				"limit": self.limit,
+				"in_flight": self.in_flight,
+				"admitted": self.admitted,
+				"rejected": self.rejected
+			}
+
+
+# Shared by ASR and TTS, whose requests compete for the same server threads
+model_requests: AdmissionLimit = AdmissionLimit("model requests", MODEL_REQUESTS_MAX_IN_FLIGHT)
@@ -0,0 +1,30 @@
+""" Compares format_text with its implementation before the rules were compiled
+
+Run from the project directory with: python -m benchmarks.format_text
+"""
+from timeit import timeit
+
+from app.resources.config import AGENT_IRRELEVANT_RESPONSE
+from app.resources.functions import format_text
+from tests.text_corpus import legacy_format_text, random_corpus
+
+
+TEXTS: dict[str, str] = {
+	"no numbers": AGENT_IRRELEVANT_RESPONSE * 3,
+	"list": "Te recomiendo los siguientes lugares cercanos a tu ubicación:\n" + "".join(f"- Museo Nacional {i} a {i * 1.37:.2f} km\n" for i in range(10)),
+	"prices": "Entrada $50, niños $25, abre 10 hrs. a 18:00 hrs. https://www.inah.gob.mx/x " * 3,
+	"corpus": "\n".join(random_corpus(200))
+}
+
+
+def main(number: int = 2_000) -> None:
+	for name, text in TEXTS.items():
+		assert format_text(text) == legacy_format_text(text), f"Output differs for {name}"
+
+		legacy: float = timeit(lambda: legacy_format_text(text), number=number) / number
+		compiled: float = timeit(lambda: format_text(text), number=number) / number
+		print(f"{name:12s} legacy {legacy * 1e6:8.1f} us  compiled {compiled * 1e6:8.1f} us  {legacy / compiled:5.1f}x")
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,34 @@
+""" Measures the speed of the streaming low-pass stage and checks it against a single-pass filter
+
+Run from the project directory with: python -m benchmarks.lowpass
+"""
+import numpy as np
+from time import perf_counter
+from scipy.signal import sosfilt
+
+from app.resources.config import SAMPLING_RATE, FRAMES_PER_BUFFER, CUTOFF, ORDER
+from app.resources.audio import LowPassFilter, float_to_pcm, get_lowpass_sos
+
+
+def main(seconds: int = 60, chunk_bytes: int = FRAMES_PER_BUFFER) -> None:
+	generator: np.random.Generator = np.random.default_rng(0)
+	samples: np.ndarray = generator.uniform(-0.5, 0.5, SAMPLING_RATE * seconds).astype(np.float32)
+	pcm: bytes = float_to_pcm(samples)
+	chunks: list[bytes] = [pcm[start:start + chunk_bytes] for start in range(0, len(pcm), chunk_bytes)]
+
+	lowpass_filter: LowPassFilter = LowPassFilter()
+	started_at: float = perf_counter()
+	filtered: bytes = b"".join(lowpass_filter.process(chunk) for chunk in chunks)
+	elapsed: float = perf_counter() - started_at
+
+	# Carrying the state between chunks must give the same output as filtering the whole clip
+	reference: bytes = float_to_pcm(sosfilt(get_lowpass_sos(CUTOFF, ORDER, SAMPLING_RATE), np.frombuffer(pcm, dtype="<i2").astype(np.float32) / 32_768.0))
+	difference: int = int(np.max(np.abs(np.frombuffer(filtered, dtype="<i2").astype(np.int32) - np.frombuffer(reference, dtype="<i2"))))
+
+	print(f"{seconds} s of audio in {len(chunks)} chunks of {chunk_bytes} bytes")
+	print(f"filtered in {elapsed:.3f} s, {seconds / elapsed:.0f}x real time")
+	print(f"max difference with a single-pass filter: {difference} LSB")
+
+
+if __name__ == "__main__":
+	main()
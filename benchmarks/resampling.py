@@ -0,0 +1,57 @@
+""" Measures the ASR normalization stage on typical phone recordings
+
+Run from the project directory with: python -m benchmarks.resampling
+"""
+import wave
+import numpy as np
+from io import BytesIO
+from time import perf_counter
+
+from app.resources.config import SAMPLING_RATE
+from app.resources.audio import read_wav_frames
+
+
+FORMATS: list[tuple[int, int]] = [(44_100, 1), (44_100, 2), (48_000, 1), (48_000, 2)]
+
+
+def phone_recording(framerate: int, nchannels: int, seconds: int) -> bytes:
+	""" 16 bit WAV with a few voiced harmonics over background noise """
+	generator: np.random.Generator = np.random.default_rng(framerate + nchannels)
+	time: np.ndarray = np.arange(framerate * seconds) / framerate
+	signal: np.ndarray = sum(np.sin(2 * np.pi * frequency * time) / index for index, frequency in enumerate((180, 360, 540, 2_400), start=1))
+	signal = 0.2 * signal + 0.02 * generator.standard_normal(len(time))
+	samples: np.ndarray = (np.clip(signal, -1, 1) * 32_767).astype("<i2")
+
+	buffer: BytesIO = BytesIO()
+	with wave.open(buffer, "wb") as file:
+		file.setnchannels(nchannels)
+		file.setsampwidth(2)
+		file.setframerate(framerate)
+		file.writeframes(np.repeat(samples, nchannels).tobytes())
+
+	return buffer.getvalue()
+
+
+def normalize(audio: bytes) -> tuple[float, int]:
+	started_at: float = perf_counter()
+	output_bytes: int = sum(len(data) for data in read_wav_frames(audio))
+	return perf_counter() - started_at, output_bytes
+
+
+def main(seconds: int = 30, repeat: int = 5) -> None:
+	for framerate, nchannels in FORMATS:
+		audio: bytes = phone_recording(framerate, nchannels, seconds)
+
+		# The first clip of a rate also creates its resampler, the rest reuse the cached one
+		first, output_bytes = normalize(audio)
+		cached: float = min(normalize(audio)[0] for _ in range(repeat))
+
+		output_seconds: float = output_bytes / 2 / SAMPLING_RATE
+		print(
+			f"{framerate} Hz {nchannels} ch, {seconds} s -> {output_seconds:.2f} s at {SAMPLING_RATE} Hz: "
+			f"first {first * 1_000:.1f} ms, cached {cached * 1_000:.1f} ms, {seconds / cached:.0f}x real time"
+		)
+
+
+if __name__ == "__main__":
+	main()
@@ -13,7 +13,9 @@ echo "Upgrading database..."
 flask db upgrade
 
 echo "Starting server..."
-waitress-serve --port 5000 --call "app:create_app"
+# Requests waiting on the models hold a thread, so the server needs more threads than they can take
+SERVER_THREADS=$(python -c "from app.resources.config import SERVER_THREADS; print(SERVER_THREADS)")
+waitress-serve --port 5000 --threads "$SERVER_THREADS" --call "app:create_server"
 
 # Keep the container running
 tail -f /dev/null
@@ -1,8 +1,9 @@
-from app import create_app
-
-
-app = create_app()
+from app import create_server
 
 
+# Worker processes are spawned, so they re-run this module as __mp_main__ and
+# must not build the app or start its services again
 if __name__ == "__main__":
-	app.run(host="0.0.0.0", port=5000, debug=True)
+	app = create_server()
+	# The reloader would start the services in both the watcher and the serving process
+	app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
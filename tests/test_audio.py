@@ -0,0 +1,57 @@
+import pytest
+from io import BytesIO
+from typing import Iterator
+
+from app.resources import audio
+from tests.tones import tone_wav
+
+
+def test_made_up_sample_rate_is_rejected() -> None:
+	# A one frame per second header would resample 40 KB of data into 640 MB
+	with pytest.raises(audio.InvalidAudio):
+		b"".join(audio.read_audio_frames(audio.pcm_to_wav(bytes(40_000), 1)))
+
+
+def test_long_clip_is_stopped() -> None:
+	frames: Iterator[bytes | memoryview] = audio.limit_length(audio.read_wav_frames(tone_wav(440, 16_000, 1, seconds=3.0)), max_seconds=2)
+	with pytest.raises(audio.InvalidAudio):
+		b"".join(frames)
+
+
+def test_uncommon_rates_are_not_cached() -> None:
+	b"".join(audio.read_audio_frames(tone_wav(440, 44_100, 1)))
+	b"".join(audio.read_audio_frames(tone_wav(440, 44_101, 1)))
+
+	assert "44100" in audio.resampler_cache.stats()
+	assert "44101" not in audio.resampler_cache.stats()
+	assert "44101" not in audio.normalization_stats.stats()
+
+
+@pytest.mark.parametrize("speech", [False, True])
+def test_vad_counts_the_partial_last_frame(speech: bool) -> None:
+	# 7 s is not a whole number of VAD frames
+	pcm: bytes = audio.wav_to_pcm(tone_wav(440, 16_000, 1, seconds=7.0))[0] if speech else bytes(7 * 16_000 * 2)
+	detector: audio.VoiceActivityDetector = audio.VoiceActivityDetector()
+	kept: bytes = detector.process(pcm) + detector.flush()
+
+	assert detector.input_seconds == 7.0
+	assert detector.discarded_seconds == pytest.approx(7.0 - len(kept) / 2 / 16_000)
+
+
+def test_quiet_speech_is_kept_untrimmed() -> None:
+	# About -54 dBFS, under the VAD energy threshold
+	pcm: bytes = audio.wav_to_pcm(tone_wav(440, 16_000, 1, seconds=2.0, amplitude=0.003))[0]
+	untrimmed_clips: int = audio.vad_stats.stats()["untrimmed_clips"]
+
+	assert b"".join(audio.trim_silence(iter([pcm[:10_000], pcm[10_000:]]))) == pcm
+	assert audio.vad_stats.stats()["untrimmed_clips"] == untrimmed_clips + 1
+
+
+def test_untyped_wav_stream_is_detected() -> None:
+	wav: bytes = tone_wav(440, 44_100, 2)
+	assert b"".join(audio.read_audio_frames(BytesIO(wav))) == b"".join(audio.read_audio_frames(wav))
+
+
+def test_broken_wav_is_invalid_audio() -> None:
+	with pytest.raises(audio.InvalidAudio):
+		b"".join(audio.read_audio_frames(BytesIO(b"RIFF" + bytes(10))))
@@ -0,0 +1,17 @@
+from pathlib import Path
+
+from app.resources.cache import DiskCache
+
+
+def test_eviction_leaves_files_being_written(tmp_path: Path) -> None:
+	cache: DiskCache = DiskCache(str(tmp_path), max_bytes=1_000, suffix=".bin")
+	# Another process writing a cached file
+	(tmp_path / "partial.tmp").write_bytes(bytes(2_000))
+
+	for index in range(5):
+		cache.put(str(index), bytes(300))
+	cache.writes.join()
+
+	assert (tmp_path / "partial.tmp").exists()
+	assert cache.stats()["bytes"] <= 900
+	assert len(list(tmp_path.glob("*.bin"))) == 3
@@ -0,0 +1,20 @@
+import pytest
+
+from app.resources.functions import format_text
+from tests.text_corpus import CASES, legacy_format_text, random_corpus
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_format_text_matches_legacy(text: str) -> None:
+	assert format_text(text) == legacy_format_text(text)
+
+
+def test_format_text_matches_legacy_on_random_corpus() -> None:
+	mismatches: list[str] = [text for text in random_corpus() if format_text(text) != legacy_format_text(text)]
+	assert mismatches == []
+
+
+def test_format_text_is_stable_across_calls() -> None:
+	# The number caches must not change the output of repeated texts
+	for text in CASES:
+		assert format_text(text) == format_text(text)
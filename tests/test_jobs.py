@@ -0,0 +1,47 @@
+import pytest
+from time import time
+from pathlib import Path
+from threading import Event
+from contextlib import nullcontext
+
+from app.resources.jobs import JobQueueFull, JobRunner, JobStore, JOB_DONE, JOB_QUEUED, JOB_RUNNING
+
+
+class App:
+	def app_context(self) -> nullcontext:
+		return nullcontext()
+
+
+def test_pending_jobs_are_bounded(tmp_path: Path) -> None:
+	store: JobStore = JobStore(str(tmp_path / "jobs.sqlite3"))
+	runner: JobRunner = JobRunner(store, max_pending=2)
+	release: Event = Event()
+
+	job_ids: list[str] = [runner.submit(App(), "test", None, lambda: release.wait(5) and "done") for _ in range(2)]
+	with pytest.raises(JobQueueFull):
+		runner.submit(App(), "test", None, lambda: "done")
+
+	# Finished jobs free their slot
+	release.set()
+	runner.executor.shutdown(wait=True)
+	assert [store.get(job_id)["status"] for job_id in job_ids] == [JOB_DONE, JOB_DONE]
+	assert runner.slots.acquire(blocking=False) and runner.slots.acquire(blocking=False)
+
+
+def test_waiters_wake_when_the_job_changes(tmp_path: Path) -> None:
+	store: JobStore = JobStore(str(tmp_path / "jobs.sqlite3"))
+	runner: JobRunner = JobRunner(store)
+	release: Event = Event()
+
+	job_id: str = runner.submit(App(), "test", None, lambda: release.wait(5) and "done")
+	release.set()
+
+	# Returns on the change, long before the timeout
+	started_at: float = time()
+	assert runner.wait_for_change(job_id, JOB_QUEUED, timeout=5)
+	runner.executor.shutdown(wait=True)
+	assert time() - started_at < 5
+
+	assert store.get(job_id)["status"] == JOB_DONE
+	# Finished jobs are forgotten, their state is read from the store
+	assert not runner.wait_for_change(job_id, JOB_DONE, timeout=5)
@@ -0,0 +1,52 @@
+import pytest
+from threading import Thread
+from typing import Optional
+
+from app.resources import asr
+
+
+class BrokenResetRecognizer:
+	def __init__(self, model: None, framerate: int, grammar: Optional[str] = None) -> None:
+		pass
+
+	def SetWords(self, words: bool) -> None:
+		pass
+
+	def Reset(self) -> None:
+		raise RuntimeError("Reset failed")
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> asr.RecognizerPool:
+	monkeypatch.setattr(asr, "KaldiRecognizer", BrokenResetRecognizer)
+	monkeypatch.setattr(asr, "get_model", lambda model_path: None)
+	return asr.RecognizerPool("model", size=1)
+
+
+def test_discarded_recognizer_wakes_waiters(pool: asr.RecognizerPool) -> None:
+	recognizer: BrokenResetRecognizer = pool.acquire()
+
+	acquired: list[BrokenResetRecognizer] = []
+	waiter: Thread = Thread(target=lambda: acquired.append(pool.acquire()), daemon=True)
+	waiter.start()
+	waiter.join(timeout=0.2)
+	assert waiter.is_alive()
+
+	# The failed reset discards the recognizer, so the waiter creates a new one
+	pool.release(recognizer)
+	waiter.join(timeout=5)
+
+	assert not waiter.is_alive()
+	assert acquired and acquired[0] is not recognizer
+	assert pool.stats()["created"] == 1
+	assert pool.stats()["waits"] == 1
+
+
+def test_acquire_gives_up_after_timeout(pool: asr.RecognizerPool) -> None:
+	recognizer: BrokenResetRecognizer = pool.acquire()
+
+	with pytest.raises(asr.RecognizerPoolBusy):
+		pool.acquire(timeout=0.1)
+
+	assert pool.stats()["timeouts"] == 1
+	pool.release(recognizer)
@@ -0,0 +1,116 @@
+import pytest
+from threading import BoundedSemaphore, Event, Lock
+from typing import Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.resources.config import ASR_BATCH_IN_FLIGHT
+from app.resources import asr, functions
+from app.resources.workers import WorkerPoolFull
+from app.resources.functions import speech_recognition, speech_recognition_batch
+from tests.tones import ToneRecognizer, tone_wav
+
+
+@pytest.fixture
+def tone_recognizers(monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(asr, "KaldiRecognizer", ToneRecognizer)
+	monkeypatch.setattr(asr, "get_model", lambda model_path: None)
+	monkeypatch.setattr(asr, "as_waveform", bytes)
+	monkeypatch.setattr(asr, "recognizer_pools", {})
+	# Decoding stays in this process so the stub is used, and every clip is decoded
+	monkeypatch.setattr(asr, "asr_worker_pool", None)
+	monkeypatch.setattr(asr, "asr_thread_pool", ThreadPoolExecutor(max_workers=2))
+	monkeypatch.setattr(asr, "asr_thread_slots", BoundedSemaphore(8))
+	monkeypatch.setattr(asr, "transcript_cache", None)
+
+
+def test_parallel_requests_get_their_own_transcript(tone_recognizers: None) -> None:
+	clips: dict[str, bytes] = {
+		"220 hz.": tone_wav(220, 16_000, 1),
+		"440 hz.": tone_wav(440, 44_100, 2),
+		"660 hz.": tone_wav(660, 48_000, 1),
+		"880 hz.": tone_wav(880, 16_000, 2),
+		"1100 hz.": tone_wav(1_100, 8_000, 1),
+		"1320 hz.": tone_wav(1_320, 22_050, 1)
+	}
+	requests: list[tuple[str, bytes]] = list(clips.items()) * 4
+
+	# More request threads than recognizers, so recognizers are reused between clips
+	with ThreadPoolExecutor(max_workers=len(clips)) as executor:
+		transcripts: list[str] = list(executor.map(lambda request: speech_recognition(request[1]), requests))
+
+	assert transcripts == [expected for expected, _ in requests]
+
+
+def test_batch_keeps_queue_slots_free(tone_recognizers: None, monkeypatch: pytest.MonkeyPatch) -> None:
+	lock: Lock = Lock()
+	in_flight: list[int] = [0, 0]
+
+	def finished(job: Future) -> None:
+		with lock:
+			in_flight[0] -= 1
+
+	def counting_submit(*args, **kwargs) -> Future:
+		with lock:
+			in_flight[0] += 1
+			in_flight[1] = max(in_flight)
+		job: Future = asr.submit_transcription(*args, **kwargs)
+		job.add_done_callback(finished)
+		return job
+
+	monkeypatch.setattr(functions, "submit_transcription", counting_submit)
+
+	clips: list[Optional[bytes]] = [tone_wav(220 * (index % 5 + 1), 16_000, 1, seconds=0.5) for index in range(10)]
+	clips[3] = None
+	results: list[dict] = speech_recognition_batch(clips)
+
+	assert in_flight[1] <= ASR_BATCH_IN_FLIGHT
+	assert [result["index"] for result in results] == list(range(10))
+	assert results[3]["error_code"] == "TT.D400"
+	assert [result["text"] for index, result in enumerate(results) if index != 3] == [
+		f"{220 * (index % 5 + 1)} hz." for index in range(10) if index != 3
+	]
+
+
+def test_thread_transcriptions_are_bounded(tone_recognizers: None, monkeypatch: pytest.MonkeyPatch) -> None:
+	release: Event = Event()
+
+	def blocked_transcription(pcm: bytes, grammar: Optional[str] = None) -> dict:
+		release.wait(5)
+		return {"text": "", "confidence": None, "escalated": False, "pid": 0, "recognizer_pools": []}
+
+	monkeypatch.setattr(asr, "transcribe_pcm", blocked_transcription)
+	monkeypatch.setattr(asr, "asr_thread_slots", BoundedSemaphore(2))
+
+	jobs: list[Future] = [asr.submit_transcription(b"\x00\x00") for _ in range(2)]
+	with pytest.raises(WorkerPoolFull):
+		asr.submit_transcription(b"\x00\x00")
+
+	release.set()
+	for job in jobs:
+		job.result(timeout=5)
+
+	# Finished jobs give their slots back
+	asr.submit_transcription(b"\x00\x00").result(timeout=5)
+
+
+def test_full_queue_fails_before_reading_the_audio(tone_recognizers: None, monkeypatch: pytest.MonkeyPatch) -> None:
+	monkeypatch.setattr(asr, "asr_thread_slots", BoundedSemaphore(1))
+	asr.reserve_transcription()
+
+	def unread_audio(audio: bytes, mimetype: Optional[str] = None) -> bytes:
+		raise AssertionError("The audio was read with a full queue")
+
+	monkeypatch.setattr(functions, "prepare_speech", unread_audio)
+	with pytest.raises(WorkerPoolFull):
+		speech_recognition(tone_wav(440, 16_000, 1))
+
+	asr.unreserve_transcription()
+
+
+def test_transcript_key_changes_with_the_cascade(monkeypatch: pytest.MonkeyPatch) -> None:
+	cache: asr.TranscriptCache = asr.TranscriptCache()
+	monkeypatch.setattr(asr, "cascade_available", lambda: False)
+	small_model_key: str = cache.key(b"\x00\x00")
+	monkeypatch.setattr(asr, "cascade_available", lambda: True)
+
+	assert cache.key(b"\x00\x00") != small_model_key
@@ -0,0 +1,81 @@
+import random
+from re import sub
+from num2words import num2words
+
+from app.resources.config import TEXT_REPLACEMENTS, AGENT_CANNED_RESPONSES
+
+
+def legacy_format_text(text: str) -> str:
+	""" format_text before its rules were compiled, kept as the golden output """
+	for symbol, word in TEXT_REPLACEMENTS.items():
+		text = text.replace(symbol, word)
+
+	text = sub(r"\$(\d+)", lambda x: f"{num2words(int(x.group(1)), lang='es')} pesos", text)
+	text = sub(r"\b\d+(\.\d+)?\b", lambda x: num2words(float(x.group()), lang="es").replace('.', " punto "), text)
+
+	text = text.replace("hrs.", "horas")
+
+	text = sub(r"https?://(www\.)?([^/]+)", lambda x: x.group(2).replace('.', " punto "), text)
+	text = sub(r"\b([\w\-]+ punto [\w\-]+(?: punto [\w\-]+)?)(/.*)?\b(/)?", r"\1", text)
+
+	return text \
+		.replace(':', ',') \
+		.replace('*', "") \
+		.replace(';', "") \
+		.replace('=', "") \
+		.replace('¡', "") \
+		.replace('!', "") \
+		.replace('(', "").replace(')', "") \
+		.replace('[', "").replace(']', "") \
+		.replace('{', "").replace('}', "")
+
+
+CASES: list[str] = [
+	"",
+	"Hola, bienvenido a Tip Trip.",
+	# Prices
+	"La entrada cuesta $50 y para niños $25.",
+	"Desde $1500 hasta $75.50 por persona",
+	"$ 30 pesos, $0 y $007",
+	# Decimals and lists
+	"El museo está a 2.35 km de tu ubicación.",
+	"Te recomiendo los siguientes lugares cercanos a tu ubicación:\n- Museo Soumaya a 2.35 km\n- Palacio de Bellas Artes a 0.40 km\n",
+	"Versión 1.2.3, 3.14159 y .5 o 5.",
+	"Coordenadas 19.4326, -99.1332",
+	# Unicode digits
+	"Abre a las ٩ y cierra a las ١٨",
+	"Precio $٥٠ o ５０ pesos",
+	"Piso ² y ³, sala ½",
+	# Times
+	"Horario de 10:00 hrs. a 18:00 hrs. de martes a domingo.",
+	"Abre 9 hrs.cierra 17hrs.",
+	# URLs
+	"Más información en https://www.inah.gob.mx/zonas/teotihuacan",
+	"Visita http://mexicocity.cdmx.gob.mx/ o https://sic.cultura.gob.mx/ficha.php?table=museo&table_id=1",
+	"Escribe a contacto@museo.org.mx o visita www.museo.org.mx/visitas",
+	"sitio punto com/ruta/ y museo punto gob punto mx",
+	# Symbols
+	"50% de descuento & 2x1 los miércoles @ 25°C, 10€ o 5¢",
+	"¡Hola! *Importante*; usa (esto) [o] {aquello} = nada",
+	"Ñandú, café, pingüino: acentos ÁÉÍÓÚ",
+	*AGENT_CANNED_RESPONSES
+]
+
+TOKENS: list[str] = [
+	"museo", "Palacio", "de", "la", "Ciudad", "México", "entrada", "a", "km", "hrs.", "hrs", "horas",
+	"$", "$50", "$1200", "$7.5", "0", "07", "12", "2.35", "0.40", "1.2.3", "٣", "٤٥", "５", "²",
+	"http://", "https://", "www.", "inah.gob.mx", "/zonas", "/", "punto", "com", "sitio-web",
+	"&", "%", "@", "°", "€", "¢", ":", "*", ";", "=", "¡", "!", "(", ")", "[", "]", "{", "}",
+	".", ",", "-", "\n", "- ", "ñ", "café"
+]
+
+
+def random_corpus(size: int = 5_000, seed: int = 20) -> list[str]:
+	""" Texts made of tokens that trigger every rule, glued with and without spaces """
+	generator: random.Random = random.Random(seed)
+	texts: list[str] = []
+	for _ in range(size):
+		tokens: list[str] = generator.choices(TOKENS, k=generator.randint(1, 24))
+		texts.append("".join(token + generator.choice(["", " ", " ", "\n"]) for token in tokens))
+
+	return texts
@@ -0,0 +1,52 @@
+import json
+import wave
+import numpy as np
+from io import BytesIO
+from time import sleep
+from typing import Optional
+
+
+class ToneRecognizer:
+	""" Recognizer stub whose transcript is the dominant frequency of all the audio it was fed """
+
+	def __init__(self, model: None, framerate: int, grammar: Optional[str] = None) -> None:
+		self.framerate: int = framerate
+		self.audio: bytearray = bytearray()
+
+	def SetWords(self, words: bool) -> None:
+		pass
+
+	def AcceptWaveform(self, data: bytes) -> bool:
+		self.audio += data
+		# Yields the GIL so parallel requests interleave on the shared pool
+		sleep(0.001)
+		return False
+
+	def PartialResult(self) -> str:
+		return json.dumps({"partial": ""})
+
+	def Result(self) -> str:
+		return json.dumps({"text": ""})
+
+	def FinalResult(self) -> str:
+		samples: np.ndarray = np.frombuffer(bytes(self.audio), dtype="<i2").astype(np.float32)
+		spectrum: np.ndarray = np.abs(np.fft.rfft(samples))
+		frequency: float = float(np.argmax(spectrum)) * self.framerate / len(samples)
+		return json.dumps({"text": f"{round(frequency / 10) * 10} hz"})
+
+	def Reset(self) -> None:
+		self.audio = bytearray()
+
+
+def tone_wav(frequency: int, framerate: int, nchannels: int, seconds: float = 1.0, amplitude: float = 0.5) -> bytes:
+	time: np.ndarray = np.arange(int(framerate * seconds)) / framerate
+	samples: np.ndarray = (amplitude * 32_767 * np.sin(2 * np.pi * frequency * time)).astype("<i2")
+
+	buffer: BytesIO = BytesIO()
+	with wave.open(buffer, "wb") as file:
+		file.setnchannels(nchannels)
+		file.setsampwidth(2)
+		file.setframerate(framerate)
+		file.writeframes(np.repeat(samples, nchannels).tobytes())
+
+	return buffer.getvalue()